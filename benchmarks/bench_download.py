@@ -0,0 +1,220 @@
+"""
+下载性能测试 - 基于本地模拟服务器，无需联网
+
+对每种下载方式统计：总耗时、吞吐量（MB/s）、首字节时间、服务器端请求数/错误数、
+客户端 CPU 时间。模拟服务器运行在单独的进程中，CPU 时间只统计工具本身。
+
+用法:
+    python -m benchmarks.bench_download
+    python -m benchmarks.bench_download --modes netease bili-audio --latency 0.05 --bandwidth 10 --json result.json
+
+说明：you-get 下载方式写死了B站地址，无法指向模拟服务器，不在测试范围内；
+未安装 FFmpeg 时，DASH 方式会跳过最后的合并步骤，只测下载部分。
+"""
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.mock_server import MB, MockServer, add_config_arguments, config_from_args
+
+MODES = ["bili-resolve", "bili-dash", "bili-audio", "netease"]
+
+
+class BenchSink:
+    """记录每个任务开始时间和首个进度事件时间的事件接收器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = {}
+        self.first_byte = {}
+        self.received = {}
+
+    def push(self, event):
+        from tools._download_events import DownloadProgress, DownloadStarted
+        now = time.perf_counter()
+        with self._lock:
+            if isinstance(event, DownloadStarted):
+                self.started[event.key] = now
+            elif isinstance(event, DownloadProgress):
+                self.first_byte.setdefault(event.key, now)
+                self.received[event.key] = event.received
+
+    def log(self, line):
+        pass
+
+    def ttfb(self):
+        values = [self.first_byte[k] - self.started[k] for k in self.first_byte if k in self.started]
+        return sum(values) / len(values) if values else None
+
+    def total_bytes(self):
+        return sum(self.received.values())
+
+
+def _serve(config, port_queue):
+    server = MockServer(config)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_server(config):
+    """在子进程中启动模拟服务器，返回 (进程, 地址)"""
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(config, port_queue), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{port_queue.get(timeout=10)}"
+
+
+def point_tools_at(base_url, home):
+    """把工具的接口地址指向模拟服务器，并使用临时数据目录"""
+    os.environ["TOOLSBOX_BILIBILI_API"] = base_url
+    os.environ["TOOLSBOX_BILIBILI_WEB"] = base_url
+    os.environ["TOOLSBOX_NETEASE_API"] = base_url
+    os.environ["TOOLSBOX_NETEASE_MEDIA"] = base_url
+    os.environ["TOOLSBOX_HOME"] = home
+
+
+def _server_stats(base_url):
+    return requests.get(f"{base_url}/__stats", timeout=5).json()
+
+
+# ---------------- 各下载方式 ----------------
+
+def bench_bili_resolve(base_url, out_dir, count, workers, sink):
+    bilibili = importlib.import_module("tools._bilibili")
+    collection = bilibili.resolve_collection(f"{base_url}/video/BV1mock00001", use_cache=False)
+    cached = bilibili.resolve_collection(f"{base_url}/video/BV1mock00002")
+    assert cached["key"] == collection["key"]
+    return len(collection["episodes"])
+
+
+def _bench_dash(base_url, out_dir, count, workers, sink, audio_only):
+    bilibili = importlib.import_module("tools._bilibili")
+    fetch = importlib.import_module("tools._bili_fetch")
+    if shutil.which("ffmpeg") is None:
+        fetch._run_ffmpeg = lambda args: None
+    episodes = bilibili.resolve_collection(f"{base_url}/video/BV1mock00001")["episodes"][:count]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(fetch.run_dash, ep, out_dir, sink, key=ep["index"], audio_only=audio_only)
+            for ep in episodes
+        ]
+        return sum(1 for f in futures if _succeeded(f))
+
+
+def bench_bili_dash(base_url, out_dir, count, workers, sink):
+    return _bench_dash(base_url, out_dir, count, workers, sink, audio_only=False)
+
+
+def bench_bili_audio(base_url, out_dir, count, workers, sink):
+    return _bench_dash(base_url, out_dir, count, workers, sink, audio_only=True)
+
+
+def bench_netease(base_url, out_dir, count, workers, sink):
+    netease = importlib.import_module("tools._netease")
+    songs = netease.search_songs("模拟", limit=count)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(netease.download_song, song["id"], os.path.join(out_dir, f"{song['id']}.mp3"), sink)
+            for song in songs
+        ]
+        return sum(1 for f in futures if _succeeded(f))
+
+
+def _succeeded(future):
+    try:
+        future.result()
+        return True
+    except Exception:
+        return False
+
+
+BENCHMARKS = {
+    "bili-resolve": bench_bili_resolve,
+    "bili-dash": bench_bili_dash,
+    "bili-audio": bench_bili_audio,
+    "netease": bench_netease,
+}
+
+
+def run_mode(mode, base_url, count, workers):
+    """运行一种下载方式，返回统计结果"""
+    requests.get(f"{base_url}/__reset", timeout=5)
+    sink = BenchSink()
+    out_dir = tempfile.mkdtemp(prefix=f"bench-{mode}-")
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    error = None
+    try:
+        succeeded = BENCHMARKS[mode](base_url, out_dir, count, workers, sink)
+    except Exception as e:
+        succeeded, error = 0, str(e)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    shutil.rmtree(out_dir, ignore_errors=True)
+
+    stats = _server_stats(base_url)
+    received = sink.total_bytes()
+    ttfb = sink.ttfb()
+    return {
+        "mode": mode,
+        "succeeded": succeeded,
+        "seconds": round(wall, 3),
+        "mb": round(received / MB, 2),
+        "mb_per_s": round(received / MB / wall, 2) if wall else 0,
+        "ttfb_ms": round(ttfb * 1000, 1) if ttfb is not None else None,
+        "requests": stats["requests"],
+        "server_errors": stats["errors"],
+        "cpu_seconds": round(cpu, 3),
+        "cpu_ms_per_mb": round(cpu * 1000 / (received / MB), 1) if received else None,
+        "error": error,
+    }
+
+
+def print_table(results):
+    columns = ["mode", "succeeded", "seconds", "mb", "mb_per_s", "ttfb_ms",
+               "requests", "server_errors", "cpu_seconds", "cpu_ms_per_mb"]
+    widths = [max(len(c), *(len(str(r[c])) for r in results)) for c in columns]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in results:
+        print("  ".join(str(r[c]).ljust(w) for c, w in zip(columns, widths)))
+        if r["error"]:
+            print(f"    错误: {r['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线下载性能测试")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--count", type=int, default=20, help="每种方式下载的条目数")
+    parser.add_argument("--workers", type=int, default=5, help="并发下载数")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    process, base_url = start_server(config_from_args(args))
+    home = tempfile.mkdtemp(prefix="bench-home-")
+    point_tools_at(base_url, home)
+    try:
+        results = [run_mode(mode, base_url, args.count, args.workers) for mode in args.modes]
+    finally:
+        process.terminate()
+        shutil.rmtree(home, ignore_errors=True)
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
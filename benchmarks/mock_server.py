@@ -0,0 +1,413 @@
+"""
+本地模拟服务器 - 模拟B站/网易云音乐的接口和媒体文件，用于离线测试和性能测试
+
+可模拟的网络状况：延迟、带宽、随机错误，媒体文件支持 Range 请求。
+
+用法:
+    python -m benchmarks.mock_server --port 8000 --latency 0.05 --bandwidth 5
+然后把工具指向它:
+    TOOLSBOX_BILIBILI_API=http://127.0.0.1:8000 TOOLSBOX_BILIBILI_WEB=http://127.0.0.1:8000 \\
+    TOOLSBOX_NETEASE_API=http://127.0.0.1:8000 TOOLSBOX_NETEASE_MEDIA=http://127.0.0.1:8000 python main.py
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MB = 1024 * 1024
+
+
+class MockConfig:
+    """模拟服务器配置"""
+
+    def __init__(self, latency=0.0, bandwidth=0, error_rate=0.0, range_support=True,
+                 episodes=500, songs=200, video_size=8 * MB, audio_size=1 * MB,
+                 song_size=4 * MB, vip_every=0, seed=0):
+        self.latency = latency            # 每个请求的额外延迟（秒）
+        self.bandwidth = bandwidth        # 每个连接的带宽上限（字节/秒），0 表示不限
+        self.error_rate = error_rate      # 随机返回 503 的概率
+        self.range_support = range_support
+        self.episodes = episodes          # 合集中的视频数量
+        self.songs = songs                # 搜索结果总数
+        self.video_size = video_size
+        self.audio_size = audio_size
+        self.song_size = song_size
+        self.vip_every = vip_every        # 每隔多少首歌模拟一首会员歌曲（跳转到网页），0 表示没有
+        self.seed = seed
+
+
+class MockStats:
+    """服务器端计数器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.errors = 0
+            self.bytes_sent = 0
+            self.by_path = {}
+
+    def add(self, path, error=False, sent=0):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.bytes_sent += sent
+            self.by_path[path] = self.by_path.get(path, 0) + 1
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "bytes_sent": self.bytes_sent,
+                "by_path": dict(self.by_path),
+            }
+
+
+# ---------------- 模拟数据 ----------------
+
+def _bvid(n):
+    return f"BV1mock{n:05d}"
+
+
+def _season(config):
+    episodes = [
+        {
+            "aid": n, "bvid": _bvid(n), "cid": 10000 + n, "title": f"第{n}集",
+            "arc": {"duration": 180 + n},
+            "page": {"cid": 10000 + n, "page": 1, "part": f"第{n}集", "duration": 180 + n},
+        }
+        for n in range(1, config.episodes + 1)
+    ]
+    return {"id": 4242, "title": "模拟合集", "sections": [{"episodes": episodes}]}
+
+
+def _view_data(config, bvid):
+    n = int(re.sub(r"\D", "", bvid) or 1)
+    return {
+        "bvid": bvid, "aid": n, "title": f"第{n}集", "cid": 10000 + n,
+        "pages": [{"cid": 10000 + n, "page": 1, "part": f"第{n}集", "duration": 180 + n}],
+        "ugc_season": _season(config),
+    }
+
+
+def _song(n):
+    return {
+        "id": 900000 + n, "name": f"模拟歌曲{n}",
+        "artists": [{"id": 1, "name": "模拟歌手"}],
+        "album": {"id": 7000 + n // 10, "name": f"模拟专辑{n // 10}", "picId": n},
+        "duration": 200000,
+    }
+
+
+def _song_detail(n, base):
+    """歌曲详情接口的格式（ar/al）"""
+    song = _song(n)
+    album = song["album"]
+    return {
+        "id": song["id"], "name": song["name"], "ar": song["artists"],
+        "al": {"id": album["id"], "name": album["name"], "picUrl": f"{base}/media/cover/{album['id']}.jpg"},
+    }
+
+
+def _media_bytes(kind, size):
+    """媒体文件内容：歌曲为一段静音 MPEG 帧，封面为 JPEG 头，其余为固定模式字节"""
+    if kind == "song":
+        # 128kbps/44.1kHz 的 MPEG-1 Layer III 帧，每帧 417 字节
+        frame = b"\xff\xfb\x90\x64" + b"\x00" * 413
+        return (frame * (size // len(frame) + 1))[:size]
+    header = b"\xff\xd8\xff\xe0" if kind == "cover" else b"\x00\x00\x00\x18ftypiso5"
+    pattern = bytes(range(256)) * 64
+    body = (pattern * (size // len(pattern) + 1))[:max(size - len(header), 0)]
+    return header + body
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "ToolsboxMock/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def _base(self):
+        return f"http://{self.headers.get('Host')}"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path
+
+        if path == "/__stats":
+            return self._send_json(self.server.stats.to_dict(), count=False)
+        if path == "/__reset":
+            self.server.stats.reset()
+            return self._send_json({"ok": True}, count=False)
+
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        if self.server.rng_random() < self.config.error_rate:
+            self.server.stats.add(path, error=True)
+            return self._send_error(503)
+
+        routes = [
+            (r"^/x/web-interface/view$", self._view),
+            (r"^/video/(BV\w+)$", self._video_page),
+            (r"^/x/player/playurl$", self._playurl),
+            (r"^/api/search/get/web$", self._search),
+            (r"^/api/v6/playlist/detail$", self._playlist),
+            (r"^/api/v3/song/detail$", self._song_detail),
+            (r"^/api/v1/album/(\d+)$", self._album),
+            (r"^/song/media/outer/url$", self._song_redirect),
+            (r"^/404$", self._not_found_page),
+            (r"^/media/(video|audio|song|cover)/([\w.]+)$", self._media),
+        ]
+        for pattern, handler in routes:
+            match = re.match(pattern, path)
+            if match:
+                return handler(query, *match.groups())
+        self.server.stats.add(path, error=True)
+        self._send_error(404)
+
+    # ---- 接口 ----
+
+    def _view(self, query):
+        bvid = query.get("bvid", _bvid(1))
+        self._send_json({"code": 0, "message": "0", "data": _view_data(self.config, bvid)})
+
+    def _video_page(self, query, bvid):
+        state = json.dumps({"videoData": _view_data(self.config, bvid)}, ensure_ascii=False)
+        body = f"<html><head><script>window.__INITIAL_STATE__={state};(function(){{}})();</script></head></html>"
+        self._send_bytes(body.encode("utf-8"), "text/html; charset=utf-8")
+
+    def _playurl(self, query):
+        cid = query.get("cid", "0")
+        base = self._base()
+        dash = {
+            "video": [{
+                "id": 80, "codecid": 7, "bandwidth": 2000000, "codecs": "avc1.640032",
+                "baseUrl": f"{base}/media/video/{cid}.m4s", "backupUrl": [],
+            }],
+            "audio": [{
+                "id": 30280, "bandwidth": 320000, "codecs": "mp4a.40.2",
+                "baseUrl": f"{base}/media/audio/{cid}.m4s", "backupUrl": [],
+            }],
+        }
+        self._send_json({"code": 0, "message": "0", "data": {"dash": dash}})
+
+    def _search(self, query):
+        offset = int(query.get("offset", 0))
+        limit = int(query.get("limit", 10))
+        total = self.config.songs
+        songs = [_song(n) for n in range(offset + 1, min(offset + limit, total) + 1)]
+        self._send_json({"code": 200, "result": {"songs": songs, "songCount": total}})
+
+    def _playlist(self, query):
+        # 歌单包含全部模拟歌曲
+        track_ids = [{"id": _song(n)["id"]} for n in range(1, self.config.songs + 1)]
+        self._send_json({"code": 200, "playlist": {"id": int(query.get("id", 0)), "trackIds": track_ids}})
+
+    def _song_detail(self, query):
+        ids = [item["id"] for item in json.loads(query.get("c", "[]"))]
+        songs = [_song_detail(song_id - 900000, self._base()) for song_id in ids]
+        self._send_json({"code": 200, "songs": songs})
+
+    def _album(self, query, album_id):
+        album_id = int(album_id)
+        first = (album_id - 7000) * 10
+        songs = [_song(n) for n in range(max(first, 1), first + 10) if n <= self.config.songs]
+        album = {"id": album_id, "name": f"模拟专辑{album_id - 7000}", "picUrl": f"{self._base()}/media/cover/{album_id}.jpg"}
+        self._send_json({"code": 200, "album": album, "songs": songs})
+
+    def _song_redirect(self, query):
+        # 与真实接口一样，先 302 跳转到媒体地址
+        self.server.stats.add("/song/media/outer/url")
+        song_id = query.get("id", "0")
+        vip = self.config.vip_every and int(song_id) % self.config.vip_every == 0
+        location = "/404" if vip else f"/media/song/{song_id}.mp3"
+        self.send_response(302)
+        self.send_header("Location", f"{self._base()}{location}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _not_found_page(self, query):
+        # 会员歌曲会跳转到一个状态码为 200 的网页
+        self._send_bytes("<html><body>很抱歉，你要查找的网页找不到</body></html>".encode("utf-8"),
+                         "text/html; charset=utf-8")
+
+    def _media(self, query, kind, name):
+        size = {
+            "video": self.config.video_size,
+            "audio": self.config.audio_size,
+            "song": self.config.song_size,
+            "cover": 64 * 1024,
+        }[kind]
+        data = self.server.media(kind, size)
+        content_type = {"song": "audio/mpeg", "cover": "image/jpeg"}.get(kind, "video/mp4")
+
+        start, end = 0, len(data) - 1
+        range_header = self.headers.get("Range")
+        match = re.match(r"bytes=(\d*)-(\d*)", range_header or "")
+        if match and self.config.range_support:
+            if match.group(1):
+                start = int(match.group(1))
+                end = int(match.group(2)) if match.group(2) else end
+            else:
+                start = len(data) - int(match.group(2))
+            end = min(end, len(data) - 1)
+            if start > end:
+                self.server.stats.add(f"/media/{kind}", error=True)
+                return self._send_error(416)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(end - start + 1))
+        if self.config.range_support:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        sent = self._write_throttled(memoryview(data)[start:end + 1])
+        self.server.stats.add(f"/media/{kind}", sent=sent)
+
+    # ---- 发送 ----
+
+    def _write_throttled(self, view):
+        """按配置的带宽分块发送"""
+        chunk = 64 * 1024
+        bandwidth = self.config.bandwidth
+        sent = 0
+        started = time.monotonic()
+        try:
+            while sent < len(view):
+                piece = view[sent:sent + chunk]
+                self.wfile.write(piece)
+                sent += len(piece)
+                if bandwidth:
+                    delay = sent / bandwidth - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        return sent
+
+    def _send_json(self, payload, count=True):
+        self._send_bytes(json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                         "application/json; charset=utf-8", count)
+
+    def _send_bytes(self, body, content_type, count=True):
+        if count:
+            self.server.stats.add(urlparse(self.path).path, sent=len(body))
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, code):
+        body = f"<html><body>error {code}</body></html>".encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockServer(ThreadingHTTPServer):
+    """模拟服务器，可在后台线程中运行"""
+
+    daemon_threads = True
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), MockHandler)
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._media = {}
+        self._media_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle_error(self, request, client_address):
+        # 客户端主动断开（如校验失败后中止下载）属于正常情况
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    def rng_random(self):
+        with self._rng_lock:
+            return self._rng.random()
+
+    def media(self, kind, size):
+        """按类型和大小缓存生成的媒体内容"""
+        with self._media_lock:
+            if (kind, size) not in self._media:
+                self._media[(kind, size)] = _media_bytes(kind, size)
+            return self._media[(kind, size)]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def add_config_arguments(parser):
+    """命令行参数与 MockConfig 对应"""
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的延迟（秒）")
+    parser.add_argument("--bandwidth", type=float, default=0, help="每个连接的带宽上限（MB/s），0 表示不限")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回 503 的概率")
+    parser.add_argument("--no-range", action="store_true", help="不支持 Range 请求")
+    parser.add_argument("--episodes", type=int, default=500, help="合集中的视频数量")
+    parser.add_argument("--vip-every", type=int, default=0, help="每隔多少首歌模拟一首会员歌曲")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from_args(args):
+    return MockConfig(
+        latency=args.latency,
+        bandwidth=int(args.bandwidth * MB),
+        error_rate=args.error_rate,
+        range_support=not args.no_range,
+        episodes=args.episodes,
+        vip_every=args.vip_every,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B站/网易云音乐本地模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer(config_from_args(args), args.host, args.port)
+    print(f"模拟服务器已启动: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
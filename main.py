@@ -1,104 +1,213 @@
+import ast
+import json
+import logging
 import sys
+import threading
+import time
 import importlib
 from pathlib import Path
-from PyQt6.QtCore import (QPropertyAnimation, QEasingCurve, QParallelAnimationGroup,
-                         Qt, QSize, QPoint)
-from PyQt6.QtGui import QIcon, QPixmap, QColor, QPainter, QPen
+from tools import _trace as trace  # 最先导入，作为追踪的时间零点
+from PyQt6.QtCore import (QEasingCurve, QObject, Qt, QSize, QPointF, QRectF, QMargins,
+                         QEvent, QTimer, pyqtSignal)
+from PyQt6.QtGui import QIcon, QPixmap, QColor, QFont, QPainter, QStaticText
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QGridLayout,
-                            QPushButton, QLabel, QScrollArea, QGraphicsDropShadowEffect,
-                            QStackedWidget)
+                            QStackedWidget, QDockWidget, QMessageBox)
+from tools._jobs import JobsPanel, job_manager
+from tools._settings import CACHE_DIR, DATA_DIR, ensure_dir, get_setting
 
 # 配置项
 TOOLS_DIR = Path(__file__).parent / "tools"
+# 工具信息缓存（按文件修改时间失效），启动时不需要导入各个工具模块
+TOOL_MANIFEST = CACHE_DIR / "tool_manifest.json"
+# 各工具的打开次数和最近打开时间，决定预加载顺序和页面回收顺序
+TOOL_USAGE = DATA_DIR / "tool_usage.json"
+# 启动后等待多久（毫秒）开始在后台预先导入工具模块
+WARMUP_DELAY_MS = get_setting("launcher.warmup_delay_ms", 1000)
+# 空闲时预先创建界面的工具数（只创建打开过的、最常用的工具）
+WARM_PAGES = get_setting("launcher.warm_pages", 2)
+# 最多保留的工具页面数，超出时关闭最少使用且没有进行中任务的页面
+MAX_PAGES = get_setting("launcher.max_pages", 4)
 TOOL_ICON_SIZE = QSize(72, 72)
-CARD_STYLE = """
-QWidget#ToolCard {
-    background: white;
-    border-radius: 12px;
-    padding: 16px;
-}
-QWidget#ToolCard:hover {
-    background: #f8f9fa;
-}
-QLabel#ToolTitle {
-    color: #212529;
-    font-size: 14px;
-    font-weight: 500;
-    margin-top: 8px;
-}
-QLabel#ToolDesc {
-    color: #6c757d;
-    font-size: 12px;
-}
-"""
+# 工具卡片：阴影和悬停放大由卡片自己绘制，不使用 QGraphicsDropShadowEffect 和几何动画
+CARD_SIZE = QSize(160, 160)
+CARD_MARGIN = 12  # 卡片四周留给阴影和放大的空间
+CARD_RADIUS = 12
+CARD_PADDING = 16
+CARD_HOVER_SCALE = 1.05
+CARD_SHADOW_BLUR = 8
+CARD_SHADOW_OFFSET = 4
+CARD_SHADOW_ALPHA = (30, 50)  # 普通和悬停时的阴影不透明度
+CARD_BACKGROUND = (QColor("white"), QColor("#f8f9fa"))
+CARD_TITLE_COLOR = QColor("#212529")
+CARD_DESC_COLOR = QColor("#6c757d")
+HOVER_DURATION_MS = 200
+HOVER_FRAME_MS = 16
+
+
+class HoverAnimator(QObject):
+    """所有卡片共用的悬停动画：一个定时器推进正在动画的卡片，没有动画时停止"""
+
+    def __init__(self):
+        super().__init__()
+        self._cards = set()
+        self._timer = QTimer(self)
+        self._timer.setInterval(HOVER_FRAME_MS)
+        self._timer.timeout.connect(self._tick)
+        self._easing = QEasingCurve(QEasingCurve.Type.OutQuad)
+
+    def animate(self, card):
+        self._cards.add(card)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def discard(self, card):
+        self._cards.discard(card)
+
+    def _tick(self):
+        step = HOVER_FRAME_MS / HOVER_DURATION_MS
+        for card in list(self._cards):
+            target = 1.0 if card.hovered else 0.0
+            if card.progress < target:
+                card.progress = min(target, card.progress + step)
+            else:
+                card.progress = max(target, card.progress - step)
+            if card.progress == target:
+                self._cards.discard(card)
+            card.level = self._easing.valueForProgress(card.progress)
+            card.update()
+        if not self._cards:
+            self._timer.stop()
+
+
+_hover_animator = None
+_shadow_pixmaps = {}  # (宽, 高, 像素比) -> 阴影图片，所有卡片共用
+
+
+def hover_animator():
+    global _hover_animator
+    if _hover_animator is None:
+        _hover_animator = HoverAnimator()
+    return _hover_animator
+
+
+def card_shadow(size, ratio):
+    """卡片阴影（不透明度为 1 的版本，绘制时按悬停程度调整），按尺寸缓存"""
+    key = (size.width(), size.height(), ratio)
+    pixmap = _shadow_pixmaps.get(key)
+    if pixmap is None:
+        blur = CARD_SHADOW_BLUR
+        pixmap = QPixmap(QSize(size.width() + blur * 2, size.height() + blur * 2) * ratio)
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        # 由外向内叠加半透明圆角矩形，近似模糊后的阴影
+        for i in range(blur):
+            painter.setBrush(QColor(0, 0, 0, 255 // blur))
+            painter.drawRoundedRect(QRectF(i, i, size.width() + (blur - i) * 2, size.height() + (blur - i) * 2),
+                                    CARD_RADIUS + blur - i, CARD_RADIUS + blur - i)
+        painter.end()
+        _shadow_pixmaps[key] = pixmap
+    return pixmap
+
 
 class ToolCard(QWidget):
     def __init__(self, tool_info, parent=None):
         super().__init__(parent)
         self.tool_info = tool_info
         self.setObjectName("ToolCard")
-        self.setFixedSize(160, 160)
+        self.setFixedSize(CARD_SIZE.grownBy(QMargins(CARD_MARGIN, CARD_MARGIN, CARD_MARGIN, CARD_MARGIN)))
+        self.hovered = False
+        self.progress = 0.0  # 悬停动画进度（0~1）
+        self.level = 0.0  # 缓动后的悬停程度
         self._setup_ui()
-        self._add_effects()
 
     def _setup_ui(self):
-        layout = QGridLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-
-        # 标题和描述
-        self.title = QLabel(self.tool_info["name"])
-        self.title.setObjectName("ToolTitle")
-        self.desc = QLabel(self.tool_info["description"])
-        self.desc.setObjectName("ToolDesc")
-        self.desc.setWordWrap(True)
-
-        layout.addWidget(self.title, 0, 0, 1, 1)
-        layout.addWidget(self.desc, 1, 0, 1, 1)
-
-    def _add_effects(self):
-        # 悬停阴影动画
-        self.shadow = QGraphicsDropShadowEffect()
-        self.shadow.setBlurRadius(20)
-        self.shadow.setColor(QColor(0, 0, 0, 30))
-        self.shadow.setOffset(0, 4)
-        self.setGraphicsEffect(self.shadow)
-
-        self.anim_group = QParallelAnimationGroup()
-        
-        # 悬停放大动画
-        self.scale_anim = QPropertyAnimation(self, b"geometry")
-        self.scale_anim.setDuration(200)
-        self.scale_anim.setEasingCurve(QEasingCurve.Type.OutQuad)
-        
-        # 阴影强度动画
-        self.shadow_anim = QPropertyAnimation(self.shadow, b"color")
-        self.shadow_anim.setDuration(200)
-
-        self.anim_group.addAnimation(self.scale_anim)
-        self.anim_group.addAnimation(self.shadow_anim)
+        # 标题和描述的排版只计算一次
+        width = CARD_SIZE.width() - CARD_PADDING * 2
+        self.title_font = QFont(self.font())
+        self.title_font.setPixelSize(14)
+        self.title_font.setWeight(QFont.Weight.Medium)
+        self.desc_font = QFont(self.font())
+        self.desc_font.setPixelSize(12)
+        self.title = QStaticText(self.tool_info["name"])
+        self.title.setTextWidth(width)
+        self.title.prepare(font=self.title_font)
+        self.desc = QStaticText(self.tool_info["description"])
+        self.desc.setTextWidth(width)
+        self.desc.prepare(font=self.desc_font)
 
     def enterEvent(self, event):
-        start = self.geometry()
-        end = start.adjusted(-4, -4, 4, 4)
-        self.scale_anim.setStartValue(start)
-        self.scale_anim.setEndValue(end)
-        
-        self.shadow_anim.setStartValue(QColor(0, 0, 0, 30))
-        self.shadow_anim.setEndValue(QColor(0, 0, 0, 50))
-        
-        self.anim_group.start()
+        self.hovered = True
+        hover_animator().animate(self)
 
     def leaveEvent(self, event):
-        self.anim_group.setDirection(QPropertyAnimation.Direction.Backward)
-        self.anim_group.start()
+        self.hovered = False
+        hover_animator().animate(self)
+
+    def hideEvent(self, event):
+        # 切换到工具页面时直接结束动画
+        hover_animator().discard(self)
+        self.hovered = False
+        self.progress = self.level = 0.0
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        level = self.level
+        # 悬停放大：以卡片中心缩放
+        scale = 1 + (CARD_HOVER_SCALE - 1) * level
+        center = QRectF(self.rect()).center()
+        painter.translate(center)
+        painter.scale(scale, scale)
+        painter.translate(-center)
+
+        card = QRectF(CARD_MARGIN, CARD_MARGIN, CARD_SIZE.width(), CARD_SIZE.height())
+        alpha = CARD_SHADOW_ALPHA[0] + (CARD_SHADOW_ALPHA[1] - CARD_SHADOW_ALPHA[0]) * level
+        painter.setOpacity(alpha / 255)
+        shadow = card_shadow(CARD_SIZE, self.devicePixelRatioF())
+        painter.drawPixmap(QPointF(card.x() - CARD_SHADOW_BLUR, card.y() - CARD_SHADOW_BLUR + CARD_SHADOW_OFFSET),
+                           shadow)
+        painter.setOpacity(1)
+
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(CARD_BACKGROUND[1] if self.hovered else CARD_BACKGROUND[0])
+        painter.drawRoundedRect(card, CARD_RADIUS, CARD_RADIUS)
+
+        x, y = card.x() + CARD_PADDING, card.y() + CARD_PADDING
+        painter.setFont(self.title_font)
+        painter.setPen(CARD_TITLE_COLOR)
+        painter.drawStaticText(QPointF(x, y), self.title)
+        painter.setFont(self.desc_font)
+        painter.setPen(CARD_DESC_COLOR)
+        painter.drawStaticText(QPointF(x, y + self.title.size().height() + 8), self.desc)
 
 class ToolboxWindow(QMainWindow):
+    tool_imported = pyqtSignal(str)  # 预加载线程导入完一个工具模块（模块名）
+
     def __init__(self):
         super().__init__()
-        self.tools = self._load_tools()
-        self._setup_window()
-        self._setup_ui()
-        self.setStyleSheet(CARD_STYLE)
+        with trace.span("ToolboxWindow._load_tools"):
+            self.tools = self._load_tools()
+        self.pages = {}  # 已打开的工具页面（按模块名缓存，返回工具箱后保留状态）
+        self.usage = self._load_usage()
+        self.tool_imported.connect(self._warm_page)
+        # 事件循环开始、工具箱显示之后再预加载，不影响启动
+        QTimer.singleShot(WARMUP_DELAY_MS, self._start_warmup)
+        with trace.span("ToolboxWindow._setup_window"):
+            self._setup_window()
+        with trace.span("ToolboxWindow._setup_ui"):
+            self._setup_ui()
+        if trace.enabled():
+            # 记录工具箱页面第一次绘制的时间
+            self.toolbox_page.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if obj is self.toolbox_page and event.type() == QEvent.Type.Paint:
+            trace.instant("first_paint")
+            self.toolbox_page.removeEventFilter(self)
+        return super().eventFilter(obj, event)
 
     def _setup_window(self):
         self.setWindowTitle("高级工具箱")
@@ -114,50 +223,235 @@ class ToolboxWindow(QMainWindow):
         self.toolbox_layout = QGridLayout(self.toolbox_page)
         self.stack.addWidget(self.toolbox_page)
 
+        # 全局任务列表（所有工具的后台任务）
+        self.jobs_panel = JobsPanel(job_manager(), self)
+        self.jobs_dock = QDockWidget("任务列表", self)
+        self.jobs_dock.setWidget(self.jobs_panel)
+        self.jobs_dock.setVisible(False)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.jobs_dock)
+        jobs_action = self.jobs_dock.toggleViewAction()
+        jobs_action.setText("任务列表")
+        self.menuBar().addAction(jobs_action)
+        # 有新任务时自动显示任务列表
+        job_manager().changed.connect(self._on_jobs_changed)
+        self._job_count = 0
+
     def _load_tools(self):
+        """
+        读取工具列表
+
+        只解析源码中的 TOOL_NAME 和 DESCRIPTION（结果按文件修改时间缓存），
+        工具模块在第一次打开时才导入，避免启动时加载 pandas、requests 等大型依赖。
+        """
+        try:
+            with open(TOOL_MANIFEST, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+
         tools = []
-        for f in TOOLS_DIR.glob("*.py"):
+        updated = {}
+        for f in sorted(TOOLS_DIR.glob("*.py")):
             if f.stem.startswith("_"): continue
+            stat = f.stat()
+            entry = manifest.get(f.name)
+            if not entry or entry["mtime"] != stat.st_mtime or entry["size"] != stat.st_size:
+                try:
+                    with trace.span(f"scan {f.name}"):
+                        entry = dict(self._scan_tool(f), mtime=stat.st_mtime, size=stat.st_size)
+                except Exception as e:
+                    print(f"加载工具失败: {f.stem} - {str(e)}")
+                    continue
+            updated[f.name] = entry
+            tools.append({
+                "name": entry["name"],
+                "description": entry["description"],
+                "module_name": f"tools.{f.stem}",
+                "module": None  # 打开工具时导入
+            })
+
+        if updated != manifest:
             try:
-                module = importlib.import_module(f"tools.{f.stem}")
-                tools.append({
-                    "name": module.TOOL_NAME,
-                    "description": module.DESCRIPTION,
-                    "module": module
-                })
-            except Exception as e:
-                print(f"加载工具失败: {f.stem} - {str(e)}")
+                ensure_dir(TOOL_MANIFEST.parent)
+                with open(TOOL_MANIFEST, "w", encoding="utf-8") as f:
+                    json.dump(updated, f, ensure_ascii=False, indent=1)
+            except OSError:
+                pass
         return tools
 
+    @staticmethod
+    def _scan_tool(path):
+        """从源码中读取 TOOL_NAME 和 DESCRIPTION（不执行模块代码）；不是字符串常量时退回导入模块"""
+        tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+        info = {}
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant):
+                for target in node.targets:
+                    if isinstance(target, ast.Name) and target.id in ("TOOL_NAME", "DESCRIPTION"):
+                        info[target.id] = node.value.value
+        if "TOOL_NAME" not in info or "DESCRIPTION" not in info:
+            module = importlib.import_module(f"tools.{path.stem}")
+            info = {"TOOL_NAME": module.TOOL_NAME, "DESCRIPTION": module.DESCRIPTION}
+        return {"name": info["TOOL_NAME"], "description": info["DESCRIPTION"]}
+
     def _setup_ui(self):
         row, col = 0, 0
         max_cols = 4
         
         for tool in self.tools:
-            card = ToolCard(tool)
-            card.mousePressEvent = lambda e, m=tool["module"]: self._open_tool(m)
+            with trace.span(f"ToolCard {tool['name']}"):
+                card = ToolCard(tool)
+            card.mousePressEvent = lambda e, t=tool: self._open_tool(t)
             self.toolbox_layout.addWidget(card, row, col)
             col += 1
             if col >= max_cols:
                 col = 0
                 row += 1
 
-    def _open_tool(self, module):
-        """打开子工具"""
-        tool_window = module.ToolWindow(self)
+    def _open_tool(self, tool):
+        """打开子工具（第一次打开时导入模块；已打开过的工具直接切换，保留之前的状态）"""
+        tool_window = self.pages.get(tool["module_name"])
+        if tool_window is None:
+            try:
+                tool_window = self._create_page(tool)
+            except Exception as e:
+                QMessageBox.critical(self, "错误", f"加载工具失败: {tool['name']} - {str(e)}")
+                return
+        self.stack.setCurrentWidget(tool_window)
+        self._count_usage(tool)
+        self._trim_pages()
+
+    def _create_page(self, tool):
+        """导入工具模块（预加载过时跳过）并创建工具页面"""
+        if tool["module"] is None:
+            with trace.span(f"import {tool['module_name']}", "tool"):
+                tool["module"] = importlib.import_module(tool["module_name"])
+        with trace.span(f"ToolWindow {tool['name']}", "tool"):
+            tool_window = tool["module"].ToolWindow(self)
         tool_window.return_to_toolbox = self._return_to_toolbox  # 传递返回函数
         self.stack.addWidget(tool_window)
-        self.stack.setCurrentWidget(tool_window)
+        self.pages[tool["module_name"]] = tool_window
+        return tool_window
+
+    # ---- 使用统计和预加载 ----
+
+    @staticmethod
+    def _load_usage():
+        try:
+            with open(TOOL_USAGE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _count_usage(self, tool):
+        entry = self.usage.setdefault(tool["module_name"], {"count": 0, "last": 0})
+        entry["count"] += 1
+        entry["last"] = time.time()
+        try:
+            ensure_dir(TOOL_USAGE.parent)
+            with open(TOOL_USAGE, "w", encoding="utf-8") as f:
+                json.dump(self.usage, f, ensure_ascii=False, indent=1)
+        except OSError:
+            pass
+
+    def _usage_key(self, module_name):
+        """排序键：打开次数多、最近打开过的工具在后"""
+        entry = self.usage.get(module_name, {})
+        return entry.get("count", 0), entry.get("last", 0)
+
+    def _start_warmup(self):
+        """按使用频率在后台线程中导入工具模块；界面只能在界面线程中创建，导入完成后再处理"""
+        tools = sorted(self.tools, key=lambda t: self._usage_key(t["module_name"]), reverse=True)
+        self._warm_targets = {
+            t["module_name"] for t in tools[:max(0, min(WARM_PAGES, MAX_PAGES))]
+            if self._usage_key(t["module_name"])[0] > 0
+        }
+        threading.Thread(target=self._warmup_imports, args=(tools,), daemon=True, name="tool-warmup").start()
+
+    def _warmup_imports(self, tools):
+        for tool in tools:
+            if tool["module"] is not None:
+                continue
+            try:
+                with trace.span(f"warm import {tool['module_name']}", "warmup"):
+                    module = importlib.import_module(tool["module_name"])
+            except Exception as e:
+                # 预加载失败不影响使用，打开工具时会再次导入并提示错误
+                logging.warning(f"预加载工具失败: {tool['module_name']} - {str(e)}")
+                continue
+            tool["module"] = module
+            self.tool_imported.emit(tool["module_name"])
+
+    def _warm_page(self, module_name):
+        """预先创建常用工具的页面（界面线程中，每次只创建一个）"""
+        if module_name not in self._warm_targets or module_name in self.pages or len(self.pages) >= MAX_PAGES:
+            return
+        tool = next(t for t in self.tools if t["module_name"] == module_name)
+        try:
+            with trace.span(f"warm page {tool['name']}", "warmup"):
+                self._create_page(tool)
+        except Exception as e:
+            logging.warning(f"预加载工具失败: {module_name} - {str(e)}")
+
+    def _page_busy(self, module_name, page):
+        """
+        页面是否还有未结束的任务（任务列表中还在运行、或结果还没交给页面处理的任务，或页面自己报告的 is_busy()）
+        """
+        tool = next(t for t in self.tools if t["module_name"] == module_name)
+        if any(job.tool == tool["name"] for job in job_manager().unfinished()):
+            return True
+        is_busy = getattr(page, "is_busy", None)
+        return bool(is_busy and is_busy())
+
+    def _trim_pages(self):
+        """页面数超过 MAX_PAGES 时，关闭最少使用的空闲页面（再次打开时重新创建）"""
+        current = self.stack.currentWidget()
+        while len(self.pages) > MAX_PAGES:
+            idle = [name for name, page in self.pages.items()
+                    if page is not current and not self._page_busy(name, page)]
+            if not idle:
+                return
+            name = min(idle, key=self._usage_key)
+            page = self.pages.pop(name)
+            with trace.span(f"evict page {name}", "warmup"):
+                self.stack.removeWidget(page)
+                page.close()
+                page.deleteLater()
 
     def _return_to_toolbox(self):
-        """返回工具箱"""
-        current_tool = self.stack.currentWidget()
-        if current_tool != self.toolbox_page:
-            self.stack.removeWidget(current_tool)  # 移除子工具窗口
-            self.stack.setCurrentWidget(self.toolbox_page)
+        """返回工具箱（工具页面保留在后台，正在运行的任务不受影响）"""
+        self.stack.setCurrentWidget(self.toolbox_page)
+
+    def _on_jobs_changed(self):
+        count = len(job_manager().jobs)
+        if count > self._job_count:
+            self.jobs_dock.setVisible(True)
+        self._job_count = count
+
+    def closeEvent(self, event):
+        """退出前确认是否取消正在运行的任务，并让各工具页面清理资源"""
+        active = job_manager().active()
+        if active:
+            reply = QMessageBox.question(
+                self, "退出", f"还有 {len(active)} 个任务未完成，退出将取消这些任务，确定退出吗？"
+            )
+            if reply != QMessageBox.StandardButton.Yes:
+                event.ignore()
+                return
+            job_manager().cancel_all()
+        for page in self.pages.values():
+            page.close()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = ToolboxWindow()
+    # --trace [输出文件]：记录启动和打开工具的耗时
+    if "--trace" in sys.argv:
+        index = sys.argv.index("--trace")
+        args = sys.argv[index + 1:index + 2]
+        trace.enable(args[0] if args and not args[0].startswith("-") else trace.DEFAULT_TRACE_FILE)
+    with trace.span("QApplication"):
+        app = QApplication(sys.argv)
+    with trace.span("ToolboxWindow"):
+        window = ToolboxWindow()
     window.show()
     sys.exit(app.exec())
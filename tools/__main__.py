@@ -0,0 +1,336 @@
+"""
+命令行入口 - 不启动界面，直接调用各工具的核心逻辑，适合在服务器上定时运行
+
+    python -m tools music search 晴天
+    python -m tools music download "playlist:123" -o ~/Music
+    python -m tools music download -i songs.txt -o ~/Music --json
+    python -m tools bili download https://www.bilibili.com/video/BV1xx411c7XX --mode dash
+    python -m tools convert video1.mp4 video2.mp4 -o ~/Music
+    python -m tools rename ./folder --table names.xlsx
+    python -m tools rename ./photos -r --template "{taken:%Y%m%d}_{n:04d}"
+    python -m tools dedup ./a ./b --content --output ./out
+
+各子命令都可以用 -i/--input 从文件（"-" 为标准输入）读取批量输入，每行一项，# 开头的行为注释；
+--json 时结果以 JSON 输出到标准输出，日志和进度输出到标准错误。有失败项时退出码为 1。
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+
+class ConsoleJob:
+    """命令行中的任务对象：提供与任务列表中的任务相同的 report()/check_cancelled() 接口"""
+
+    cancelled = False
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet or not sys.stderr.isatty()
+
+    def report(self, percent, text=""):
+        if not self.quiet:
+            print(f"\r{percent:3d}% {text}".ljust(80), end="", file=sys.stderr, flush=True)
+
+    def check_cancelled(self):
+        pass
+
+    def done(self):
+        if not self.quiet:
+            print(file=sys.stderr)
+
+
+def read_inputs(items, input_file):
+    """合并命令行参数和批量输入文件中的条目"""
+    items = list(items or [])
+    if input_file:
+        f = sys.stdin if input_file == "-" else open(input_file, "r", encoding="utf-8-sig")
+        with f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    items.append(line)
+    return items
+
+
+def log(line):
+    print(line, file=sys.stderr)
+
+
+# ---- 音乐 ----
+
+def cmd_music_search(args):
+    from tools._music_sources import get_source
+    source = get_source(args.source)
+    results = []
+    for keyword in read_inputs(args.keywords, args.input):
+        page = source.search_page(keyword, 0)
+        songs = page["songs"][:args.limit]
+        results.append({"keyword": keyword, "total": page["total"], "songs": songs})
+        if not args.json:
+            print(f"{keyword}（共 {page['total']} 首）")
+            for song in songs:
+                artists = "、".join(a["name"] for a in song.get("artists", []))
+                print(f"  {song['id']}\t{song['name']} - {artists}")
+    return results, True
+
+
+def _music_jobs(source, items):
+    """把输入分成批量下载任务：歌单/专辑链接各一个任务，歌曲ID和歌名各合并为一个任务"""
+    collections, song_ids, names = [], [], []
+    for item in items:
+        try:
+            collections.append(source.parse_collection(item))
+            continue
+        except ValueError:
+            pass
+        if item.startswith("song:") and item[5:].isdigit():
+            song_ids.append(int(item[5:]))
+        elif item.isdigit():
+            song_ids.append(int(item))
+        else:
+            names.append(item)
+    jobs = list(collections)
+    if song_ids:
+        jobs.append(("songs", song_ids))
+    if names:
+        jobs.append(("names", names))
+    return jobs
+
+
+def cmd_music_download(args):
+    from tools._music_bulk import BulkDownloadJob
+    from tools._music_sources import SourceScheduler, get_source
+    from tools._music_tags import TagPipeline
+    from tools._download_events import EventBuffer
+
+    source = get_source(args.source)
+    os.makedirs(args.output, exist_ok=True)
+    tagger = None if args.no_tags else TagPipeline()
+    scheduler = SourceScheduler(args.workers)
+    results = []
+    ok = True
+    try:
+        for kind, value in _music_jobs(source, read_inputs(args.items, args.input)):
+            events = EventBuffer()
+            job = BulkDownloadJob((kind, value), args.output, scheduler=scheduler, sink=events,
+                                  tagger=tagger, music_source=source)
+            stats = job.run()
+            for line in events.drain()[1]:
+                log(line)
+            result = dict(stats, kind=kind, value=value,
+                          failures=[{"name": name, "error": error} for name, error in job.failures])
+            results.append(result)
+            ok = ok and not job.failures
+            if not args.json:
+                print(f"{kind} {value if kind in ('playlist', 'album') else len(value)}: "
+                      f"完成 {stats['done']}/{stats['total']}，跳过 {stats['skipped']}，失败 {stats['failed']}")
+    finally:
+        scheduler.shutdown()
+        if tagger is not None:
+            tagger.shutdown()
+    return results, ok
+
+
+# ---- B站 ----
+
+def cmd_bili_download(args):
+    from tools._bili_download import DownloadTask
+    results = []
+    ok = True
+    for url in read_inputs(args.urls, args.input):
+        task = DownloadTask(url, args.output, args.type, args.mode)
+        try:
+            message = task.run()
+            success = True
+        except Exception as e:
+            message = str(e)
+            success = False
+        for line in task.events.drain()[1]:
+            log(line)
+        results.append({"url": url, "ok": success, "message": message, "files": task.outputs})
+        ok = ok and success
+        if not args.json:
+            print(f"{'[完成]' if success else '[失败]'} {url}: {message}")
+    return results, ok
+
+
+# ---- 视频转音频 ----
+
+def cmd_convert(args):
+    from tools._convert import AudioConverter
+    os.makedirs(args.output, exist_ok=True)
+    converter = AudioConverter(read_inputs(args.files, args.input), args.output)
+    job = ConsoleJob(args.json)
+    try:
+        message = converter.run(job)
+        success = True
+    except Exception as e:
+        message = str(e)
+        success = False
+    job.done()
+    if not args.json:
+        print(message)
+    outputs = [{"input": src, "output": dst} for src, dst in converter.outputs]
+    return {"ok": success, "message": message, "outputs": outputs}, success
+
+
+# ---- 批量重命名 ----
+
+def cmd_rename(args):
+    from tools import _rename as rename
+    job = ConsoleJob(args.json)
+
+    def progress(done, total):
+        job.report(int(done * 100 / total), f"{done}/{total}")
+
+    if args.resume or args.rollback:
+        action = rename.resume if args.resume else rename.rollback
+        count = action(args.folder, progress=progress)
+        job.done()
+        if not args.json:
+            print(f"{'已继续完成' if args.resume else '已撤销'} {count} 步")
+        return {"steps": count}, True
+
+    if args.table:
+        mapping = rename.load_rename_table(args.table)
+    elif args.template or args.pattern:
+        from tools._rename_rules import RenameRule, rule_mapping
+        rule = RenameRule(args.folder, args.template, args.pattern, args.replace, args.start)
+        mapping = rule_mapping(rule, rename.folder_files(args.folder, args.recursive))
+    else:
+        mapping = rename.affix_mapping(rename.folder_files(args.folder, args.recursive), args.prefix, args.suffix)
+    plan = rename.plan_renames(args.folder, mapping)
+    result = {
+        "renames": [{"old": old, "new": new} for old, new in plan.steps],
+        "problems": [{"old": old, "new": new, "error": error} for old, new, error in plan.problems],
+        "count": plan.count,
+    }
+    if not args.json:
+        for old, new, error in plan.problems:
+            print(f"[跳过] {old} -> {new}: {error}")
+    if plan.problems and not args.skip_invalid:
+        log(f"有 {len(plan.problems)} 个文件无法重命名，未做任何修改（使用 --skip-invalid 跳过这些文件）")
+        return result, False
+    if not args.dry_run:
+        try:
+            rename.apply_plan(plan, progress=progress)
+        except rename.RenameError as e:
+            job.done()
+            log(f"重命名失败: {e}\n可以使用 --resume 继续，或使用 --rollback 撤销已完成的部分")
+            return dict(result, error=str(e)), False
+        job.done()
+    if not args.json:
+        for old, new in plan.steps:
+            print(f"{old} -> {new}")
+        print(f"{'将重命名' if args.dry_run else '已重命名'} {plan.count} 个文件")
+    return result, True
+
+
+# ---- 文件夹去重 ----
+
+def cmd_dedup(args):
+    from tools._dedup import find_duplicates, generate_clean_folder
+    job = ConsoleJob(args.json)
+    files_a, files_b, duplicates = find_duplicates(args.folder_a, args.folder_b, not args.no_subfolders,
+                                                   args.content, progress=job.report)
+    job.done()
+    result = {
+        "files_a": len(files_a),
+        "files_b": len(files_b),
+        "duplicate_groups": len({dup['group'] for dup in duplicates}),
+        "duplicates": [{"path_a": dup['path_a'], "path_b": dup['path_b'], "type": dup['duplicate_type']}
+                       for dup in duplicates],
+    }
+    if args.output:
+        output_dir, copied = generate_clean_folder(files_a, files_b, duplicates, args.folder_a, args.folder_b,
+                                                   args.output, prefer_a=not args.prefer_b)
+        result.update(output=output_dir, copied=copied)
+    if not args.json:
+        for dup in duplicates:
+            print(f"{dup['path_a']}\n  = {dup['path_b']}")
+        print(f"文件夹A: {len(files_a)} 个文件，文件夹B: {len(files_b)} 个文件，重复: {result['duplicate_groups']} 组")
+        if args.output:
+            print(f"去重文件夹已生成: {result['output']}（共 {result['copied']} 个文件）")
+    return result, True
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m tools", description="高级工具箱命令行")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    common.add_argument("-i", "--input", help="批量输入文件，每行一项（- 为标准输入）")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    music = commands.add_parser("music", help="音乐搜索和下载").add_subparsers(dest="action", required=True)
+    search = music.add_parser("search", parents=[common], help="搜索歌曲")
+    search.add_argument("keywords", nargs="*", help="关键词")
+    search.add_argument("--limit", type=int, default=10, help="每个关键词显示的结果数")
+    search.add_argument("--source", default="netease", help="音源")
+    search.set_defaults(func=cmd_music_search)
+    download = music.add_parser("download", parents=[common],
+                                help="下载歌单/专辑链接、歌曲ID（song:123）或歌名")
+    download.add_argument("items", nargs="*", help="歌单/专辑链接、歌曲ID或歌名")
+    download.add_argument("-o", "--output", default=".", help="下载目录")
+    download.add_argument("--source", default="netease", help="音源")
+    download.add_argument("--workers", type=int, help="并发下载数（默认取音源的配置）")
+    download.add_argument("--no-tags", action="store_true", help="不写入标签和封面")
+    download.set_defaults(func=cmd_music_download)
+
+    bili = commands.add_parser("bili", help="B站视频下载").add_subparsers(dest="action", required=True)
+    bili_download = bili.add_parser("download", parents=[common], help="下载视频、合集或同步合集/UP主")
+    bili_download.add_argument("urls", nargs="*", help="视频、合集或UP主空间链接")
+    bili_download.add_argument("-o", "--output", default=".", help="保存目录")
+    bili_download.add_argument("--type", choices=["video", "collection", "sync"], default="video", help="下载类型")
+    bili_download.add_argument("--mode", choices=["you-get", "dash", "audio:m4a", "audio:mp3"], default="dash",
+                               help="下载方式")
+    bili_download.set_defaults(func=cmd_bili_download)
+
+    convert = commands.add_parser("convert", parents=[common], help="视频转 MP3")
+    convert.add_argument("files", nargs="*", help="视频文件")
+    convert.add_argument("-o", "--output", default=".", help="输出目录")
+    convert.set_defaults(func=cmd_convert)
+
+    rename = commands.add_parser("rename", parents=[common], help="批量重命名")
+    rename.add_argument("folder", help="文件夹")
+    rename.add_argument("--table", help="包含“原文件名”和“新文件名”两列的 CSV/Excel 表格")
+    rename.add_argument("--prefix", default="", help="前缀（不使用表格时）")
+    rename.add_argument("--suffix", default="", help="后缀（不使用表格时）")
+    rename.add_argument("--template", help="新文件名模板（不含扩展名），如 \"{n:03d}_{name}\"、\"{track:02d} {title}\"")
+    rename.add_argument("--pattern", help="对原文件名做替换的正则表达式")
+    rename.add_argument("--replace", default="", help="正则替换的内容，可用 \\1 引用分组")
+    rename.add_argument("--start", type=int, default=1, help="模板中 {n} 的起始编号")
+    rename.add_argument("-r", "--recursive", action="store_true", help="包含子文件夹中的文件")
+    rename.add_argument("--dry-run", action="store_true", help="只显示重命名计划，不修改文件")
+    rename.add_argument("--skip-invalid", action="store_true", help="跳过无法重命名的文件，重命名其余文件")
+    rename.add_argument("--resume", action="store_true", help="继续上次没有完成的重命名")
+    rename.add_argument("--rollback", action="store_true", help="撤销上次没有完成的重命名")
+    rename.set_defaults(func=cmd_rename)
+
+    dedup = commands.add_parser("dedup", parents=[common], help="比较两个文件夹中的重复文件")
+    dedup.add_argument("folder_a", help="文件夹A")
+    dedup.add_argument("folder_b", help="文件夹B")
+    dedup.add_argument("--content", action="store_true", help="按文件内容比较（哈希）")
+    dedup.add_argument("--no-subfolders", action="store_true", help="不包含子文件夹")
+    dedup.add_argument("--output", help="生成去重文件夹的位置")
+    dedup.add_argument("--prefer-b", action="store_true", help="文件名重复时保留文件夹B中的文件")
+    dedup.set_defaults(func=cmd_dedup)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+    try:
+        result, ok = args.func(args)
+    except (OSError, ValueError, RuntimeError) as e:
+        log(f"错误: {e}")
+        return 1
+    if args.json:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+B站下载任务 - 单个视频、合集和增量同步的下载流程（不依赖 Qt，界面和命令行共用）
+"""
+import os
+import re
+
+from tools._bilibili import episode_id, extract_bvid, extract_mid, find_episode, resolve_collection, resolve_uploader
+from tools._bili_fetch import run_dash, run_you_get
+from tools._download_events import DownloadFinished, DownloadProgress, DownloadStarted, EventBuffer, check_cancelled
+from tools._history import record, reuse_known
+from tools._manifest import DownloadManifest
+
+# you-get 下载结果中记录到下载历史的文件类型
+VIDEO_EXTENSIONS = {".mp4", ".flv", ".mkv", ".webm", ".m4a", ".mp3"}
+
+
+class DownloadTask:
+    """
+    下载任务，由任务管理器在后台线程中运行
+
+    下载函数把本对象当作 sink：事件转发到 events（由界面定时取出），
+    同时记录当前进度供任务列表显示；任务取消后下载函数会尽快停止。
+    """
+
+    def __init__(self, url, output_dir, download_type, fetch_mode="you-get"):
+        self.url = url
+        self.output_dir = os.path.abspath(output_dir)
+        self.download_type = download_type
+        self.fetch_mode = fetch_mode  # you-get / dash / audio:<格式>
+        self.episodes = []
+        self.outputs = []  # 下载（或从下载历史复制）得到的文件
+        self.collection_title = None  # 合集或UP主的名称，记录到下载历史中供批量重命名使用
+        self.events = EventBuffer()  # 进度和日志由界面定时取出
+        self.job = None
+        self._current = (0, 0)  # 当前下载的 (序号, 总数)
+        self._percent = 0
+
+    def push(self, event):
+        if isinstance(event, DownloadStarted):
+            self._current = (event.index, event.count)
+            self._percent = 0
+        elif isinstance(event, DownloadProgress):
+            self._percent = event.percent
+        self.events.push(event)
+
+    def log(self, line):
+        self.events.log(line)
+
+    @property
+    def cancelled(self):
+        return self.job is not None and self.job.cancelled
+
+    def progress(self):
+        """总进度 (百分比, 说明)，供任务列表显示"""
+        current, total = self._current
+        if not total:
+            return self._percent, ""
+        return int(((current - 1) * 100 + self._percent) / total), f"{current}/{total}"
+
+    def run(self, job=None):
+        self.job = job
+        if self.download_type == "sync":
+            return self._sync()
+
+        if self.download_type == "collection":
+            # 通过接口解析合集/分P，结果按BV号缓存
+            collection = resolve_collection(self.url)
+            self.events.log(
+                f"合集: {collection['title']}，共 {len(collection['episodes'])} 个视频"
+            )
+            self.episodes = collection["episodes"]
+            self.collection_title = collection["title"]
+        elif self.fetch_mode == "you-get":
+            self.episodes = [{"url": self.url}]
+        else:
+            self.episodes = [find_episode(self.url)]
+
+        total = len(self.episodes)
+        for idx, episode in enumerate(self.episodes):
+            check_cancelled(self)
+            self._download_single(episode, idx+1, total)
+
+        return "下载完成！"
+
+    def _sync(self):
+        """增量同步：只下载清单中没有的新剧集"""
+        mid = extract_mid(self.url)
+        if mid:
+            key = f"up:{mid}"
+            manifest = DownloadManifest.for_key(self.output_dir, key)
+            collection = resolve_uploader(mid, known_ids=manifest.entries)
+        else:
+            # 同步时跳过缓存，确保拿到最新剧集
+            collection = resolve_collection(self.url, use_cache=False)
+            manifest = DownloadManifest.for_key(self.output_dir, collection["key"])
+        self.collection_title = collection["title"]
+
+        new_episodes = manifest.missing(collection["episodes"], episode_id)
+        self.events.log(
+            f"同步: {collection['title']}，共 {len(collection['episodes'])} 个视频，"
+            f"新增 {len(new_episodes)} 个"
+        )
+
+        total = len(new_episodes)
+        for idx, ep in enumerate(new_episodes):
+            check_cancelled(self)
+            self._download_single(ep, idx+1, total)
+            # 每下载完一集就记录，中断后再次同步不会重复下载
+            manifest.add(episode_id(ep), title=ep["title"], url=ep["url"])
+
+        return f"同步完成！新增 {total} 个视频"
+
+    def _history_source(self, episode):
+        """下载历史中的来源ID：BV号（分P）加下载方式"""
+        if not episode.get("bvid"):
+            # 单个视频用 you-get 下载时只有链接，从链接中取BV号和分P
+            page = re.search(r"[?&]p=(\d+)", episode["url"])
+            episode = {"bvid": extract_bvid(episode["url"]), "page": int(page.group(1)) if page else 1}
+        return f"bilibili:{episode_id(episode)}:{self.fetch_mode}"
+
+    def _history_meta(self, episode):
+        """记录到下载历史中的剧集信息（标题、在合集中的序号、分P），批量重命名可以直接使用"""
+        meta = {"title": episode.get("title"), "index": episode.get("index"), "page": episode.get("page"),
+                "bvid": episode.get("bvid"), "collection": self.collection_title}
+        return {key: value for key, value in meta.items() if value is not None}
+
+    def _download_single(self, episode, current, total):
+        # 下载历史中已有（如下载到了其他目录）时直接复制
+        source = self._history_source(episode)
+        meta = self._history_meta(episode)
+        os.makedirs(self.output_dir, exist_ok=True)
+        reused = reuse_known(source, self.output_dir, tool="video", url=episode["url"], meta=meta)
+        if reused:
+            self.push(DownloadStarted(current, os.path.basename(reused), current, total))
+            self.log(f"下载历史中已有该视频，直接复制: {reused}")
+            self.outputs.append(reused)
+            self.push(DownloadFinished(current, reused, skipped=True))
+            return
+
+        if self.fetch_mode == "you-get":
+            # you-get 自行决定文件名，通过下载前后的文件列表找出新文件
+            before = set(os.listdir(self.output_dir))
+            run_you_get(episode["url"], self.output_dir, self, key=current, index=current, count=total)
+            outputs = [os.path.join(self.output_dir, name) for name in set(os.listdir(self.output_dir)) - before
+                       if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS]
+        else:
+            audio_only = self.fetch_mode.startswith("audio:")
+            audio_format = self.fetch_mode.split(":")[-1] if audio_only else "m4a"
+            outputs = [run_dash(episode, self.output_dir, self, key=current, index=current, count=total,
+                                audio_only=audio_only, audio_format=audio_format)]
+        self.outputs += outputs
+        for path in outputs:
+            record(path, tool="video", source=source, url=episode["url"], meta=meta)
@@ -0,0 +1,206 @@
+"""
+B站视频下载执行 - 调用 you-get，或直接拉取 DASH 音视频流，
+并把进度转换为下载事件
+"""
+import os
+import re
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from tools._bilibili import find_episode, forget_dash_streams, get_dash_streams, session
+from tools._download_events import (
+    DownloadCancelled, DownloadError, DownloadFinished, DownloadProgress, DownloadStarted, check_cancelled
+)
+from tools._files import safe_filename
+
+# you-get 进度行示例: " 45.3% ( 12.3/ 27.2MB) ├███───┤[1/2]  1 MB/s"
+_PERCENT_RE = re.compile(r"^(\d+(?:\.\d+)?)%")
+_SIZE_RE = re.compile(r"\(\s*([\d.]+)/\s*([\d.]+)\s*([KMG]?B)\)")
+_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+def parse_you_get_progress(key, line):
+    """解析 you-get 的进度行，不是进度行时返回 None"""
+    match = _PERCENT_RE.search(line)
+    if not match:
+        return None
+    size = _SIZE_RE.search(line)
+    if size:
+        unit = _UNITS[size.group(3)]
+        return DownloadProgress(key, int(float(size.group(1)) * unit), int(float(size.group(2)) * unit))
+    return DownloadProgress(key, int(float(match.group(1)) * 100), 10000)
+
+
+def run_you_get(url, output_dir, sink, key=None, index=0, count=0):
+    """
+    下载单个视频
+
+    sink 需提供 push(event) 和 log(line) 两个方法（如 EventBuffer），
+    失败时抛出异常。
+    """
+    key = url if key is None else key
+    cmd = [
+        "you-get",
+        "--no-caption",
+        "-o", output_dir,
+        "--debug",
+        url
+    ]
+    sink.log(f"执行命令: {' '.join(cmd)}")
+    sink.push(DownloadStarted(key, url, index, count))
+
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=1,
+        universal_newlines=True,
+        encoding='utf-8',
+        errors='replace'
+    )
+
+    for output in process.stdout:
+        if getattr(sink, "cancelled", False):
+            process.terminate()
+            process.wait()
+            raise DownloadCancelled("下载已取消")
+        line = output.strip()
+        if not line:
+            continue
+        progress = parse_you_get_progress(key, line)
+        if progress is not None:
+            sink.push(progress)
+        else:
+            sink.log(line)
+    process.wait()
+
+    if process.returncode != 0:
+        message = f"下载失败，退出码: {process.returncode}"
+        sink.push(DownloadError(key, message))
+        raise Exception(message)
+    sink.push(DownloadFinished(key, output_dir))
+
+
+# ---------------- DASH 直连下载 ----------------
+
+CHUNK_SIZE = 256 * 1024
+# 仅音频模式支持的输出格式：m4a 直接封装不重新编码，mp3 需要转码
+AUDIO_FORMATS = {
+    "m4a": ["-c:a", "copy"],
+    "mp3": ["-c:a", "libmp3lame", "-q:a", "2"],
+}
+
+
+class _ProgressCounter:
+    """并行下载多路流时汇总字节进度"""
+
+    def __init__(self, sink, key):
+        self.sink = sink
+        self.key = key
+        self.received = 0
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def add_total(self, size):
+        with self._lock:
+            self.total += size
+
+    def add(self, size):
+        with self._lock:
+            self.received += size
+            event = DownloadProgress(self.key, self.received, self.total)
+        self.sink.push(event)
+
+    def discard(self, total, received):
+        """撤销一次失败的下载计入的总大小和已下载字节（换备用地址重新下载前调用）"""
+        with self._lock:
+            self.total -= total
+            self.received -= received
+
+
+def _fetch_stream(stream, path, counter):
+    """下载一路流，主地址失败时依次尝试备用地址"""
+    last_error = None
+    for url in [stream["url"]] + list(stream["backup_urls"]):
+        total = received = 0
+        try:
+            with session().get(url, stream=True) as response:
+                response.raise_for_status()
+                total = int(response.headers.get("Content-Length", 0))
+                counter.add_total(total)
+                with open(path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        check_cancelled(counter.sink)
+                        f.write(chunk)
+                        received += len(chunk)
+                        counter.add(len(chunk))
+            return path
+        except requests.RequestException as e:
+            counter.discard(total, received)
+            last_error = e
+    raise last_error
+
+
+def _run_ffmpeg(args):
+    command = ["ffmpeg", "-y", "-loglevel", "error"] + args
+    result = subprocess.run(command, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    if result.returncode != 0:
+        raise Exception(f"FFmpeg 处理失败: {result.stderr.strip()}")
+
+
+def run_dash(episode, output_dir, sink, key=None, index=0, count=0, audio_only=False, audio_format="m4a"):
+    """
+    直接下载 DASH 流
+
+    audio_only 为 True 时只下载音频流并直接封装为 audio_format；
+    否则音频流和视频流并行下载后无损合并为 mp4。返回输出文件路径。
+    """
+    key = episode["url"] if key is None else key
+    if not episode.get("cid"):
+        episode = find_episode(episode["url"])
+    sink.push(DownloadStarted(key, episode["title"], index, count))
+
+    temp_files = []
+    try:
+        video, audio = get_dash_streams(episode["bvid"], episode["cid"])
+        base = os.path.join(output_dir, safe_filename(episode["title"]))
+        counter = _ProgressCounter(sink, key)
+        audio_tmp = f"{base}.audio.m4s"
+        video_tmp = f"{base}.video.m4s"
+        temp_files = [video_tmp, audio_tmp]
+
+        if audio_only:
+            sink.log(f"仅下载音频流: {episode['title']}")
+            _fetch_stream(audio, audio_tmp, counter)
+            output_path = f"{base}.{audio_format}"
+            _run_ffmpeg(["-i", audio_tmp, "-vn"] + AUDIO_FORMATS[audio_format] + [output_path])
+        else:
+            if video is None:
+                raise RuntimeError("该视频没有视频流")
+            sink.log(f"并行下载音视频流: {episode['title']}")
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                futures = [
+                    pool.submit(_fetch_stream, video, video_tmp, counter),
+                    pool.submit(_fetch_stream, audio, audio_tmp, counter),
+                ]
+                for future in futures:
+                    future.result()
+            output_path = f"{base}.mp4"
+            _run_ffmpeg(["-i", video_tmp, "-i", audio_tmp, "-c", "copy", output_path])
+    except DownloadCancelled:
+        raise
+    except Exception as e:
+        forget_dash_streams(episode["bvid"], episode["cid"])
+        sink.push(DownloadError(key, str(e)))
+        raise
+    finally:
+        # 成功、失败或取消都删除临时的音视频流
+        for path in temp_files:
+            if os.path.exists(path):
+                os.remove(path)
+
+    sink.push(DownloadFinished(key, output_path))
+    return output_path
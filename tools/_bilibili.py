@@ -0,0 +1,315 @@
+"""
+B站接口封装 - 合集/分P/UP主投稿 解析（带缓存）
+
+优先调用 view 接口，一次请求即可拿到整个合集（ugc_season）的所有剧集；
+接口被风控时退回解析页面中内嵌的 window.__INITIAL_STATE__ JSON，
+不再依赖页面布局相关的 XPath。
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from urllib.parse import urlencode
+
+import requests
+
+from tools._cache import PersistentCache
+from tools._http import SharedSession
+
+# 请求头信息
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Referer": "https://www.bilibili.com/",
+}
+# 接口地址（可通过环境变量指向本地模拟服务器）
+API_BASE = os.environ.get("TOOLSBOX_BILIBILI_API", "https://api.bilibili.com")
+WEB_BASE = os.environ.get("TOOLSBOX_BILIBILI_WEB", "https://www.bilibili.com")
+VIEW_API = API_BASE + "/x/web-interface/view"
+PLAYURL_API = API_BASE + "/x/player/playurl"
+
+# 共享会话：解析接口和 DASH 流下载共用连接池
+session = SharedSession(pool_size=8, headers=HEADERS)
+
+# 合集解析结果、DASH 流地址缓存时间（秒）；流地址带有效期，只缓存较短时间
+COLLECTION_TTL = 6 * 3600
+PLAYURL_TTL = 20 * 60
+
+_collection_cache = PersistentCache("bilibili_collections", COLLECTION_TTL)
+_playurl_cache = PersistentCache("bilibili_playurl", PLAYURL_TTL)
+
+
+def extract_bvid(url):
+    """从链接中提取 BV 号"""
+    match = re.search(r"(BV[0-9A-Za-z]{10})", url)
+    if not match:
+        raise ValueError(f"无法从链接中识别BV号: {url}")
+    return match.group(1)
+
+
+def video_url(bvid, page=None):
+    """拼接视频网址"""
+    url = f"{WEB_BASE}/video/{bvid}"
+    return f"{url}?p={page}" if page and page > 1 else url
+
+
+def _fetch_view(bvid):
+    """调用 view 接口获取视频信息"""
+    response = session().get(VIEW_API, params={"bvid": bvid})
+    response.raise_for_status()
+    result = response.json()
+    if result.get("code") != 0:
+        raise RuntimeError(f"view 接口返回错误: {result.get('code')} {result.get('message')}")
+    return result["data"]
+
+
+def _fetch_initial_state(bvid):
+    """接口不可用时，解析页面内嵌的 __INITIAL_STATE__"""
+    response = session().get(video_url(bvid))
+    response.raise_for_status()
+    match = re.search(r"window\.__INITIAL_STATE__\s*=\s*(\{.*?\});\s*\(function", response.text, re.S)
+    if not match:
+        raise RuntimeError("页面中未找到 __INITIAL_STATE__ 数据")
+    state = json.loads(match.group(1))
+    data = state.get("videoData") or {}
+    if "ugc_season" not in data and state.get("sectionsInfo"):
+        data["ugc_season"] = state["sectionsInfo"]
+    return data
+
+
+def _episodes_from_view(data):
+    """把 view 数据转换为剧集列表"""
+    episodes = []
+    season = data.get("ugc_season")
+    if season:
+        for section in season.get("sections", []):
+            for ep in section.get("episodes", []):
+                pages = ep.get("pages") or [ep.get("page") or {}]
+                for page in pages:
+                    page_no = page.get("page", 1)
+                    title = ep.get("title", "")
+                    if len(pages) > 1:
+                        title = f"{title} - {page.get('part', page_no)}"
+                    episodes.append({
+                        "bvid": ep["bvid"],
+                        "cid": page.get("cid") or ep.get("cid"),
+                        "page": page_no,
+                        "title": title,
+                        "duration": page.get("duration") or ep.get("arc", {}).get("duration", 0),
+                    })
+    else:
+        # 没有合集时按分P处理
+        for page in data.get("pages", []):
+            episodes.append({
+                "bvid": data["bvid"],
+                "cid": page["cid"],
+                "page": page["page"],
+                "title": page.get("part") or data.get("title", ""),
+                "duration": page.get("duration", 0),
+            })
+
+    for index, ep in enumerate(episodes, 1):
+        ep["index"] = index
+        ep["url"] = video_url(ep["bvid"], ep["page"])
+    return episodes
+
+
+def resolve_collection(url, use_cache=True):
+    """
+    解析合集（或分P视频）的剧集列表
+
+    返回 {"key", "title", "episodes": [{"bvid", "cid", "page", "title", "duration", "index", "url"}]}；
+    解析不到任何剧集时抛出 RuntimeError（不写入缓存）。
+    """
+    bvid = extract_bvid(url)
+    if use_cache:
+        cached = _collection_cache.get(f"bv:{bvid}")
+        if cached:
+            collection = _collection_cache.get(cached["key"])
+            if collection and collection["episodes"]:
+                return collection
+
+    try:
+        data = _fetch_view(bvid)
+    except (requests.RequestException, RuntimeError, ValueError):
+        data = _fetch_initial_state(bvid)
+
+    season = data.get("ugc_season")
+    if season:
+        key = f"season:{season['id']}"
+        title = season.get("title", "")
+    else:
+        key = f"video:{bvid}"
+        title = data.get("title", "")
+    collection = {"key": key, "title": title, "episodes": _episodes_from_view(data)}
+    if not collection["episodes"]:
+        # 页面解析也失败时 data 为空，不能当成没有视频的合集缓存下来
+        raise RuntimeError(f"未能解析合集中的视频: {url}")
+
+    # 合集中任意一集的BV号都指向同一份缓存
+    items = {f"bv:{ep['bvid']}": {"key": key} for ep in collection["episodes"]}
+    items[key] = collection
+    _collection_cache.set_many(items)
+    return collection
+
+
+def find_episode(url):
+    """获取链接对应的单个剧集（带 cid），复用合集解析缓存"""
+    bvid = extract_bvid(url)
+    match = re.search(r"[?&]p=(\d+)", url)
+    page = int(match.group(1)) if match else 1
+    for ep in resolve_collection(url)["episodes"]:
+        if ep["bvid"] == bvid and ep["page"] == page:
+            return ep
+    raise RuntimeError(f"未找到视频信息: {url}")
+
+
+def get_dash_streams(bvid, cid, use_cache=True):
+    """
+    获取 DASH 音视频流地址
+
+    返回 (video, audio)，均为 {"url", "backup_urls", "bandwidth", "codecs"}；
+    视频优先选择兼容性最好的 AVC 编码中画质最高的一路。
+    """
+    cache_key = f"{bvid}:{cid}"
+    if use_cache:
+        cached = _playurl_cache.get(cache_key)
+        if cached is not None:
+            return tuple(cached)
+    streams = _fetch_dash_streams(bvid, cid)
+    _playurl_cache.set(cache_key, list(streams))
+    return streams
+
+
+def forget_dash_streams(bvid, cid):
+    """缓存的流地址下载失败时调用，下次重新获取"""
+    _playurl_cache.delete(f"{bvid}:{cid}")
+
+
+def _fetch_dash_streams(bvid, cid):
+    params = {"bvid": bvid, "cid": cid, "fnval": 16, "fourk": 1, "qn": 120}
+    response = session().get(PLAYURL_API, params=params)
+    response.raise_for_status()
+    result = response.json()
+    if result.get("code") != 0:
+        raise RuntimeError(f"playurl 接口返回错误: {result.get('code')} {result.get('message')}")
+    dash = result["data"].get("dash")
+    if not dash:
+        raise RuntimeError("该视频没有 DASH 流，请改用 you-get 下载")
+
+    def to_stream(item):
+        return {
+            "url": item.get("baseUrl") or item.get("base_url"),
+            "backup_urls": item.get("backupUrl") or item.get("backup_url") or [],
+            "bandwidth": item.get("bandwidth", 0),
+            "codecs": item.get("codecs", ""),
+        }
+
+    videos = dash.get("video") or []
+    avc = [v for v in videos if v.get("codecid") == 7] or videos
+    video = max(avc, key=lambda v: (v.get("id", 0), v.get("bandwidth", 0)), default=None)
+    audio = max(dash.get("audio") or [], key=lambda a: a.get("bandwidth", 0), default=None)
+    if audio is None:
+        raise RuntimeError("该视频没有音频流")
+    return (to_stream(video) if video else None), to_stream(audio)
+
+
+# ---------------- UP主投稿列表 ----------------
+
+NAV_API = API_BASE + "/x/web-interface/nav"
+SPACE_ARC_API = API_BASE + "/x/space/wbi/arc/search"
+
+# WBI 签名所用的混淆表
+_MIXIN_KEY_TABLE = [
+    46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49,
+    33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40,
+    61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
+    36, 20, 34, 44, 52,
+]
+_wbi_cache = PersistentCache("bilibili_wbi", 12 * 3600)
+
+
+def extract_mid(url):
+    """从UP主空间链接中提取 mid，不是空间链接时返回 None"""
+    match = re.search(r"space\.bilibili\.com/(\d+)", url)
+    return match.group(1) if match else None
+
+
+def _wbi_mixin_key():
+    """获取 WBI 签名密钥（每天变化，缓存半天）"""
+    key = _wbi_cache.get("mixin_key")
+    if key:
+        return key
+    response = session().get(NAV_API)
+    response.raise_for_status()
+    wbi_img = response.json()["data"]["wbi_img"]
+    raw = "".join(
+        url.rsplit("/", 1)[-1].split(".")[0]
+        for url in (wbi_img["img_url"], wbi_img["sub_url"])
+    )
+    key = "".join(raw[i] for i in _MIXIN_KEY_TABLE)[:32]
+    _wbi_cache.set("mixin_key", key)
+    return key
+
+
+def _sign_wbi(params):
+    """为请求参数添加 WBI 签名"""
+    params = dict(params, wts=int(time.time()))
+    query = urlencode({
+        k: "".join(c for c in str(v) if c not in "!'()*")
+        for k, v in sorted(params.items())
+    })
+    params["w_rid"] = hashlib.md5((query + _wbi_mixin_key()).encode()).hexdigest()
+    return params
+
+
+def resolve_uploader(mid, known_ids=(), page_size=50):
+    """
+    获取UP主的投稿列表（按发布时间从新到旧）
+
+    遇到一整页都已在 known_ids 中时停止翻页，增量同步只需请求第一页。
+    返回 {"key", "title", "episodes": [...]}，剧集字段与 resolve_collection 一致
+    """
+    known_ids = set(known_ids)
+    episodes = []
+    title = ""
+    page = 1
+    while True:
+        params = _sign_wbi({"mid": mid, "ps": page_size, "pn": page, "order": "pubdate"})
+        response = session().get(SPACE_ARC_API, params=params)
+        response.raise_for_status()
+        result = response.json()
+        if result.get("code") != 0:
+            raise RuntimeError(f"投稿列表接口返回错误: {result.get('code')} {result.get('message')}")
+
+        vlist = result["data"]["list"]["vlist"]
+        for item in vlist:
+            title = title or item.get("author", "")
+            episodes.append({
+                "bvid": item["bvid"],
+                "cid": None,
+                "page": 1,
+                "title": item.get("title", ""),
+                "duration": item.get("length", ""),
+            })
+
+        total = result["data"]["page"]["count"]
+        if not vlist or page * page_size >= total:
+            break
+        if all(item["bvid"] in known_ids for item in vlist):
+            break
+        page += 1
+
+    # 按发布时间从旧到新编号
+    episodes.reverse()
+    for index, ep in enumerate(episodes, 1):
+        ep["index"] = index
+        ep["url"] = video_url(ep["bvid"])
+    return {"key": f"up:{mid}", "title": title, "episodes": episodes}
+
+
+def episode_id(episode):
+    """剧集唯一标识，分P视频按页区分"""
+    if episode.get("page", 1) > 1:
+        return f"{episode['bvid']}:p{episode['page']}"
+    return episode["bvid"]
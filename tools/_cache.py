@@ -0,0 +1,184 @@
+"""
+缓存工具 - 带过期时间（TTL）的 SQLite 持久化缓存和内存 LRU 缓存
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from tools._settings import CACHE_DIR, ensure_dir, get_setting
+
+
+# 持久化缓存数据库（所有命名空间共用，图形界面和命令行等多个进程可同时使用）
+CACHE_DB = CACHE_DIR / "cache.sqlite3"
+# 缓存总大小上限（配置项 cache.max_mb），超过后淘汰最久未使用的条目
+CACHE_MAX_BYTES = get_setting("cache.max_mb", 64) * 1024 * 1024
+# 每写入多少条检查一次总大小
+EVICT_CHECK_INTERVAL = 100
+
+
+class _CacheDB:
+    """SQLite 缓存库：进程内共用一个连接，多进程通过 WAL 模式共享"""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = EVICT_CHECK_INTERVAL  # 第一次写入时检查一次
+
+    def _connect(self):
+        if self._conn is None:
+            ensure_dir(self.path.parent)
+            conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " namespace TEXT, key TEXT, value TEXT, expires REAL, accessed REAL, size INTEGER,"
+                " PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, namespace, keys):
+        """读取多个条目，返回 {key: value}，不含不存在或已过期的条目"""
+        now = time.time()
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            keys = list(keys)
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, value FROM entries WHERE namespace = ? AND expires >= ?"
+                    f" AND key IN ({','.join('?' * len(batch))})",
+                    [namespace, now] + batch,
+                ).fetchall()
+                if rows:
+                    # 记录访问时间，用于淘汰
+                    conn.execute(
+                        f"UPDATE entries SET accessed = ? WHERE namespace = ?"
+                        f" AND key IN ({','.join('?' * len(rows))})",
+                        [now, namespace] + [key for key, _ in rows],
+                    )
+                found.update(rows)
+        return {key: json.loads(value) for key, value in found.items()}
+
+    def set_many(self, namespace, items, ttl):
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            value = json.dumps(value, ensure_ascii=False)
+            rows.append((namespace, key, value, now + ttl, now, len(key) + len(value)))
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._writes += len(rows)
+            if self._writes >= EVICT_CHECK_INTERVAL:
+                self._writes = 0
+                self._evict(conn)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._connect().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def _evict(self, conn):
+        """清理过期条目；总大小超过上限时按最近访问时间淘汰到上限的 90%"""
+        conn.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes * 0.9
+        victims = []
+        for namespace, key, size in conn.execute("SELECT namespace, key, size FROM entries ORDER BY accessed"):
+            victims.append((namespace, key))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", victims)
+
+
+_db = _CacheDB(CACHE_DB, CACHE_MAX_BYTES)
+
+
+class PersistentCache:
+    """
+    保存在 SQLite 缓存库中的缓存，按命名空间区分，每个命名空间有自己的过期时间
+
+    缓存出错（如磁盘已满、数据库被锁）时只记录警告，读取返回未命中，不影响正常请求。
+    """
+
+    def __init__(self, namespace, ttl, db=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.db = db or _db
+
+    def get(self, key):
+        """读取缓存，不存在或已过期时返回 None"""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """批量读取缓存，返回命中的 {key: value}"""
+        try:
+            return self.db.get_many(self.namespace, keys)
+        except sqlite3.Error as e:
+            logging.warning(f"读取缓存失败: {self.namespace} - {e}")
+            return {}
+
+    def set_many(self, items, ttl=None):
+        """批量写入缓存，在一个事务中完成"""
+        try:
+            self.db.set_many(self.namespace, items, self.ttl if ttl is None else ttl)
+        except sqlite3.Error as e:
+            logging.warning(f"写入缓存失败: {self.namespace} - {e}")
+
+    def set(self, key, value, ttl=None):
+        """写入缓存"""
+        self.set_many({key: value}, ttl)
+
+    def delete(self, key):
+        """删除缓存（如缓存的地址已失效）"""
+        try:
+            self.db.delete(self.namespace, key)
+        except sqlite3.Error as e:
+            logging.warning(f"删除缓存失败: {self.namespace} - {e}")
+
+
+class LRUCache:
+    """线程安全的内存缓存，超过容量时淘汰最久未使用的条目，条目带过期时间"""
+
+    def __init__(self, maxsize=256, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        """读取缓存，不存在或已过期时返回 None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
@@ -0,0 +1,127 @@
+"""
+视频转音频 - 调用 ffmpeg 批量转换（不依赖 Qt，界面和命令行共用）
+"""
+import os
+import subprocess
+
+from tools._history import cached_hash, file_hash, find_source, find_tool, record, reuse_file
+
+SOURCE_PREFIX = "convert:mp3:"  # 来源ID：前缀加输入文件的内容哈希
+
+
+class AudioConverter:
+    """转换任务，由任务管理器在后台线程中运行，进度通过 job.report() 更新"""
+
+    def __init__(self, input_paths, output_dir):
+        self.input_paths = list(input_paths)
+        self.output_dir = output_dir
+        self.total_files = len(self.input_paths)
+        self.processed_files = 0
+        self.outputs = []  # [(输入文件, 输出文件)]
+        self._previous = None  # 输入文件大小 -> [(之前转换的输出文件, 记录的信息)]，第一次查询时读取
+
+    def _candidates(self, size):
+        """之前转换过的、输入文件大小相同的记录"""
+        if self._previous is None:
+            self._previous = {}
+            for path, meta in find_tool("convert"):
+                self._previous.setdefault(meta.get("input_size"), []).append((path, meta))
+        return self._previous.setdefault(size, [])
+
+    @staticmethod
+    def _input_hash(meta):
+        """记录中输入文件的内容哈希；没有记录时，输入文件未变化才计算"""
+        if meta.get("input_hash"):
+            return meta["input_hash"]
+        try:
+            stat = os.stat(meta["input"])
+        except (KeyError, OSError):
+            return None
+        if stat.st_size != meta.get("input_size") or stat.st_mtime != meta.get("input_mtime"):
+            return None
+        return file_hash(meta["input"])
+
+    def _find_previous(self, input_path, stat):
+        """
+        之前转换过同一内容时返回 (输出文件, 输入文件哈希)，没有时输出文件为 None
+
+        先按路径、大小和修改时间查找；只有存在大小相同的记录时才计算输入文件的哈希，
+        新文件不会在转换前被完整读一遍。
+        """
+        candidates = self._candidates(stat.st_size)
+        for path, meta in candidates:
+            if meta.get("input") == input_path and meta.get("input_mtime") == stat.st_mtime:
+                return path, meta.get("input_hash")
+        # 哈希已经算过（如旧版本转换时）不需要再读文件，按来源ID查询
+        content_hash = cached_hash(input_path)
+        if content_hash is not None:
+            known = find_source(SOURCE_PREFIX + content_hash)
+            if known:
+                return known, content_hash
+        if not candidates:
+            return None, content_hash
+        if content_hash is None:
+            content_hash = file_hash(input_path)
+        for path, meta in candidates:
+            if self._input_hash(meta) == content_hash:
+                return path, content_hash
+        return None, content_hash
+
+    def run(self, job):
+        try:
+            for index, input_path in enumerate(self.input_paths):
+                job.check_cancelled()
+                if not os.path.exists(input_path):
+                    continue
+                
+                # 更新进度
+                self.processed_files = index + 1
+                filename = os.path.basename(input_path)
+                job.report(
+                    int((self.processed_files / self.total_files) * 100),
+                    f"正在转换: {filename}"
+                )
+                
+                # 生成输出路径
+                output_name = os.path.splitext(filename)[0] + ".mp3"
+                output_path = os.path.join(self.output_dir, output_name)
+
+                # 同一内容转换过时直接复制之前的结果
+                stat = os.stat(input_path)
+                known, content_hash = self._find_previous(os.path.abspath(input_path), stat)
+                meta = {"input": os.path.abspath(input_path), "input_size": stat.st_size,
+                        "input_mtime": stat.st_mtime}
+                if content_hash:
+                    meta["input_hash"] = content_hash
+                source = SOURCE_PREFIX + content_hash if content_hash else None
+                if known:
+                    reuse_file(known, output_path, tool="convert", source=source, meta=meta)
+                    self._candidates(stat.st_size).append((os.path.abspath(output_path), meta))
+                    self.outputs.append((input_path, output_path))
+                    continue
+                
+                # 使用FFmpeg转换
+                command = [
+                    "ffmpeg",
+                    "-i", input_path,
+                    "-vn",          # 禁用视频流
+                    "-acodec", "libmp3lame",  # 使用MP3编码
+                    "-q:a", "2",    # 音频质量（0-9，0为最高质量）
+                    "-y",           # 覆盖输出文件
+                    output_path
+                ]
+                subprocess.run(
+                    command,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    check=True
+                )
+                record(output_path, tool="convert", source=source, meta=meta)
+                self._candidates(stat.st_size).append((os.path.abspath(output_path), meta))
+                self.outputs.append((input_path, output_path))
+            
+            return f"成功转换 {self.processed_files}/{self.total_files} 个文件"
+        except Exception as e:
+            if job.cancelled:
+                raise
+            raise Exception(f"转换失败: {str(e)}") from e
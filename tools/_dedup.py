@@ -0,0 +1,235 @@
+"""
+文件夹去重 - 比较两个文件夹、生成去重文件夹的核心逻辑（不依赖 Qt，界面和命令行共用）
+
+遍历文件夹和计算哈希在进程池（tools._procs）中并行执行；
+下载历史中已有有效哈希的文件不再计算，新算出的哈希写回历史。
+"""
+import os
+import shutil
+from collections import defaultdict
+
+from tools import _procs as procs
+from tools._history import cached_hash, hash_file, remember_hash
+
+# 每个哈希任务最多包含的文件数和总字节数，任务越小进度越平滑、取消越及时
+HASH_BATCH_FILES = 64
+HASH_BATCH_BYTES = 256 * 1024 * 1024
+# 遍历文件夹时每找到多少个文件报告一次进度
+WALK_REPORT_EVERY = 500
+
+
+def list_files(folder_path, include_subfolders=True, with_size=False):
+    """获取文件夹中的所有文件（包括子文件夹），可在子进程中运行"""
+    all_files = []
+
+    if not folder_path or not os.path.exists(folder_path):
+        return all_files
+
+    def add(file_path, file_name, relative_path):
+        info = {
+            'name': file_name,
+            'full_path': file_path,
+            'relative_path': relative_path,
+            'source_folder': folder_path
+        }
+        if with_size:
+            info['size'] = os.path.getsize(file_path)
+        all_files.append(info)
+        if len(all_files) % WALK_REPORT_EVERY == 0:
+            procs.report(len(all_files))
+
+    if include_subfolders:
+        for root, dirs, files in os.walk(folder_path):
+            for file_name in files:
+                file_path = os.path.join(root, file_name)
+                # 相对路径用于显示和比较
+                add(file_path, file_name, os.path.relpath(file_path, folder_path))
+    else:
+        for file_name in os.listdir(folder_path):
+            file_path = os.path.join(folder_path, file_name)
+            if os.path.isfile(file_path):
+                add(file_path, file_name, file_name)
+    return all_files
+
+
+def hash_files(paths):
+    """计算一批文件的哈希，返回 [(路径, 哈希)]，可在子进程中运行"""
+    results = []
+    for path in paths:
+        results.append((path, hash_file(path)))
+        procs.report(1)
+    return results
+
+
+def _batches(files):
+    batch, batch_bytes = [], 0
+    for info in files:
+        batch.append(info['full_path'])
+        batch_bytes += info['size']
+        if len(batch) >= HASH_BATCH_FILES or batch_bytes >= HASH_BATCH_BYTES:
+            yield batch
+            batch, batch_bytes = [], 0
+    if batch:
+        yield batch
+
+
+def compare_by_name(files_a, files_b):
+    """按相对路径比较，返回重复文件对列表"""
+    path_to_files_a = defaultdict(list)
+    path_to_files_b = defaultdict(list)
+    for file_info in files_a:
+        path_to_files_a[file_info['relative_path']].append(file_info)
+    for file_info in files_b:
+        path_to_files_b[file_info['relative_path']].append(file_info)
+
+    duplicates = []
+    for path in set(path_to_files_a.keys()) & set(path_to_files_b.keys()):
+        for file_a in path_to_files_a[path]:
+            for file_b in path_to_files_b[path]:
+                duplicates.append({
+                    'name': file_a['name'],
+                    'path_a': file_a['full_path'],
+                    'path_b': file_b['full_path'],
+                    'relative_path': path,
+                    'group': path,
+                    'duplicate_type': '文件名重复'
+                })
+    return duplicates
+
+
+def compare_by_content(files_a, files_b, check_cancelled=None, progress=None):
+    """
+    按文件内容比较：先按大小分组，只有大小相同的文件才计算哈希
+
+    files_a/files_b 需包含 'size'（list_files(..., with_size=True)）。
+    progress(已完成数, 总数) 在其他线程中调用。
+    """
+    sizes_a = defaultdict(list)
+    sizes_b = defaultdict(list)
+    for file_info in files_a:
+        sizes_a[file_info['size']].append(file_info)
+    for file_info in files_b:
+        sizes_b[file_info['size']].append(file_info)
+
+    candidates = []
+    for size in set(sizes_a.keys()) & set(sizes_b.keys()):
+        candidates += sizes_a[size] + sizes_b[size]
+
+    hashes = {}
+    to_hash = []
+    for file_info in candidates:
+        content_hash = cached_hash(file_info['full_path'])
+        if content_hash:
+            hashes[file_info['full_path']] = content_hash
+        else:
+            to_hash.append(file_info)
+
+    done = [len(hashes)]
+
+    def advance(count):
+        done[0] += count
+        if progress is not None:
+            progress(done[0], len(candidates))
+
+    futures = [procs.submit(hash_files, batch, progress=advance) for batch in _batches(to_hash)]
+    for results in procs.wait_all(futures, check_cancelled):
+        for path, content_hash in results:
+            hashes[path] = content_hash
+            remember_hash(path, content_hash)
+
+    hashes_a = defaultdict(list)
+    hashes_b = defaultdict(list)
+    for files, by_hash in ((files_a, hashes_a), (files_b, hashes_b)):
+        for file_info in files:
+            content_hash = hashes.get(file_info['full_path'])
+            if content_hash:
+                by_hash[content_hash].append(file_info)
+
+    duplicates = []
+    for content_hash in set(hashes_a.keys()) & set(hashes_b.keys()):
+        for file_a in hashes_a[content_hash]:
+            for file_b in hashes_b[content_hash]:
+                duplicates.append({
+                    'name': file_a['name'],
+                    'path_a': file_a['full_path'],
+                    'path_b': file_b['full_path'],
+                    'relative_path': file_a['relative_path'],
+                    'relative_path_b': file_b['relative_path'],
+                    'group': content_hash,
+                    'duplicate_type': '内容重复'
+                })
+    return duplicates
+
+
+def find_duplicates(folder_a, folder_b, include_subfolders=True, by_content=False,
+                    check_cancelled=None, progress=None):
+    """
+    比较两个文件夹，返回 (文件夹A的文件, 文件夹B的文件, 重复文件对)
+
+    两个文件夹在不同子进程中同时遍历。progress(百分比, 说明) 在其他线程中调用。
+    """
+    report = progress or (lambda percent, text: None)
+    found = {}
+
+    def walked(folder):
+        def update(count):
+            found[folder] = count
+            report(0, f"已找到 {sum(found.values())} 个文件")
+        return update
+
+    futures = [procs.submit(list_files, folder, include_subfolders, by_content, progress=walked(folder))
+               for folder in (folder_a, folder_b)]
+    files_a, files_b = procs.wait_all(futures, check_cancelled)
+
+    if by_content:
+        def hashed(done, total):
+            report(int(done * 100 / total), f"计算哈希 {done}/{total}")
+        duplicates = compare_by_content(files_a, files_b, check_cancelled, hashed)
+    else:
+        duplicates = compare_by_name(files_a, files_b)
+    return files_a, files_b, duplicates
+
+
+def excluded_files(duplicates):
+    """生成去重文件夹时不保留的文件（重复文件对中的两个文件）"""
+    excluded = set()
+    for dup in duplicates:
+        excluded.add(dup['path_a'])
+        excluded.add(dup['path_b'])
+    return excluded
+
+
+def generate_clean_folder(files_a, files_b, duplicates, folder_a, folder_b, output_folder, prefer_a=True):
+    """在 output_folder 下生成“去重结果”文件夹，返回 (输出路径, 复制的文件数)"""
+    output_dir = os.path.join(output_folder, "去重结果")
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.makedirs(output_dir)
+
+    excluded = excluded_files(duplicates)
+    # 合并所有不重复的文件并创建文件夹结构映射
+    all_files = [f for f in files_a + files_b if f['full_path'] not in excluded]
+    files_by_path = {}
+
+    # 按照Windows复制逻辑处理文件
+    for file_info in all_files:
+        relative_path = file_info['relative_path']
+
+        # 如果这个路径已经有文件了，说明有重复
+        if relative_path in files_by_path:
+            # 根据用户选择决定保留哪个文件
+            if prefer_a and file_info['source_folder'] == folder_a:
+                files_by_path[relative_path] = file_info
+            elif not prefer_a and file_info['source_folder'] == folder_b:
+                files_by_path[relative_path] = file_info
+        else:
+            files_by_path[relative_path] = file_info
+
+    # 复制所有不重复的文件，保持文件夹结构
+    files_copied = 0
+    for relative_path, file_info in files_by_path.items():
+        dst_path = os.path.join(output_dir, relative_path)
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        shutil.copy2(file_info['full_path'], dst_path)
+        files_copied += 1
+    return output_dir, files_copied
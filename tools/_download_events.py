@@ -0,0 +1,99 @@
+"""
+下载事件 - 工作线程与界面之间的结构化进度通道
+
+工作线程只往 EventBuffer 里写事件，界面用定时器按固定帧率取出：
+同一任务的多条进度合并为最新一条，日志保存在有限长度的环形缓冲区中，
+无论下载多快，界面刷新的开销都是固定的。
+sink 可以额外提供 cancelled 属性，下载函数在读取数据的过程中检查，取消后尽快停止。
+"""
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+
+# 界面刷新帧率与日志保留行数
+UI_FPS = 20
+LOG_MAX_LINES = 2000
+
+
+@dataclass
+class DownloadStarted:
+    key: object
+    name: str
+    index: int = 0
+    count: int = 0
+
+
+@dataclass
+class DownloadProgress:
+    key: object
+    received: int
+    total: int
+
+    @property
+    def percent(self):
+        return int(self.received * 100 / self.total) if self.total else 0
+
+
+@dataclass
+class DownloadFinished:
+    key: object
+    path: str = ""
+    skipped: bool = False  # 已下载过，本次跳过
+
+
+@dataclass
+class DownloadError:
+    key: object
+    message: str
+
+
+class DownloadCancelled(Exception):
+    """下载被取消（sink 的 cancelled 属性为 True 时由下载函数抛出）"""
+
+
+def check_cancelled(sink):
+    """sink 提供 cancelled 属性且已取消时抛出 DownloadCancelled"""
+    if getattr(sink, "cancelled", False):
+        raise DownloadCancelled("下载已取消")
+
+
+class EventBuffer:
+    """线程安全的事件缓冲区"""
+
+    def __init__(self, log_lines=LOG_MAX_LINES):
+        self._lock = threading.Lock()
+        self._events = []
+        self._progress = OrderedDict()
+        self._logs = deque(maxlen=log_lines)
+
+    def push(self, event):
+        with self._lock:
+            if isinstance(event, DownloadProgress):
+                # 进度事件只保留每个任务的最新一条
+                self._progress[event.key] = event
+            else:
+                self._flush_progress()
+                self._events.append(event)
+
+    def log(self, line):
+        with self._lock:
+            self._logs.append(line)
+
+    def _flush_progress(self):
+        """
+        非进度事件之前先放入所有任务积压的最新进度，保证顺序
+
+        否则上一个任务的进度会排在下一个任务的 DownloadStarted 之后，新任务显示上一个任务的百分比。
+        """
+        self._events.extend(self._progress.values())
+        self._progress.clear()
+
+    def drain(self):
+        """取出积压的事件和日志，返回 (events, log_lines)"""
+        with self._lock:
+            events = self._events + list(self._progress.values())
+            logs = list(self._logs)
+            self._events = []
+            self._progress.clear()
+            self._logs.clear()
+        return events, logs
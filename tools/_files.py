@@ -0,0 +1,9 @@
+"""
+文件工具 - 文件名清理等
+"""
+import re
+
+
+def safe_filename(name):
+    """去掉文件名中的非法字符"""
+    return re.sub(r'[\\/:*?"<>|\r\n]', "_", name).strip() or "untitled"
@@ -0,0 +1,261 @@
+"""
+下载历史 - 所有工具共用的产出文件记录（SQLite）
+
+记录每个产出文件的来源ID、链接、内容哈希、大小和路径。各工具在请求网络或转码之前先查询，
+已经在其他目录下载/转换过的内容直接复制；去重工具用其中的哈希避免重复计算。
+文件的大小或修改时间变化后，旧记录自动失效。
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from tools._settings import DATA_DIR, ensure_dir
+
+HISTORY_DB = DATA_DIR / "history.sqlite3"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class History:
+    """下载历史库，进程内共用一个连接，多进程通过 WAL 模式共享"""
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            ensure_dir(self.path.parent)
+            conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT,"
+                " tool TEXT, source TEXT, url TEXT, meta TEXT, created REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS files_source ON files (source)")
+            conn.execute("CREATE INDEX IF NOT EXISTS files_hash ON files (hash)")
+            # 不是下载/转换产出的文件（如去重时比较的文件）的哈希单独保存，不混入下载历史
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS hashes ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    @staticmethod
+    def _matches(path, size, mtime):
+        """记录的大小和修改时间与文件一致时，认为记录仍然有效"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return stat.st_size == size and stat.st_mtime == mtime
+
+    def record(self, path, tool=None, source=None, url=None, meta=None, content_hash=None):
+        """记录产出文件，未给出哈希时计算；返回内容哈希"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        if content_hash is None:
+            content_hash = hash_file(path)
+        self._execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime, content_hash, tool, source, url,
+             json.dumps(meta, ensure_ascii=False) if meta else None, time.time()),
+        )
+        return content_hash
+
+    def find_source(self, source):
+        """返回来源ID对应的、仍然完整存在的文件路径，没有时返回 None"""
+        rows = self._execute(
+            "SELECT path, size, mtime FROM files WHERE source = ? ORDER BY created DESC", (source,)
+        )
+        for path, size, mtime in rows:
+            if self._matches(path, size, mtime):
+                return path
+        return None
+
+    def find_tool(self, tool):
+        """工具产出的、仍然完整存在的文件，返回 [(路径, 记录的信息)]"""
+        rows = self._execute(
+            "SELECT path, size, mtime, meta FROM files WHERE tool = ? ORDER BY created DESC", (tool,)
+        )
+        return [(path, json.loads(meta) if meta else {})
+                for path, size, mtime, meta in rows if self._matches(path, size, mtime)]
+
+    def find_meta(self, path):
+        """记录仍有效时返回 (工具, 下载时记录的信息)，否则返回 None"""
+        path = os.path.abspath(path)
+        rows = self._execute("SELECT size, mtime, tool, meta FROM files WHERE path = ?", (path,))
+        if rows and self._matches(path, rows[0][0], rows[0][1]):
+            return rows[0][2], json.loads(rows[0][3]) if rows[0][3] else {}
+        return None
+
+    def move(self, old_path, new_path):
+        """文件被重命名或移动后更新记录的路径（目标路径上过期的记录一并删除）"""
+        old_path, new_path = os.path.abspath(old_path), os.path.abspath(new_path)
+        if old_path == new_path:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ("files", "hashes"):
+                    if conn.execute(f"SELECT 1 FROM {table} WHERE path = ?", (old_path,)).fetchone():
+                        conn.execute(f"DELETE FROM {table} WHERE path = ?", (new_path,))
+                        conn.execute(f"UPDATE {table} SET path = ? WHERE path = ?", (new_path, old_path))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def cached_hash(self, path):
+        """记录仍有效时返回记录的内容哈希，否则返回 None（不计算）"""
+        path = os.path.abspath(path)
+        for table in ("files", "hashes"):
+            rows = self._execute(f"SELECT size, mtime, hash FROM {table} WHERE path = ?", (path,))
+            if rows and rows[0][2] and self._matches(path, rows[0][0], rows[0][1]):
+                return rows[0][2]
+        return None
+
+    def remember_hash(self, path, content_hash):
+        """保存文件的内容哈希：下载历史中有记录时只更新哈希，保留原有的来源信息；否则存入单独的哈希表"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            conn = self._connect()
+            updated = conn.execute(
+                "UPDATE files SET size = ?, mtime = ?, hash = ? WHERE path = ?",
+                (stat.st_size, stat.st_mtime, content_hash, path),
+            ).rowcount
+            if not updated:
+                conn.execute(
+                    "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)",
+                    (path, stat.st_size, stat.st_mtime, content_hash),
+                )
+
+    def file_hash(self, path):
+        """返回文件的内容哈希：记录仍有效时直接使用，否则重新计算并保存"""
+        content_hash = self.cached_hash(path)
+        if content_hash is None:
+            content_hash = hash_file(path)
+            self.remember_hash(path, content_hash)
+        return content_hash
+
+
+_history = History()
+
+
+def record(path, tool=None, source=None, url=None, meta=None, content_hash=None):
+    """记录产出文件（出错时只记录警告，不影响下载/转换结果）"""
+    try:
+        return _history.record(path, tool, source, url, meta, content_hash)
+    except (OSError, sqlite3.Error) as e:
+        logging.warning(f"写入下载历史失败: {path} - {e}")
+        return None
+
+
+def find_source(source):
+    """查询来源ID对应的已有文件"""
+    try:
+        return _history.find_source(source)
+    except sqlite3.Error as e:
+        logging.warning(f"读取下载历史失败: {source} - {e}")
+        return None
+
+
+def file_hash(path):
+    """带历史缓存的文件哈希"""
+    try:
+        return _history.file_hash(path)
+    except sqlite3.Error as e:
+        logging.warning(f"读取下载历史失败: {path} - {e}")
+        return hash_file(path)
+
+
+def find_tool(tool):
+    """工具产出的所有有效记录 [(路径, 记录的信息)]"""
+    try:
+        return _history.find_tool(tool)
+    except sqlite3.Error as e:
+        logging.warning(f"读取下载历史失败: {tool} - {e}")
+        return []
+
+
+def find_meta(path):
+    """文件下载时记录的 (工具, 信息)，如B站视频的标题和集数；没有有效记录时返回 None"""
+    try:
+        return _history.find_meta(path)
+    except sqlite3.Error as e:
+        logging.warning(f"读取下载历史失败: {path} - {e}")
+        return None
+
+
+def moved(old_path, new_path):
+    """重命名后更新下载历史中的路径，之后仍能按来源ID找到文件、读取下载时记录的信息"""
+    try:
+        _history.move(old_path, new_path)
+    except sqlite3.Error as e:
+        logging.warning(f"更新下载历史失败: {old_path} -> {new_path} - {e}")
+
+
+def cached_hash(path):
+    """历史中记录的有效哈希，没有时返回 None"""
+    try:
+        return _history.cached_hash(path)
+    except sqlite3.Error as e:
+        logging.warning(f"读取下载历史失败: {path} - {e}")
+        return None
+
+
+def remember_hash(path, content_hash):
+    """保存在其他地方（如子进程中）算出的哈希"""
+    try:
+        _history.remember_hash(path, content_hash)
+    except (OSError, sqlite3.Error) as e:
+        logging.warning(f"写入下载历史失败: {path} - {e}")
+
+
+def reuse_known(source, target_path, **info):
+    """
+    历史中已有来源ID对应的文件时，把它复制到 target_path（已在该位置时不复制）
+
+    target_path 为目录时使用原文件名。info 为记录新文件时的其他字段（tool、url、meta）。
+    返回复制后的路径；没有可用的文件时返回 None。
+    """
+    known = find_source(source)
+    if not known:
+        return None
+    return reuse_file(known, target_path, source=source, **info)
+
+
+def reuse_file(known, target_path, **info):
+    """把已有的文件 known 复制到 target_path 并记录（已在该位置时不复制），返回复制后的路径"""
+    if os.path.isdir(target_path):
+        target_path = os.path.join(target_path, os.path.basename(known))
+    target_path = os.path.abspath(target_path)
+    if os.path.normcase(known) != os.path.normcase(target_path):
+        tmp_path = target_path + ".part"
+        shutil.copy2(known, tmp_path)
+        os.replace(tmp_path, target_path)
+        record(target_path, content_hash=file_hash(known), **info)
+    return target_path
@@ -0,0 +1,69 @@
+"""
+HTTP 会话 - 带连接池、超时和自动重试的共享 requests.Session
+
+Session 底层的 urllib3 连接池是线程安全的，多个下载线程共用一个会话，
+可以复用 keep-alive 连接，避免每个请求都重新建立 TCP/TLS 连接。
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 默认超时（连接超时, 读取超时），单位秒
+DEFAULT_TIMEOUT = (5, 30)
+# 重试次数与退避系数（第 n 次重试前等待 backoff * 2^(n-1) 秒）
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class PooledSession(requests.Session):
+    """未指定 timeout 时使用默认超时的会话"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def create_session(pool_size=10, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                   timeout=DEFAULT_TIMEOUT, headers=None):
+    """创建会话，pool_size 应与并发线程数一致"""
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = PooledSession(timeout)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+class SharedSession:
+    """按需创建、进程内共享的会话"""
+
+    def __init__(self, pool_size=10, headers=None):
+        self.pool_size = pool_size
+        self.headers = headers
+        self._session = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = create_session(self.pool_size, headers=self.headers)
+        return self._session
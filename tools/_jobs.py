@@ -0,0 +1,277 @@
+"""
+后台任务管理 - 由工具箱统一管理耗时任务，与工具界面的生命周期无关
+
+工具通过 job_manager().submit(..., on_finished=...) 提交任务，任务在管理器的线程中运行；
+返回工具箱或切换工具不会中断任务，所有任务都显示在全局任务列表中，可取消、调整优先级。
+"""
+import threading
+import time
+import traceback
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtWidgets import (
+    QHBoxLayout, QHeaderView, QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget
+)
+
+from tools._settings import get_setting
+
+# 同时运行的任务数（配置项 jobs.max_running），超出的任务按优先级排队
+MAX_RUNNING = get_setting("jobs.max_running", 3)
+# 任务列表刷新间隔（毫秒）
+PANEL_REFRESH_MS = 200
+
+PENDING = "等待中"
+RUNNING = "运行中"
+DONE = "已完成"
+FAILED = "失败"
+CANCELLED = "已取消"
+
+
+class JobCancelled(Exception):
+    """任务被取消"""
+
+
+class Job(QObject):
+    """
+    后台任务
+
+    fn(job) 在后台线程中执行，返回值作为完成信息，抛出异常表示失败。
+    任务中调用 report() 更新进度，或在提交时传入 progress 函数，由任务列表定时读取。
+    finished 信号在界面线程中收到（成功与否, 信息）。
+    """
+    finished = pyqtSignal(bool, str)
+
+    def __init__(self, title, fn, tool="", priority=0, cancel=None, progress=None):
+        super().__init__()
+        self.title = title
+        self.fn = fn
+        self.tool = tool
+        self.priority = priority
+        self.state = PENDING
+        self.message = ""
+        self.created = time.monotonic()
+        self._cancel = cancel
+        self._progress = progress
+        self._percent = 0
+        self._text = ""
+        self._cancelled = threading.Event()
+        self.handled = False  # finished 信号已在界面线程中处理完（工具的回调已经运行）
+
+    def _handled(self):
+        self.handled = True
+
+    def report(self, percent, text=""):
+        """更新进度（可在任意线程中调用）"""
+        self._percent = percent
+        self._text = text
+
+    def progress(self):
+        """当前进度 (百分比, 说明)"""
+        if self._progress is not None and self.state == RUNNING:
+            try:
+                return self._progress()
+            except Exception:
+                pass
+        return self._percent, self._text
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check_cancelled(self):
+        """任务中定期调用，已取消时抛出 JobCancelled"""
+        if self.cancelled:
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self._cancel is not None:
+            self._cancel()
+
+    @property
+    def active(self):
+        return self.state in (PENDING, RUNNING)
+
+
+class JobManager(QObject):
+    """任务管理器：按优先级（高的先运行，同优先级先提交的先运行）调度任务"""
+    changed = pyqtSignal()  # 任务列表或任务状态变化
+
+    def __init__(self, max_running=MAX_RUNNING):
+        super().__init__()
+        self.max_running = max(1, max_running)
+        self.jobs = []
+        self._lock = threading.Lock()
+
+    def submit(self, title, fn, tool="", priority=0, cancel=None, progress=None, on_finished=None):
+        """
+        提交任务，返回 Job
+
+        on_finished(成功与否, 信息) 在任务启动前连接到 finished 信号；任务可能在 submit() 返回前就结束，
+        不要在返回后再连接，否则会收不到信号。
+        """
+        job = Job(title, fn, tool, priority, cancel, progress)
+        if on_finished is not None:
+            job.finished.connect(on_finished)
+        job.finished.connect(job._handled)  # 最后连接，在工具的回调之后运行
+        with self._lock:
+            self.jobs.append(job)
+        self._schedule()
+        return job
+
+    def running(self):
+        return [job for job in self.jobs if job.state == RUNNING]
+
+    def active(self):
+        return [job for job in self.jobs if job.active]
+
+    def unfinished(self):
+        """还在运行、或已经结束但工具还没处理结果的任务"""
+        return [job for job in self.jobs if not job.handled]
+
+    def set_priority(self, job, priority):
+        job.priority = priority
+        self._schedule()
+
+    def cancel(self, job):
+        """取消任务：等待中的任务直接移出队列，运行中的任务由任务自行停止"""
+        with self._lock:
+            if job.state == PENDING:
+                job.state = CANCELLED
+                job.message = "已取消"
+                waiting = True
+            else:
+                waiting = False
+        job.cancel()
+        if waiting:
+            job.finished.emit(False, job.message)
+        self.changed.emit()
+
+    def cancel_all(self):
+        for job in self.active():
+            self.cancel(job)
+
+    def clear_finished(self):
+        with self._lock:
+            self.jobs = [job for job in self.jobs if job.active]
+        self.changed.emit()
+
+    def _schedule(self):
+        """有空闲位置时启动优先级最高的等待任务"""
+        with self._lock:
+            free = self.max_running - sum(1 for job in self.jobs if job.state == RUNNING)
+            pending = sorted((job for job in self.jobs if job.state == PENDING),
+                             key=lambda job: (-job.priority, job.created))
+            starting = pending[:max(0, free)]
+            for job in starting:
+                job.state = RUNNING
+        for job in starting:
+            threading.Thread(target=self._run, args=(job,), daemon=True, name=f"job-{job.title}").start()
+        self.changed.emit()
+
+    def _run(self, job):
+        try:
+            message = job.fn(job)
+            success = not job.cancelled
+            job.state = DONE if success else CANCELLED
+            job.message = message or ("已完成" if success else "已取消")
+        except JobCancelled:
+            success = False
+            job.state = CANCELLED
+            job.message = "已取消"
+        except Exception as e:
+            success = False
+            job.state = CANCELLED if job.cancelled else FAILED
+            job.message = "已取消" if job.cancelled else f"{e}\n{traceback.format_exc()}"
+        job.report(100 if success else job.progress()[0], job.message.splitlines()[0] if job.message else "")
+        # 信号由后台线程发出，在界面线程中处理
+        job.finished.emit(success, job.message)
+        self._schedule()
+
+
+_manager = None
+
+
+def job_manager():
+    """全局任务管理器（在界面线程中首次调用）"""
+    global _manager
+    if _manager is None:
+        _manager = JobManager()
+    return _manager
+
+
+class JobsPanel(QWidget):
+    """全局任务列表：显示所有任务的状态和进度，可取消和调整优先级"""
+
+    def __init__(self, manager=None, parent=None):
+        super().__init__(parent)
+        self.manager = manager or job_manager()
+        self._rows = []
+
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["任务", "工具", "状态", "进度", "优先级"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+
+        buttons = QHBoxLayout()
+        for text, handler in (("提高优先级", lambda: self._change_priority(1)),
+                              ("降低优先级", lambda: self._change_priority(-1)),
+                              ("取消任务", self._cancel_selected),
+                              ("清除已结束", self.manager.clear_finished)):
+            button = QPushButton(text)
+            button.setStyleSheet("padding: 6px 12px; border-radius: 4px;")
+            button.clicked.connect(handler)
+            buttons.addWidget(button)
+        buttons.addStretch()
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addLayout(buttons)
+        layout.addWidget(self.table)
+
+        self.manager.changed.connect(self.refresh)
+        self.timer = QTimer(self)
+        self.timer.setInterval(PANEL_REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+    def _selected_jobs(self):
+        rows = {index.row() for index in self.table.selectionModel().selectedRows()}
+        return [self._rows[row] for row in rows if row < len(self._rows)]
+
+    def _change_priority(self, delta):
+        for job in self._selected_jobs():
+            self.manager.set_priority(job, job.priority + delta)
+
+    def _cancel_selected(self):
+        for job in self._selected_jobs():
+            if job.active:
+                self.manager.cancel(job)
+
+    def refresh(self):
+        """按当前任务状态刷新表格（只在内容变化时修改单元格）"""
+        if not self.isVisible():
+            return
+        jobs = list(self.manager.jobs)
+        if jobs != self._rows:
+            selected = self._selected_jobs()
+            self._rows = jobs
+            self.table.setRowCount(len(jobs))
+            for row in range(len(jobs)):
+                for column in range(5):
+                    if self.table.item(row, column) is None:
+                        self.table.setItem(row, column, QTableWidgetItem(""))
+            self.table.clearSelection()
+            for job in selected:
+                if job in jobs:
+                    self.table.selectRow(jobs.index(job))
+        for row, job in enumerate(jobs):
+            percent, text = job.progress()
+            values = (job.title, job.tool, job.state, f"{percent}% {text}".strip(), str(job.priority))
+            for column, value in enumerate(values):
+                item = self.table.item(row, column)
+                if item.text() != value:
+                    item.setText(value)
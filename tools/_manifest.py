@@ -0,0 +1,97 @@
+"""
+下载清单 - 记录已下载条目的本地 JSON 文件
+"""
+import json
+import os
+import re
+import threading
+import time
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+class DownloadManifest:
+    """
+    以条目ID为键的下载清单，更新后原子落盘
+
+    save_interval 大于 0 时，两次落盘至少间隔这么多秒（大批量写入时避免反复重写整个文件），
+    此时需要在结束时调用 flush()。
+    """
+
+    def __init__(self, path, save_interval=0):
+        self.path = path
+        self.save_interval = save_interval
+        self._dirty = False
+        self._last_save = 0
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @classmethod
+    def for_key(cls, folder, key):
+        """在下载目录中按同步对象（合集/UP主）创建清单"""
+        safe_key = re.sub(r"[^0-9A-Za-z_-]", "_", key)
+        return cls(os.path.join(folder, f".sync_{safe_key}.json"))
+
+    @classmethod
+    def shared(cls, folder, name, save_interval=2):
+        """
+        打开下载目录中的清单，同一文件在进程内共用一个实例
+
+        避免多个任务各自写文件互相覆盖；批量写入时每 save_interval 秒最多落盘一次，结束时需调用 flush()。
+        """
+        path = os.path.abspath(os.path.join(folder, name))
+        with _shared_lock:
+            if path not in _shared:
+                _shared[path] = cls(path, save_interval=save_interval)
+            return _shared[path]
+
+    def __contains__(self, item_id):
+        return str(item_id) in self.entries
+
+    def get(self, item_id):
+        return self.entries.get(str(item_id))
+
+    def existing_file(self, item_id):
+        """清单中已记录且文件仍然完整（大小一致）时返回文件路径，否则返回 None"""
+        entry = self.get(item_id)
+        if not entry or "file" not in entry:
+            return None
+        file_path = os.path.join(os.path.dirname(self.path), entry["file"])
+        try:
+            if os.path.getsize(file_path) == entry.get("size"):
+                return file_path
+        except OSError:
+            pass
+        return None
+
+    def missing(self, items, key):
+        """返回不在清单中的条目，key 为取条目ID的函数"""
+        return [item for item in items if str(key(item)) not in self.entries]
+
+    def add(self, item_id, **info):
+        """记录一个已完成的条目并保存"""
+        with self._lock:
+            self.entries[str(item_id)] = dict(info, time=int(time.time()))
+            self._dirty = True
+            if time.monotonic() - self._last_save >= self.save_interval:
+                self._save()
+
+    def flush(self):
+        """保存尚未落盘的更新"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._last_save = time.monotonic()
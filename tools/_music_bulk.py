@@ -0,0 +1,192 @@
+"""
+批量下载任务 - 歌单/专辑/歌名列表 -> 有界下载队列 -> 音源的下载线程池（SourceScheduler）
+
+解析和下载同时进行：解析出的歌曲放入有界队列，队列满时解析暂停，同时排队等待下载的歌曲数有上限。
+歌单和专辑仍然一次解析出完整的歌曲列表，已提交的歌曲ID也会一直保留（用于跳过重复的歌曲）。
+"""
+import os
+import threading
+import time
+from concurrent.futures import wait
+
+from tools._download_events import DownloadError, DownloadFinished, DownloadProgress
+from tools._files import safe_filename
+from tools._music_sources import SourceScheduler, get_source, open_manifest
+
+# 按歌名解析时每批的歌名数
+NAME_BATCH_SIZE = 50
+# 每个下载线程最多排队的歌曲数
+QUEUE_PER_WORKER = 4
+
+
+def song_filename(song):
+    """批量下载的文件名：歌名 - 歌手.mp3，避免同名歌曲互相覆盖"""
+    artists = "、".join(a["name"] for a in song.get("artists", []) if a.get("name"))
+    name = f"{song['name']} - {artists}" if artists else song["name"]
+    return safe_filename(name) + ".mp3"
+
+
+class BulkDownloadJob:
+    """
+    批量下载任务
+
+    source 为 ("playlist", 歌单ID)、("album", 专辑ID)、("songs", [歌曲ID, ...]) 或 ("names", [歌名, ...])，
+    music_source 为解析和下载使用的音源（MusicSource）。下载提交到 scheduler（SourceScheduler）中该音源的线程池，
+    与同一调度器中的单曲下载共用并发数；未给出时使用单独的调度器。
+    在任意线程中调用 run()；snapshot() 可在其他线程中随时读取统计信息。
+    """
+
+    def __init__(self, source, download_path, scheduler=None, sink=None, tagger=None, music_source=None):
+        self.source = source
+        self.music_source = music_source or get_source("netease")
+        self.download_path = download_path
+        self.scheduler = scheduler or SourceScheduler()
+        self._own_scheduler = scheduler is None
+        self.workers = self.scheduler.workers(self.music_source)
+        self.sink = sink
+        self.tagger = tagger  # 下载完成后写入标签（TagPipeline），为 None 时不写
+        self._tag_futures = []
+        # 已提交但还没下载完的歌曲数上限，满时解析暂停
+        self._slots = threading.BoundedSemaphore(self.workers * QUEUE_PER_WORKER)
+        self._futures = set()
+        self.failures = []  # [(名称, 错误信息)]
+        self.manifest = open_manifest(download_path)
+        self.total = 0
+        self.done = 0
+        self.skipped = 0  # 已下载过而跳过的歌曲
+        self._received = {}
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._started = None
+        self._queued_ids = set()
+
+    # ---- 事件接收（下载线程调用） ----
+
+    def push(self, event):
+        if isinstance(event, DownloadProgress):
+            with self._lock:
+                self._received[event.key] = event.received
+        if self.sink:
+            self.sink.push(event)
+
+    def log(self, line):
+        if self.sink:
+            self.sink.log(line)
+
+    # ---- 控制 ----
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def snapshot(self):
+        """当前统计：总数、完成数（含跳过）、跳过数、失败数、已下载字节数、平均速度"""
+        with self._lock:
+            received = sum(self._received.values())
+            elapsed = time.monotonic() - self._started if self._started else 0
+            return {
+                "total": self.total,
+                "done": self.done,
+                "skipped": self.skipped,
+                "failed": len(self.failures),
+                "bytes": received,
+                "elapsed": elapsed,
+                "mb_per_s": received / 1024 / 1024 / elapsed if elapsed else 0,
+            }
+
+    def _fail(self, name, message):
+        with self._lock:
+            self.failures.append((name, message))
+        self.log(f"[失败] {name}: {message}")
+
+    # ---- 执行 ----
+
+    def run(self):
+        """解析并下载，所有歌曲处理完后返回"""
+        self._started = time.monotonic()
+        try:
+            self._produce()
+        except Exception as e:
+            self._fail(self.source[0], f"解析失败: {e}")
+        finally:
+            with self._lock:
+                futures = list(self._futures)
+            wait(futures)
+            # 等待标签写完（会更新清单中的文件大小）再保存清单
+            for future in self._tag_futures:
+                future.result()
+            self.manifest.flush()
+            if self._own_scheduler:
+                self.scheduler.shutdown()
+        return self.snapshot()
+
+    def _put(self, song):
+        """提交到音源的线程池，排队的歌曲已满时等待（取消后不再提交）"""
+        if song["id"] in self._queued_ids:
+            # 重复的歌曲只下载一次
+            with self._lock:
+                self.done += 1
+            return
+        self._queued_ids.add(song["id"])
+        while not self.cancelled:
+            if self._slots.acquire(timeout=0.5):
+                future = self.scheduler.submit(song, self._download)
+                with self._lock:
+                    self._futures.add(future)
+                future.add_done_callback(self._release)
+                return
+
+    def _release(self, future):
+        with self._lock:
+            self._futures.discard(future)
+        self._slots.release()
+
+    def _produce(self):
+        kind, value = self.source
+        if kind != "names":
+            songs = self.music_source.resolve(kind, value)
+            with self._lock:
+                self.total = len(songs)
+            self.log(f"共解析到 {len(songs)} 首歌曲")
+            for song in songs:
+                self._put(song)
+            return
+
+        names = [n.strip() for n in value if n.strip()]
+        with self._lock:
+            self.total = len(names)
+        for start in range(0, len(names), NAME_BATCH_SIZE):
+            if self.cancelled:
+                return
+            for name, song in self.music_source.resolve_names(names[start:start + NAME_BATCH_SIZE]):
+                if song is None:
+                    self._fail(name, "未找到歌曲")
+                else:
+                    self._put(song)
+
+    def _download(self, song):
+        """下载一首歌曲（在音源的线程池中运行）"""
+        if self.cancelled:
+            return
+        existing = self.manifest.existing_file(self.music_source.item_id(song))
+        if existing:
+            with self._lock:
+                self.done += 1
+                self.skipped += 1
+            self.push(DownloadFinished(song["id"], existing, skipped=True))
+            return
+        try:
+            file_path = os.path.join(self.download_path, song_filename(song))
+            self.music_source.download(song, file_path, sink=self, key=song["id"], manifest=self.manifest)
+            with self._lock:
+                self.done += 1
+            if self.tagger is not None:
+                future = self.tagger.submit(song, file_path, self.manifest)
+                if future is not None:
+                    self._tag_futures.append(future)
+        except Exception as e:
+            self.push(DownloadError(song["id"], str(e)))
+            self._fail(song["name"], str(e))
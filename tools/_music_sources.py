@@ -0,0 +1,220 @@
+"""
+音源 - 搜索、解析、下载的统一接口和按音源分配线程的调度器
+
+每个音源实现 MusicSource 的方法并调用 register_source 注册；界面和批量下载只通过接口访问，
+不直接拼接某个网站的地址。歌曲字典中的 "source" 字段记录歌曲来自哪个音源。
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from tools import _history as history
+from tools import _netease as netease
+from tools._download_events import DownloadFinished, DownloadStarted
+from tools._manifest import DownloadManifest
+from tools._settings import get_setting
+
+# 下载清单文件名（保存在下载目录中），所有音源共用，条目以 MusicSource.item_id() 为键
+MANIFEST_NAME = ".music_manifest.json"
+
+
+def open_manifest(folder):
+    """打开下载目录中的音乐下载清单（同一目录共用一个实例）"""
+    return DownloadManifest.shared(folder, MANIFEST_NAME)
+
+
+class MusicSource:
+    """音源接口"""
+
+    name = ""
+    title = ""
+    # 默认并发下载数，可通过配置项 music.<name>.workers 修改
+    default_workers = 4
+
+    @property
+    def workers(self):
+        return max(1, get_setting(f"music.{self.name}.workers", self.default_workers))
+
+    def item_id(self, song):
+        """歌曲在下载清单中的ID"""
+        return f"{self.name}:{song['id']}"
+
+    def _tag(self, songs):
+        """为歌曲标记音源（返回副本，不修改缓存中的数据）"""
+        return [dict(song, source=self.name) for song in songs]
+
+    # ---- 搜索 ----
+
+    def peek_search_page(self, keyword, offset=0):
+        """只查缓存，未命中时返回 None（可在界面线程中调用）"""
+        return None
+
+    def search_page(self, keyword, offset=0):
+        """搜索一页歌曲，返回 {"songs": [...], "total": 结果总数}"""
+        raise NotImplementedError
+
+    # ---- 解析 ----
+
+    def parse_collection(self, text):
+        """识别歌单/专辑链接，返回 (类型, ID)，无法识别时抛出 ValueError"""
+        raise ValueError(f"无法识别的歌单/专辑: {text}")
+
+    def resolve(self, kind, value):
+        """解析歌单（playlist）、专辑（album）或歌曲ID列表（songs），返回歌曲列表"""
+        raise NotImplementedError
+
+    def resolve_names(self, names):
+        """按歌名批量搜索，返回 [(歌名, 歌曲或 None)]"""
+        raise NotImplementedError
+
+    # ---- 下载 ----
+
+    def fetch(self, song, file_path, sink=None, key=None):
+        """下载歌曲到 file_path，返回文件路径（下载清单由 download() 记录，这里不用处理）"""
+        raise NotImplementedError
+
+    def cover(self, song):
+        """下载歌曲所属专辑的封面（bytes），没有封面时返回 None"""
+        return None
+
+    def history_id(self, song):
+        """歌曲在下载历史中的来源ID"""
+        return f"{self.name}:{song['id']}"
+
+    def history_meta(self, song):
+        """记录到下载历史中的歌曲信息，批量重命名可以直接使用"""
+        return {"name": song.get("name"), "artists": song.get("artists"),
+                "album": (song.get("album") or {}).get("name")}
+
+    def download(self, song, file_path, sink=None, key=None, manifest=None):
+        """
+        下载歌曲并记录到下载历史和下载清单（清单以 item_id() 为键，只在这里写入）
+
+        历史中已有同一首歌（如在其他下载目录）时直接复制，不再请求网络。
+        """
+        key = song["id"] if key is None else key
+        info = {"tool": "music", "meta": self.history_meta(song)}
+        if history.reuse_known(self.history_id(song), file_path, **info):
+            if sink:
+                sink.push(DownloadStarted(key, os.path.basename(file_path)))
+                sink.log(f"下载历史中已有该歌曲，直接复制: {os.path.basename(file_path)}")
+            if manifest is not None:
+                manifest.add(self.item_id(song), file=os.path.basename(file_path), size=os.path.getsize(file_path))
+            if sink:
+                sink.push(DownloadFinished(key, file_path))
+            return file_path
+        self.fetch(song, file_path, sink=sink, key=key)
+        if manifest is not None:
+            manifest.add(self.item_id(song), file=os.path.basename(file_path), size=os.path.getsize(file_path))
+        history.record(file_path, source=self.history_id(song), **info)
+        return file_path
+
+
+class NeteaseSource(MusicSource):
+    """网易云音乐"""
+
+    name = "netease"
+    title = "网易云音乐"
+    default_workers = netease.DOWNLOAD_WORKERS
+
+    def item_id(self, song):
+        # 沿用之前的清单格式，直接以歌曲ID为键
+        return song["id"]
+
+    def peek_search_page(self, keyword, offset=0):
+        page = netease.peek_search_page(keyword, offset)
+        return page and dict(page, songs=self._tag(page["songs"]))
+
+    def search_page(self, keyword, offset=0):
+        page = netease.search_page(keyword, offset)
+        return dict(page, songs=self._tag(page["songs"]))
+
+    def parse_collection(self, text):
+        return netease.parse_collection_input(text)
+
+    def resolve(self, kind, value):
+        if kind == "playlist":
+            return self._tag(netease.playlist_tracks(value))
+        if kind == "album":
+            return self._tag(netease.album_tracks(value))
+        if kind == "songs":
+            return self._tag(netease.song_details(int(i) for i in value))
+        raise ValueError(f"不支持的类型: {kind}")
+
+    def resolve_names(self, names):
+        return [(name, song and dict(song, source=self.name))
+                for name, song in netease.resolve_names(names, self.workers)]
+
+    def fetch(self, song, file_path, sink=None, key=None):
+        return netease.download_song(song["id"], file_path, sink=sink, key=key)
+
+    def cover(self, song):
+        album = song.get("album") or {}
+        pic_url = album.get("picUrl")
+        if not pic_url:
+            # 搜索接口不返回封面地址，通过歌曲详情获取
+            details = netease.song_details([song["id"]])
+            pic_url = details[0]["album"].get("picUrl") if details else None
+        if not pic_url:
+            return None
+        return netease.download_bytes(f"{pic_url}?param={netease.COVER_SIZE}y{netease.COVER_SIZE}")
+
+
+SOURCES = {}
+
+
+def register_source(source):
+    """注册音源，已存在同名音源时替换"""
+    SOURCES[source.name] = source
+    return source
+
+
+def get_source(name_or_song):
+    """按名称或歌曲字典取音源，未标记音源的歌曲视为网易云"""
+    if isinstance(name_or_song, dict):
+        name_or_song = name_or_song.get("source", NeteaseSource.name)
+    try:
+        return SOURCES[name_or_song]
+    except KeyError:
+        raise ValueError(f"未知的音源: {name_or_song}") from None
+
+
+register_source(NeteaseSource())
+
+
+class SourceScheduler:
+    """
+    下载调度器：每个音源一个线程池，大小为该音源的并发数
+
+    不同音源的下载互不占用线程，同一音源的并发数与其连接池大小一致。单曲下载和批量下载共用
+    同一个调度器，对同一音源的并发连接数不会超过配置。workers 不为空时所有音源都使用该并发数。
+    """
+
+    def __init__(self, workers=None):
+        self._workers = workers
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def workers(self, source):
+        """音源的并发下载数"""
+        return max(1, self._workers or source.workers)
+
+    def _pool(self, source):
+        with self._lock:
+            pool = self._pools.get(source.name)
+            if pool is None:
+                pool = self._pools[source.name] = ThreadPoolExecutor(
+                    max_workers=self.workers(source), thread_name_prefix=f"music-{source.name}"
+                )
+            return pool
+
+    def submit(self, song, fn, *args, **kwargs):
+        """在歌曲所属音源的线程池中执行 fn(song, *args, **kwargs)"""
+        return self._pool(get_source(song)).submit(fn, song, *args, **kwargs)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.shutdown(wait=wait)
@@ -0,0 +1,122 @@
+"""
+歌曲标签 - 下载完成后写入 ID3 标签并嵌入专辑封面
+
+标签写入在单独的线程池中进行，与下载并行；同一专辑的封面只下载一次，
+并缓存到本地，之后的歌曲直接复用。需要安装 mutagen，未安装时跳过标签写入。
+"""
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from tools import _history as history
+from tools._cache import LRUCache
+from tools._music_sources import get_source
+from tools._settings import CACHE_DIR, ensure_dir
+
+try:
+    from mutagen.id3 import APIC, ID3, TALB, TIT2, TPE1, TXXX, ID3NoHeaderError
+except ImportError:  # mutagen 为可选依赖
+    ID3 = None
+
+TAGGING_AVAILABLE = ID3 is not None
+COVER_DIR = CACHE_DIR / "covers"
+TAG_WORKERS = 2
+# 内存中最多保留的专辑封面数（更早的封面再用到时从磁盘读取）
+COVER_CACHE_SIZE = 32
+COVER_CACHE_TTL = 3600
+
+
+class CoverArtCache:
+    """专辑封面缓存：内存中按专辑ID共享下载任务（只保留最近用到的），磁盘上保存图片"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures = LRUCache(COVER_CACHE_SIZE, COVER_CACHE_TTL)
+
+    def get(self, song):
+        """获取歌曲所属专辑的封面（bytes），没有封面时返回 None"""
+        album_id = (song.get("album") or {}).get("id")
+        if not album_id:
+            return None
+        source = get_source(song)
+        cover_key = f"{source.name}_{album_id}"
+        with self._lock:
+            future = self._futures.get(cover_key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures.set(cover_key, future)
+        if owner:
+            # 第一个请求该专辑的线程负责下载，其他线程等待结果
+            try:
+                future.set_result(self._load(cover_key, source, song))
+            except Exception as e:
+                logging.warning(f"获取专辑封面失败: {album_id} - {e}")
+                future.set_result(None)
+        return future.result()
+
+    def _load(self, cover_key, source, song):
+        path = COVER_DIR / f"{cover_key}.jpg"
+        if path.exists():
+            return path.read_bytes()
+        data = source.cover(song)
+        if not data:
+            return None
+        ensure_dir(COVER_DIR)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+        return data
+
+
+def write_tags(file_path, song, cover=None):
+    """写入标题、歌手、专辑和封面"""
+    try:
+        tags = ID3(file_path)
+    except ID3NoHeaderError:
+        tags = ID3()
+    tags.setall("TIT2", [TIT2(encoding=3, text=song["name"])])
+    artists = [a["name"] for a in song.get("artists", []) if a.get("name")]
+    if artists:
+        tags.setall("TPE1", [TPE1(encoding=3, text=artists)])
+    album = (song.get("album") or {}).get("name")
+    if album:
+        tags.setall("TALB", [TALB(encoding=3, text=album)])
+    id_desc = f"{song.get('source', 'netease')}_id"
+    tags.setall(f"TXXX:{id_desc}", [TXXX(encoding=3, desc=id_desc, text=str(song["id"]))])
+    if cover:
+        mime = "image/png" if cover[:4] == b"\x89PNG" else "image/jpeg"
+        tags.setall("APIC", [APIC(encoding=3, mime=mime, type=3, desc="Cover", data=cover)])
+    tags.save(file_path, v2_version=3)
+
+
+class TagPipeline:
+    """标签写入线程池，下载完成后提交，写入后更新下载清单中的文件大小"""
+
+    def __init__(self, workers=TAG_WORKERS, covers=None):
+        self.covers = covers or CoverArtCache()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tagger")
+
+    def submit(self, song, file_path, manifest=None):
+        if not TAGGING_AVAILABLE:
+            return None
+        return self._pool.submit(self._tag, song, file_path, manifest)
+
+    def _tag(self, song, file_path, manifest):
+        try:
+            write_tags(file_path, song, self.covers.get(song))
+        except Exception as e:
+            logging.warning(f"写入标签失败: {file_path} - {e}")
+            return False
+        source = get_source(song)
+        # 写入标签后文件内容变化，更新下载历史和清单
+        history.record(file_path, tool="music", source=source.history_id(song), meta=source.history_meta(song))
+        if manifest is not None:
+            item_id = source.item_id(song)
+            entry = manifest.get(item_id) or {}
+            manifest.add(item_id, **dict(entry, size=os.path.getsize(file_path), tagged=True))
+        return True
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,272 @@
+"""
+网易云音乐接口封装 - 搜索、歌单/专辑解析与下载（不依赖 Qt）
+"""
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from tools._cache import LRUCache, PersistentCache
+from tools._download_events import DownloadFinished, DownloadProgress, DownloadStarted, check_cancelled
+from tools._http import SharedSession
+from tools._settings import get_setting
+
+# 接口地址（可通过环境变量指向本地模拟服务器）
+API_BASE = os.environ.get("TOOLSBOX_NETEASE_API", "https://music.163.com")
+MEDIA_BASE = os.environ.get("TOOLSBOX_NETEASE_MEDIA", "http://music.163.com")
+SEARCH_API = API_BASE + "/api/search/get/web"
+PLAYLIST_API = API_BASE + "/api/v6/playlist/detail"
+SONG_DETAIL_API = API_BASE + "/api/v3/song/detail"
+ALBUM_API = API_BASE + "/api/v1/album/{album_id}"
+MEDIA_URL = MEDIA_BASE + "/song/media/outer/url"
+
+# 请求头信息
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/70.0.3538.25 Safari/537.36 Core/1.70.3741.400 QQBrowser/10.5.3863.400"
+}
+CHUNK_SIZE = 64 * 1024
+# 并发下载线程数（配置项 music.netease.workers），连接池大小与之匹配（另留一个连接给搜索）
+DOWNLOAD_WORKERS = get_setting("music.netease.workers", 5)
+
+# 每页搜索结果数，内存中的搜索结果缓存（条数, 秒）
+SEARCH_PAGE_SIZE = 30
+SEARCH_CACHE_SIZE = 256
+SEARCH_CACHE_TTL = 10 * 60
+# 持久化缓存时间（秒）：搜索结果、歌曲详情、解析出的音频地址（地址会过期，只缓存较短时间）
+SEARCH_STORE_TTL = 24 * 3600
+SONG_STORE_TTL = 7 * 24 * 3600
+MEDIA_URL_TTL = 15 * 60
+
+# 有效歌曲文件的最小字节数
+MIN_SONG_SIZE = 64 * 1024
+
+# 歌曲详情接口每次最多查询的歌曲数
+DETAIL_BATCH_SIZE = 500
+# 封面尺寸（图片地址支持按参数缩放）
+COVER_SIZE = 500
+
+_session = SharedSession(pool_size=DOWNLOAD_WORKERS + 1, headers=HEADERS)
+_search_cache = LRUCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+_search_store = PersistentCache("netease_search", SEARCH_STORE_TTL)
+_song_store = PersistentCache("netease_song", SONG_STORE_TTL)
+_media_url_store = PersistentCache("netease_media_url", MEDIA_URL_TTL)
+
+
+def peek_search_page(keyword, offset=0, limit=SEARCH_PAGE_SIZE):
+    """只查缓存（先内存后磁盘），未命中时返回 None（可在界面线程中调用）"""
+    key = (keyword, offset, limit)
+    page = _search_cache.get(key)
+    if page is None:
+        page = _search_store.get(json.dumps(key, ensure_ascii=False))
+        if page is not None:
+            _search_cache.set(key, page)
+    return page
+
+
+def search_page(keyword, offset=0, limit=SEARCH_PAGE_SIZE):
+    """搜索一页歌曲，返回 {"songs": [...], "total": 结果总数}"""
+    page = peek_search_page(keyword, offset, limit)
+    if page is not None:
+        return page
+    params = {
+        "csrf_token": "", "hlpretag": "", "hlposttag": "",
+        "s": keyword, "type": 1, "offset": offset, "total": "true", "limit": limit,
+    }
+    response = _session().get(SEARCH_API, params=params)
+    response.raise_for_status()
+    result = response.json().get("result") or {}
+    songs = result.get("songs", [])
+    page = {"songs": songs, "total": result.get("songCount", offset + len(songs))}
+    _search_cache.set((keyword, offset, limit), page)
+    _search_store.set(json.dumps([keyword, offset, limit], ensure_ascii=False), page)
+    return page
+
+
+def search_songs(keyword, limit=10, offset=0):
+    """搜索歌曲，返回接口中的歌曲列表"""
+    return search_page(keyword, offset, limit)["songs"]
+
+
+def _get_json(url, **params):
+    response = _session().get(url, params=params)
+    response.raise_for_status()
+    result = response.json()
+    if result.get("code", 200) != 200:
+        raise RuntimeError(f"接口返回错误: {result.get('code')} {result.get('message') or result.get('msg', '')}")
+    return result
+
+
+def normalize_song(song):
+    """把歌曲详情接口的字段（ar/al）统一为搜索接口的格式（artists/album）"""
+    album = song.get("album") or song.get("al") or {}
+    return {
+        "id": song["id"],
+        "name": song.get("name", ""),
+        "artists": [{"id": a.get("id"), "name": a.get("name", "")}
+                    for a in (song.get("artists") or song.get("ar") or [])],
+        "album": {"id": album.get("id"), "name": album.get("name", ""), "picUrl": album.get("picUrl")},
+    }
+
+
+def song_details(song_ids):
+    """
+    批量获取歌曲详情，按输入顺序返回
+
+    先查持久化缓存，未命中的歌曲每 DETAIL_BATCH_SIZE 首一次请求。
+    """
+    song_ids = list(song_ids)
+    songs = {int(k): v for k, v in _song_store.get_many([str(i) for i in song_ids]).items()}
+    missing = [i for i in dict.fromkeys(song_ids) if i not in songs]
+    for start in range(0, len(missing), DETAIL_BATCH_SIZE):
+        batch = missing[start:start + DETAIL_BATCH_SIZE]
+        result = _get_json(SONG_DETAIL_API, c=json.dumps([{"id": i} for i in batch]))
+        fetched = {song["id"]: normalize_song(song) for song in result.get("songs", [])}
+        songs.update(fetched)
+        _song_store.set_many({str(k): v for k, v in fetched.items()})
+    return [songs[i] for i in song_ids if i in songs]
+
+
+def playlist_tracks(playlist_id):
+    """获取歌单中的所有歌曲"""
+    result = _get_json(PLAYLIST_API, id=playlist_id, n=100000)
+    track_ids = [t["id"] for t in result["playlist"].get("trackIds", [])]
+    return song_details(track_ids)
+
+
+def album_tracks(album_id):
+    """获取专辑中的所有歌曲"""
+    result = _get_json(ALBUM_API.format(album_id=album_id))
+    album = result.get("album") or {}
+    songs = []
+    for song in result.get("songs", []):
+        song = normalize_song(song)
+        song["album"] = {"id": album.get("id"), "name": album.get("name", ""), "picUrl": album.get("picUrl")}
+        songs.append(song)
+    return songs
+
+
+def parse_collection_input(text):
+    """
+    识别歌单/专辑链接或ID，返回 (类型, ID)
+
+    支持 https://music.163.com/#/playlist?id=123、album?id=456 以及 "playlist:123"、"album:456"
+    """
+    match = re.search(r"(playlist|album)\W+(?:id=)?(\d+)", text)
+    if match:
+        return match.group(1), int(match.group(2))
+    raise ValueError(f"无法识别的歌单/专辑: {text}")
+
+
+def resolve_names(names, workers=DOWNLOAD_WORKERS):
+    """
+    按歌名批量搜索，每个歌名取第一条结果
+
+    返回 [(歌名, 歌曲或 None)]，顺序与输入一致；结果经过搜索缓存
+    """
+    def first_match(name):
+        try:
+            songs = search_page(name, 0, 1)["songs"]
+        except Exception:
+            return name, None
+        return name, (songs[0] if songs else None)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(first_match, names))
+
+
+def download_bytes(url):
+    """下载小文件（如封面图片）"""
+    response = _session().get(url)
+    response.raise_for_status()
+    return response.content
+
+
+class InvalidMediaError(RuntimeError):
+    """下载到的内容不是有效的音频（多为会员歌曲返回的网页）"""
+
+
+def _is_mp3(head):
+    """检查 MP3 文件头：ID3 标签或 MPEG 帧同步字"""
+    return head[:3] == b"ID3" or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0)
+
+
+def _check_response(response):
+    """在读取正文前检查响应类型，避免下载网页等无效内容"""
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type and not (content_type.startswith("audio/") or content_type == "application/octet-stream"):
+        raise InvalidMediaError(f"返回的不是音频（{content_type}），可能需要会员")
+    total = int(response.headers.get("Content-Length", 0))
+    if 0 < total < MIN_SONG_SIZE:
+        raise InvalidMediaError(f"文件过小（{total} 字节），可能需要会员")
+    return total
+
+
+def _open_media(song_id):
+    """
+    打开歌曲的音频流并检查响应
+
+    外链地址会跳转到实际的音频地址，跳转结果缓存一段时间，下次直接请求；
+    缓存的地址失效时删除缓存，改用外链地址重新获取。
+    """
+    cache_key = str(song_id)
+    cached_url = _media_url_store.get(cache_key)
+    if cached_url:
+        response = None
+        try:
+            response = _session().get(cached_url, stream=True)
+            response.raise_for_status()
+            _check_response(response)
+            return response
+        except (requests.RequestException, InvalidMediaError):
+            if response is not None:
+                response.close()
+            _media_url_store.delete(cache_key)
+
+    response = _session().get(MEDIA_URL, params={"id": song_id}, stream=True)
+    try:
+        response.raise_for_status()
+        _check_response(response)
+    except BaseException:
+        response.close()
+        raise
+    if response.history:
+        _media_url_store.set(cache_key, response.url)
+    return response
+
+
+def download_song(song_id, file_path, sink=None, key=None):
+    """
+    下载歌曲到 file_path，sink 不为空时推送下载事件
+
+    先写入临时文件，校验类型、大小和文件头后再原子重命名。
+    """
+    key = song_id if key is None else key
+    if sink:
+        sink.push(DownloadStarted(key, os.path.basename(file_path)))
+    tmp_path = file_path + ".part"
+    try:
+        with _open_media(song_id) as response:
+            total = _check_response(response)
+            received = 0
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    check_cancelled(sink)
+                    if received == 0 and not _is_mp3(chunk):
+                        raise InvalidMediaError("文件头不是 MP3，可能需要会员")
+                    f.write(chunk)
+                    received += len(chunk)
+                    if sink:
+                        sink.push(DownloadProgress(key, received, total))
+        if received < MIN_SONG_SIZE or (total and received != total):
+            raise InvalidMediaError(f"文件不完整（{received}/{total} 字节）")
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if sink:
+        sink.push(DownloadFinished(key, file_path))
+    return file_path
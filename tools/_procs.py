@@ -0,0 +1,142 @@
+"""
+进程池 - 目录遍历、计算哈希、读取大表格等 CPU 密集的任务在子进程中执行，不与界面争用 GIL
+
+任务函数必须是子进程中可以导入的模块级函数（放在不依赖 Qt 的模块中，如 tools._dedup）。
+任务中调用 report(...) 发送进度，经进程间队列传回主进程，由监听线程交给 submit() 的 progress 回调。
+子进程用 spawn 方式启动，不继承界面进程的线程和 Qt 状态。
+"""
+import atexit
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from tools._settings import get_setting
+
+# 子进程数（配置项 procs.max_workers），默认为 CPU 核数
+MAX_WORKERS = get_setting("procs.max_workers", os.cpu_count() or 2)
+
+_pool = None
+_queue = None
+_listener = None
+_lock = threading.Lock()
+_handlers = {}  # 任务ID -> progress 回调
+_task_ids = itertools.count(1)
+
+# 子进程中的状态
+_worker_queue = None
+_task_id = None
+
+
+def _init_worker(queue):
+    global _worker_queue
+    _worker_queue = queue
+
+
+def _call(task_id, fn, args, kwargs):
+    global _task_id
+    _task_id = task_id
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _task_id = None
+        # 任务结束标记：排在这个任务的所有进度之后，监听线程收到后才移除回调
+        _worker_queue.put((task_id, None))
+
+
+def report(*values):
+    """在任务中发送进度（不在进程池中运行时什么也不做）"""
+    if _worker_queue is not None and _task_id is not None:
+        _worker_queue.put((_task_id, values))
+
+
+def _listen(queue):
+    """主进程中的监听线程：把子进程发来的进度交给对应任务的回调"""
+    while True:
+        try:
+            item = queue.get()
+        except (EOFError, OSError, TypeError):
+            return  # 退出时队列已被关闭
+        if item is None:
+            return
+        task_id, values = item
+        if values is None:
+            _handlers.pop(task_id, None)
+            continue
+        handler = _handlers.get(task_id)
+        if handler is not None:
+            try:
+                handler(*values)
+            except Exception:
+                logging.exception("处理任务进度失败")
+
+
+def _get_pool():
+    global _pool, _queue, _listener
+    with _lock:
+        if _pool is None:
+            context = multiprocessing.get_context("spawn")
+            _queue = context.Queue()
+            _listener = threading.Thread(target=_listen, args=(_queue,), daemon=True, name="procs-progress")
+            _listener.start()
+            _pool = ProcessPoolExecutor(max_workers=max(1, MAX_WORKERS), mp_context=context,
+                                        initializer=_init_worker, initargs=(_queue,))
+        return _pool
+
+
+def submit(fn, *args, progress=None, **kwargs):
+    """
+    在子进程中执行 fn(*args, **kwargs)，返回 Future
+
+    progress(*values) 在主进程的监听线程中调用，参数为任务中 report() 的参数。
+    """
+    task_id = next(_task_ids)
+    if progress is not None:
+        _handlers[task_id] = progress
+    try:
+        future = _get_pool().submit(_call, task_id, fn, args, kwargs)
+    except BrokenProcessPool:
+        # 子进程异常退出后进程池不可再用，重新创建
+        shutdown()
+        future = _get_pool().submit(_call, task_id, fn, args, kwargs)
+    future.add_done_callback(lambda f: _forget(task_id, f))
+    return future
+
+
+def _forget(task_id, future):
+    """任务没有在子进程中运行完（未开始就被取消、子进程异常退出）时不会有结束标记，直接移除回调"""
+    if future.cancelled() or isinstance(future.exception(), BrokenProcessPool):
+        _handlers.pop(task_id, None)
+
+
+def wait_all(futures, check_cancelled=None):
+    """等待所有任务完成并返回结果列表；check_cancelled() 抛出异常（已取消）时取消剩余任务"""
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            if check_cancelled is not None:
+                check_cancelled()
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        raise
+    return [future.result() for future in futures]
+
+
+def shutdown():
+    """关闭进程池，未开始的任务被取消；等监听线程处理完已收到的进度后再返回"""
+    global _pool, _queue, _listener
+    with _lock:
+        pool, queue, listener = _pool, _queue, _listener
+        _pool = _queue = _listener = None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+        queue.put(None)
+        listener.join(timeout=5)
+
+
+atexit.register(shutdown)
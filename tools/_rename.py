@@ -0,0 +1,445 @@
+"""
+批量重命名 - 读取重命名表格、规划和执行重命名的核心逻辑（不依赖 Qt，界面和命令行共用）
+
+重命名分两步：plan_renames() 先检查整个映射（原文件缺失、目标重名、目标已被其他文件占用、文件名非法），
+并为链式（a→b、b→c）和循环（a→b、b→a）重命名排好顺序、用临时文件名打破循环；
+apply_plan() 再分批执行，同一批内的重命名互不依赖，并行进行。
+执行前把整个计划写入文件夹中的日志，每完成一步记一行；中途失败或被中断时，
+可以用 resume() 继续，或用 rollback() 撤销已完成的部分。下载历史中记录的路径随重命名一起更新。
+"""
+import csv
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from tools import _history as history
+from tools import _procs as procs
+from tools._settings import get_setting
+
+# 表格中必须包含的列
+SOURCE_COLUMN = "原文件名"
+TARGET_COLUMN = "新文件名"
+# CSV 的编码：先按 UTF-8（可带 BOM）读取，失败时按 Excel 中文版默认保存的 GB18030 读取
+CSV_ENCODINGS = ("utf-8-sig", "gb18030")
+# 读取表格时每读多少行报告一次进度
+LOAD_REPORT_EVERY = 20000
+# 重命名日志（在被重命名的文件夹中），存在时说明上次的重命名没有完成
+JOURNAL_NAME = ".rename_journal.jsonl"
+# 同一批重命名的并发数（配置项 rename.workers）
+RENAME_WORKERS = get_setting("rename.workers", 8)
+# 文件名中不允许的字符（按 Windows 的规则）
+INVALID_CHARS = set('<>:"|?*') | {chr(i) for i in range(32)}
+
+
+def _csv_rows(file_path):
+    """逐行读取 CSV（不整个载入内存），返回行的迭代器"""
+    for encoding in CSV_ENCODINGS:
+        f = open(file_path, "r", encoding=encoding, newline="")
+        try:
+            # 先试读一段，编码不对时换下一种
+            f.read(64 * 1024)
+            f.seek(0)
+        except UnicodeDecodeError:
+            f.close()
+            continue
+        with f:
+            try:
+                yield from csv.reader(f)
+            except UnicodeDecodeError:
+                raise ValueError(f"表格文件中有不是 {encoding} 编码的内容，请另存为 UTF-8 编码的 CSV") from None
+        return
+    raise ValueError("无法识别表格文件的编码，请另存为 UTF-8 编码的 CSV")
+
+
+def _xlsx_rows(file_path):
+    """以只读模式逐行读取第一个工作表（openpyxl 的流式读取，不载入整个工作簿）"""
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _cell(value):
+    """单元格转为文件名：空单元格为空字符串，Excel 中的整数（如 1.0）去掉小数部分"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def load_rename_table(file_path):
+    """
+    从 CSV/Excel 表格中读取 {原文件名: 新文件名}，可在子进程中运行
+
+    逐行读取，只取“原文件名”和“新文件名”两列；读取时检查原文件名为空或重复的行。
+    """
+    if file_path.endswith(".csv"):
+        rows = _csv_rows(file_path)
+    elif file_path.endswith(".xlsx"):
+        rows = _xlsx_rows(file_path)
+    else:
+        raise ValueError("不支持的文件格式！")
+
+    # 检查表格是否包含必要的列
+    header = [_cell(value).strip() for value in next(rows, ())]
+    if SOURCE_COLUMN not in header or TARGET_COLUMN not in header:
+        raise ValueError(f"表格文件必须包含 '{SOURCE_COLUMN}' 和 '{TARGET_COLUMN}' 两列！")
+    source_index = header.index(SOURCE_COLUMN)
+    target_index = header.index(TARGET_COLUMN)
+    width = max(source_index, target_index) + 1
+
+    mapping = {}
+    for row_number, row in enumerate(rows, start=2):
+        if len(row) < width:
+            row = tuple(row) + (None,) * (width - len(row))
+        old_name, new_name = _cell(row[source_index]), _cell(row[target_index])
+        if not old_name and not new_name:
+            continue  # 空行
+        if not old_name:
+            raise ValueError(f"第 {row_number} 行的原文件名为空")
+        if old_name in mapping:
+            raise ValueError(f"第 {row_number} 行的原文件名 '{old_name}' 与前面的行重复")
+        mapping[old_name] = new_name
+        if row_number % LOAD_REPORT_EVERY == 0:
+            procs.report(row_number)
+    return mapping
+
+
+def _natural_key(path):
+    """自然排序的键：文件名中的数字按数值比较（第2集 排在 第10集 前面）"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", path)]
+
+
+def folder_files(folder_path, recursive=False):
+    """文件夹中的文件（忽略文件夹），recursive 时包含子文件夹中的文件（相对路径），按自然顺序排列"""
+    files = []
+    pending = [""]
+    while pending:
+        relative_dir = pending.pop()
+        with os.scandir(os.path.join(folder_path, relative_dir)) as entries:
+            for entry in entries:
+                relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+                if entry.is_file():
+                    if relative_path != JOURNAL_NAME:
+                        files.append(relative_path)
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    pending.append(relative_path)
+    files.sort(key=_natural_key)
+    return files
+
+
+def affix_mapping(file_names, prefix="", suffix=""):
+    """后缀命名模式：{原文件名: 前缀 + 原文件名（不含扩展名） + 后缀 + 扩展名}，子文件夹中的文件留在原文件夹"""
+    mapping = {}
+    for file_name in file_names:
+        folder, base = os.path.split(file_name)
+        name, ext = os.path.splitext(base)
+        mapping[file_name] = os.path.join(folder, f"{prefix}{name}{suffix}{ext}")
+    return mapping
+
+
+class RenameError(RuntimeError):
+    """重命名计划有问题，或执行失败（失败时日志保留，可以继续或撤销）"""
+
+
+def _key(name):
+    """比较文件名时使用的键（不区分大小写的系统上忽略大小写）"""
+    return os.path.normcase(os.path.normpath(name))
+
+
+def _check_name(name):
+    """检查新文件名，返回错误信息，没有问题时返回 None"""
+    if not name or not name.strip():
+        return "新文件名为空"
+    if os.path.isabs(name) or ".." in name.replace("\\", "/").split("/"):
+        return "新文件名不能包含上级目录或绝对路径"
+    base = os.path.basename(name)
+    if not base or base in (".", "..") or base.endswith((" ", ".")):
+        return "新文件名无效"
+    if INVALID_CHARS & set(base):
+        return "新文件名包含非法字符"
+    if base == JOURNAL_NAME:
+        return "新文件名与重命名日志重名"
+    return None
+
+
+class RenamePlan:
+    """
+    重命名计划
+
+    waves 为按顺序执行的批次，每批是 [(原路径, 新路径)]（相对于文件夹），批内互不依赖；
+    problems 为有问题、不会重命名的条目 [(原文件名, 新文件名, 原因)]；unchanged 为新旧文件名相同的条目数；
+    count 为要重命名的文件数（打破循环用的临时文件名会多出几步）。
+    """
+
+    def __init__(self, folder_path, waves, problems, unchanged=0, count=0):
+        self.folder_path = folder_path
+        self.waves = waves
+        self.problems = problems
+        self.unchanged = unchanged
+        self.count = count
+
+    @property
+    def steps(self):
+        return [step for wave in self.waves for step in wave]
+
+    def __len__(self):
+        return sum(len(wave) for wave in self.waves)
+
+
+def _parents(name):
+    """新文件名中的各级上级目录（相对路径），如 "a/b/c" -> ["a", "a/b"]"""
+    parents = []
+    parent = os.path.dirname(os.path.normpath(name))
+    while parent:
+        parents.append(parent)
+        parent = os.path.dirname(parent)
+    return parents
+
+
+def _validate(folder_path, mapping):
+    """返回 (有效的 {原文件名: 新文件名}, 问题列表, 新旧相同的条目数)"""
+    problems = []
+    valid = {}
+    unchanged = 0
+    for old_name, new_name in mapping.items():
+        old_name, new_name = str(old_name), str(new_name)
+        if old_name == new_name:
+            unchanged += 1
+            continue
+        error = _check_name(new_name)
+        if error is None and not os.path.isfile(os.path.join(folder_path, old_name)):
+            error = "文件不存在"
+        if error is None and any(os.path.lexists(os.path.join(folder_path, parent))
+                                 and not os.path.isdir(os.path.join(folder_path, parent))
+                                 for parent in _parents(new_name)):
+            error = "新文件名的上级目录是一个已有的文件"
+        if error:
+            problems.append((old_name, new_name, error))
+        else:
+            valid[old_name] = new_name
+
+    # 去掉有问题的条目后，其他条目的目标可能不再空出，反复检查直到没有新的问题
+    while True:
+        sources = {_key(old) for old in valid}
+        targets = {}
+        for old_name, new_name in valid.items():
+            targets.setdefault(_key(new_name), []).append(old_name)
+        bad = {}
+        for old_name, new_name in valid.items():
+            if len(targets[_key(new_name)]) > 1:
+                bad[old_name] = "与其他文件的新文件名重复"
+            elif any(_key(parent) in targets for parent in _parents(new_name)):
+                bad[old_name] = "新文件名的上级目录与其他文件的新文件名重复"
+            elif (_key(new_name) not in sources and _key(new_name) != _key(old_name)
+                  and os.path.lexists(os.path.join(folder_path, new_name))):
+                bad[old_name] = "目标文件已存在"
+        if not bad:
+            return valid, problems, unchanged
+        for old_name, error in bad.items():
+            problems.append((old_name, valid.pop(old_name), error))
+
+
+def plan_renames(folder_path, mapping):
+    """检查映射并排好执行顺序，返回 RenamePlan（有问题的条目记录在 problems 中，不会执行）"""
+    valid, problems, unchanged = _validate(folder_path, mapping)
+    pending = {_key(old): (old, new) for old, new in valid.items()}
+    waves = []
+    temp_index = 0
+    while pending:
+        # 目标没有被其他待重命名的文件占用的，可以在这一批执行
+        ready = [key for key, (old, new) in pending.items() if _key(new) not in pending or _key(new) == key]
+        if ready:
+            waves.append([pending.pop(key) for key in ready])
+            continue
+        # 剩下的都在循环中（每个目标都是另一个待重命名的文件）：每个循环先把一个文件移到临时文件名
+        wave = []
+        visited = set()
+        for start in list(pending):
+            if start in visited:
+                continue
+            key = start
+            while key not in visited:
+                visited.add(key)
+                key = _key(pending[key][1])
+            old, new = pending.pop(start)
+            temp_index += 1
+            temp = os.path.join(os.path.dirname(old), f".rename_tmp_{temp_index}_{os.path.basename(old)}")
+            wave.append((old, temp))
+            pending[_key(temp)] = (temp, new)
+        waves.append(wave)
+    return RenamePlan(folder_path, waves, problems, unchanged, len(valid))
+
+
+class _Journal:
+    """重命名日志：第一行为整个计划，之后每完成（或撤销）一步追加一行"""
+
+    def __init__(self, folder_path):
+        self.path = os.path.join(folder_path, JOURNAL_NAME)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def create(self, waves):
+        if self.exists():
+            raise RenameError("上次的重命名没有完成，请先继续或撤销")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"waves": waves}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self):
+        """返回 (批次, 已完成的步骤编号集合)，步骤编号为 (批次序号, 批内序号)"""
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        waves = [[tuple(step) for step in wave] for wave in json.loads(lines[0])["waves"]]
+        done = set()
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # 写到一半被中断的行
+            step = tuple(entry["step"])
+            if entry.get("undo"):
+                done.discard(step)
+            else:
+                done.add(step)
+        return waves, done
+
+    def mark(self, step, undo=False):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps({"step": list(step), "undo": undo}) + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def remove(self):
+        self.close()
+        os.remove(self.path)
+
+
+def pending_journal(folder_path):
+    """文件夹中有未完成的重命名时返回日志路径，否则返回 None"""
+    path = os.path.join(folder_path, JOURNAL_NAME)
+    return path if os.path.exists(path) else None
+
+
+def _rename(folder_path, old, new):
+    old_path = os.path.join(folder_path, old)
+    new_path = os.path.join(folder_path, new)
+    # os.rename 在部分系统上会直接覆盖已有文件，这里先检查（大小写不同的同一文件除外）
+    if _key(old) != _key(new) and os.path.lexists(new_path):
+        raise FileExistsError(f"目标文件已存在: {new}")
+    parent = os.path.dirname(new_path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    os.rename(old_path, new_path)
+
+
+def _moved(folder_path, old, new):
+    """文件已经从 old 移到了 new（用于判断日志来不及记录就被中断的步骤）"""
+    return (not os.path.lexists(os.path.join(folder_path, old))
+            and os.path.lexists(os.path.join(folder_path, new)))
+
+
+def _run_waves(folder_path, journal, waves, done, undo=False, progress=None, check_cancelled=None):
+    """按批执行（撤销时倒序执行并交换新旧文件名），失败或取消时在当前批结束后停止"""
+    order = list(enumerate(waves))
+    if undo:
+        order.reverse()
+    todo = [[(index, i, step) for i, step in enumerate(wave) if ((index, i) in done) == undo]
+            for index, wave in order]
+    total = sum(len(wave) for wave in todo)
+    finished = [0]
+    errors = []
+    lock = threading.Lock()
+
+    def run(item):
+        index, i, (old, new) = item
+        if undo:
+            old, new = new, old
+        try:
+            _rename(folder_path, old, new)
+        except OSError as e:
+            with lock:
+                errors.append(f"{old} -> {new}: {e}")
+            return
+        journal.mark((index, i), undo=undo)
+        history.moved(os.path.join(folder_path, old), os.path.join(folder_path, new))
+        with lock:
+            finished[0] += 1
+            if progress is not None:
+                progress(finished[0], total)
+
+    with ThreadPoolExecutor(max_workers=max(1, RENAME_WORKERS)) as pool:
+        for wave in todo:
+            if check_cancelled is not None:
+                check_cancelled()
+            list(pool.map(run, wave))
+            if errors:
+                break
+    journal.close()
+    if errors:
+        more = f"\n…等 {len(errors)} 个错误" if len(errors) > 5 else ""
+        raise RenameError("\n".join(errors[:5]) + more)
+    return total
+
+
+def apply_plan(plan, progress=None, check_cancelled=None):
+    """
+    执行重命名计划，返回重命名的文件数
+
+    progress(已完成数, 总数) 在工作线程中调用；失败或取消时抛出异常，日志保留，可以 resume() 或 rollback()。
+    """
+    if not plan.waves:
+        return 0
+    journal = _Journal(plan.folder_path)
+    journal.create(plan.waves)
+    _run_waves(plan.folder_path, journal, plan.waves, set(), progress=progress, check_cancelled=check_cancelled)
+    journal.remove()
+    return plan.count
+
+
+def _load_journal(folder_path):
+    journal = _Journal(folder_path)
+    if not journal.exists():
+        raise RenameError("没有未完成的重命名")
+    waves, done = journal.read()
+    # 日志只在重命名之后追加，中断时最后几步可能没有记录，按文件实际状态修正
+    for index, wave in enumerate(waves):
+        for i, (old, new) in enumerate(wave):
+            if (index, i) not in done and _moved(folder_path, old, new):
+                done.add((index, i))
+            elif (index, i) in done and _moved(folder_path, new, old):
+                done.discard((index, i))
+    return journal, waves, done
+
+
+def resume(folder_path, progress=None, check_cancelled=None):
+    """继续执行未完成的重命名，返回这次完成的步骤数"""
+    journal, waves, done = _load_journal(folder_path)
+    count = _run_waves(folder_path, journal, waves, done, progress=progress, check_cancelled=check_cancelled)
+    journal.remove()
+    return count
+
+
+def rollback(folder_path, progress=None, check_cancelled=None):
+    """撤销未完成的重命名中已完成的步骤，返回撤销的步骤数"""
+    journal, waves, done = _load_journal(folder_path)
+    count = _run_waves(folder_path, journal, waves, done, undo=True, progress=progress,
+                       check_cancelled=check_cancelled)
+    journal.remove()
+    return count
@@ -0,0 +1,324 @@
+"""
+重命名规则 - 用正则替换和模板生成新文件名（不依赖 Qt，界面和命令行共用）
+
+模板中可以使用的字段见 FIELDS，如 "{n:03d}_{name}"、"{taken:%Y%m%d}_{name}"、"{track:02d} {title}"、
+"{index:02d} {title}"。模板生成的是不含扩展名的文件名，扩展名保持不变。每个文件的新文件名只取决于
+它自己和它的序号，预览时可以只计算看得到的行；元数据只在模板用到时读取，并按文件缓存。
+
+标题等字段依次从下载历史（下载B站视频、音乐时记录的标题和集数）、音乐标签、ffprobe 读到的标签中取值；
+生成整个文件夹的新文件名时，元数据在线程池中并行读取。
+"""
+import json
+import os
+import re
+import shutil
+import string
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from tools import _history as history
+from tools._settings import get_setting
+
+try:
+    import mutagen
+except ImportError:  # mutagen 为可选依赖，未安装时音乐标签字段为空
+    mutagen = None
+
+try:
+    from PIL import ExifTags, Image
+except ImportError:  # Pillow 为可选依赖，未安装时照片字段为空
+    Image = None
+
+# 模板字段 -> (说明, 来源)；来源按顺序取第一个有值的，"file" 表示不需要读取文件内容
+FIELDS = {
+    "name": ("原文件名（不含扩展名，先经过正则替换）", ("file",)),
+    "n": ("序号（从起始编号开始，如 {n:03d}）", ("file",)),
+    "parent": ("所在文件夹名", ("file",)),
+    "mtime": ("修改时间（如 {mtime:%Y%m%d}）", ("file",)),
+    "today": ("今天的日期（如 {today:%Y-%m-%d}）", ("file",)),
+    "taken": ("照片拍摄时间（EXIF，需要 Pillow）", ("exif",)),
+    "camera": ("相机型号（EXIF，需要 Pillow）", ("exif",)),
+    "title": ("标题（下载记录、音乐标签或 ffprobe）", ("history", "tags", "ffprobe")),
+    "artist": ("歌手（下载记录、音乐标签或 ffprobe）", ("history", "tags", "ffprobe")),
+    "album": ("专辑（下载记录、音乐标签或 ffprobe）", ("history", "tags", "ffprobe")),
+    "track": ("音轨号（音乐标签或 ffprobe，如 {track:02d}）", ("tags", "ffprobe")),
+    "index": ("B站视频在合集中的序号（下载记录，如 {index:02d}）", ("history",)),
+    "page": ("B站视频的分P序号（下载记录）", ("history",)),
+    "collection": ("B站合集或UP主名称（下载记录）", ("history",)),
+    "bvid": ("B站视频的BV号（下载记录）", ("history",)),
+}
+DEFAULT_TEMPLATE = "{name}"
+EXIF_DATE_FORMAT = "%Y:%m:%d %H:%M:%S"
+# 读取元数据的并发数（配置项 rename.metadata_workers），ffprobe 在子进程中运行，线程只是等待
+METADATA_WORKERS = get_setting("rename.metadata_workers", 8)
+FFPROBE_TIMEOUT = 30
+
+
+class _Formatter(string.Formatter):
+    """缺少的字段（如没有标签的文件）格式化为空字符串，而不是报错"""
+
+    def get_value(self, key, args, kwargs):
+        return kwargs.get(key)
+
+    def format_field(self, value, format_spec):
+        if value is None or value == "":
+            return ""
+        return super().format_field(value, format_spec)
+
+
+_formatter = _Formatter()
+
+
+def template_fields(template):
+    """模板中用到的字段名；有未知字段或格式错误时抛出 ValueError"""
+    fields = set()
+    try:
+        parsed = list(_formatter.parse(template))
+    except ValueError as e:
+        raise ValueError(f"模板有误: {e}") from None
+    for _, field, _, _ in parsed:
+        if field is None:
+            continue
+        if field not in FIELDS:
+            raise ValueError(f"未知字段 {{{field}}}")
+        fields.add(field)
+    return fields
+
+
+def _exif(path):
+    if Image is None:
+        return {}
+    try:
+        with Image.open(path) as image:
+            exif = image.getexif()
+            # 拍摄时间在 Exif 子目录中，不在时退回到图片的修改时间字段
+            taken = exif.get_ifd(ExifTags.IFD.Exif).get(ExifTags.Base.DateTimeOriginal) or exif.get(ExifTags.Base.DateTime)
+            camera = exif.get(ExifTags.Base.Model)
+    except Exception:
+        return {}
+    fields = {"camera": str(camera).strip("\x00 ") if camera else None}
+    try:
+        fields["taken"] = datetime.strptime(str(taken).strip("\x00 "), EXIF_DATE_FORMAT) if taken else None
+    except ValueError:
+        fields["taken"] = None
+    return fields
+
+
+def _track(value):
+    """音轨号 "3/12" -> 3"""
+    try:
+        return int(str(value).split("/")[0])
+    except ValueError:
+        return None
+
+
+def _tags(path):
+    if mutagen is None:
+        return {}
+    try:
+        audio = mutagen.File(path, easy=True)
+    except Exception:
+        return {}
+    if not audio or not audio.tags:
+        return {}
+
+    def first(key):
+        values = audio.tags.get(key)
+        return str(values[0]) if values else None
+
+    track = first("tracknumber")
+    return {"title": first("title"), "artist": first("artist"), "album": first("album"),
+            "track": _track(track) if track else None}
+
+
+def _ffprobe(path):
+    """ffprobe 读取容器中的标签（视频、m4a 等 mutagen 不支持或没有标签的文件），没有安装时为空"""
+    if shutil.which("ffprobe") is None:
+        return {}
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", path],
+            capture_output=True, timeout=FFPROBE_TIMEOUT,
+        )
+        tags = json.loads(result.stdout or b"{}").get("format", {}).get("tags", {})
+    except (OSError, subprocess.TimeoutExpired, ValueError):
+        return {}
+    tags = {key.lower(): value for key, value in tags.items()}
+    track = tags.get("track")
+    return {"title": tags.get("title"), "artist": tags.get("artist"), "album": tags.get("album"),
+            "track": _track(track) if track else None}
+
+
+def _history(path):
+    """下载时记录的信息：B站视频的标题、序号、分P、合集名，音乐的歌名、歌手、专辑"""
+    found = history.find_meta(path)
+    if not found:
+        return {}
+    tool, meta = found
+    if tool == "music":
+        artists = "、".join(artist.get("name", "") for artist in meta.get("artists") or [])
+        return {"title": meta.get("name"), "artist": artists or None, "album": meta.get("album")}
+    if tool == "video":
+        return {key: meta.get(key) for key in ("title", "index", "page", "collection", "bvid")}
+    return {}
+
+
+METADATA_READERS = {"exif": _exif, "tags": _tags, "ffprobe": _ffprobe, "history": _history}
+
+
+class MetadataCache:
+    """按文件缓存读到的元数据（路径、修改时间不变时不再读取），可在多个线程中使用"""
+
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, path, source):
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None, {}  # 文件不存在时没有可读的元数据
+        with self._lock:
+            cached = self._cache.get((path, source))
+        if cached is not None and cached[0] == mtime:
+            return mtime, cached[1]
+        return mtime, None
+
+    def has(self, path, source):
+        """元数据已经读过（不需要再读取文件）"""
+        return self._cached(path, source)[1] is not None
+
+    def get(self, path, source):
+        mtime, fields = self._cached(path, source)
+        if fields is not None:
+            return fields
+        key = (path, source)
+        fields = METADATA_READERS[source](path)
+        with self._lock:
+            self._cache[key] = (mtime, fields)
+        return fields
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+class RenameRule:
+    """
+    重命名规则：先对原文件名（不含扩展名）做正则替换，再按模板生成新文件名
+
+    规则有误（正则或模板写错）时在创建时抛出 ValueError。
+    """
+
+    def __init__(self, folder_path, template=DEFAULT_TEMPLATE, pattern="", replacement="", start=1, step=1,
+                 metadata=None):
+        self.folder_path = folder_path
+        self.template = template or DEFAULT_TEMPLATE
+        self.replacement = replacement
+        self.start = start
+        self.step = step
+        self.metadata = metadata or MetadataCache()
+        try:
+            self.regex = re.compile(pattern) if pattern else None
+        except re.error as e:
+            raise ValueError(f"正则表达式有误: {e}") from None
+        self.fields = template_fields(self.template)
+        # 需要读取文件内容的字段，按来源顺序取值
+        self.metadata_fields = [field for field in self.fields if FIELDS[field][1] != ("file",)]
+        self.today = datetime.now()
+
+    def values(self, relative_path, index):
+        """文件的模板字段值"""
+        path = os.path.join(self.folder_path, relative_path)
+        stem = os.path.splitext(os.path.basename(relative_path))[0]
+        if self.regex is not None:
+            try:
+                stem = self.regex.sub(self.replacement, stem)
+            except (re.error, IndexError) as e:
+                raise ValueError(f"替换内容有误: {e}") from None
+        parent = os.path.dirname(relative_path)
+        values = {
+            "name": stem,
+            "n": self.start + index * self.step,
+            "parent": os.path.basename(parent or os.path.normpath(self.folder_path)),
+            "today": self.today,
+        }
+        if "mtime" in self.fields:
+            try:
+                values["mtime"] = datetime.fromtimestamp(os.path.getmtime(path))
+            except OSError:
+                values["mtime"] = None
+        for field in self.metadata_fields:
+            for source in FIELDS[field][1]:
+                value = self.metadata.get(path, source).get(field)
+                if value is not None and value != "":
+                    values[field] = value
+                    break
+        return values
+
+    def ready(self, relative_path):
+        """新文件名用到的元数据都已读过，计算新文件名时不需要读取文件（界面线程中用于决定是否在后台读取）"""
+        path = os.path.join(self.folder_path, relative_path)
+        for field in self.metadata_fields:
+            for source in FIELDS[field][1]:
+                if not self.metadata.has(path, source):
+                    return False
+                value = self.metadata.get(path, source).get(field)
+                if value is not None and value != "":
+                    break
+        return True
+
+    def load(self, relative_path):
+        """读取文件的元数据（缓存在 metadata 中），可在其他线程中调用"""
+        path = os.path.join(self.folder_path, relative_path)
+        for field in self.metadata_fields:
+            for source in FIELDS[field][1]:
+                value = self.metadata.get(path, source).get(field)
+                if value is not None and value != "":
+                    break
+
+    def new_name(self, relative_path, index):
+        """第 index 个文件（从 0 开始）的新文件名（相对路径，保留所在子文件夹和扩展名）"""
+        values = self.values(relative_path, index)
+        try:
+            base = _formatter.vformat(self.template, (), values).strip()
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"模板有误: {e}") from None
+        if not base:
+            return ""  # 计划中会作为“新文件名为空”跳过
+        ext = os.path.splitext(relative_path)[1]
+        return os.path.join(os.path.dirname(relative_path), base + ext)
+
+
+def _load_all(rule, files, progress=None, check_cancelled=None):
+    """在线程池中并行读取所有文件的元数据"""
+    pool = ThreadPoolExecutor(max_workers=max(1, METADATA_WORKERS))
+    try:
+        futures = [pool.submit(rule.load, relative_path) for relative_path in files]
+        for done, future in enumerate(as_completed(futures), 1):
+            future.result()
+            if done % 50 == 0 or done == len(futures):
+                if check_cancelled is not None:
+                    check_cancelled()
+                if progress is not None:
+                    progress(done, len(futures))
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def rule_mapping(rule, files, progress=None, check_cancelled=None):
+    """
+    按规则生成 {原文件名: 新文件名}，files 的顺序即序号的顺序
+
+    模板用到元数据时先并行读取；progress(已完成数, 总数) 在调用线程中调用。
+    """
+    if rule.metadata_fields:
+        _load_all(rule, files, progress, check_cancelled)
+    mapping = {}
+    for index, relative_path in enumerate(files):
+        mapping[relative_path] = rule.new_name(relative_path, index)
+        if index % 1000 == 0 and check_cancelled is not None:
+            check_cancelled()
+    return mapping
@@ -0,0 +1,64 @@
+"""
+工具箱公共配置 - 数据目录、缓存目录与用户配置
+
+以下划线开头的模块不会被工具箱当作工具加载，仅供各工具共用。
+"""
+import json
+import os
+from pathlib import Path
+
+# 数据目录（可通过环境变量 TOOLSBOX_HOME 修改）
+DATA_DIR = Path(os.environ.get("TOOLSBOX_HOME", Path.home() / ".toolsbox"))
+# 缓存目录
+CACHE_DIR = DATA_DIR / "cache"
+
+
+def ensure_dir(path):
+    """确保目录存在并返回该目录"""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+# 用户配置文件，例如 {"music": {"netease": {"workers": 8}}}
+SETTINGS_FILE = DATA_DIR / "settings.json"
+# 布尔配置可以写成的字符串（环境变量都是字符串）
+BOOL_STRINGS = {"1": True, "true": True, "yes": True, "on": True,
+                "0": False, "false": False, "no": False, "off": False, "": False}
+_settings = None
+
+
+def load_settings():
+    """读取用户配置（只读取一次），文件不存在或格式错误时返回空配置"""
+    global _settings
+    if _settings is None:
+        try:
+            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+                _settings = json.load(f)
+        except (OSError, ValueError):
+            _settings = {}
+    return _settings
+
+
+def get_setting(name, default=None):
+    """
+    按点分路径读取配置，例如 get_setting("music.netease.workers", 5)
+
+    环境变量优先，变量名为 TOOLSBOX_ 加大写路径（点换成下划线），如 TOOLSBOX_MUSIC_NETEASE_WORKERS；
+    有默认值时按默认值的类型转换。
+    """
+    value = os.environ.get("TOOLSBOX_" + name.upper().replace(".", "_"))
+    if value is None:
+        value = load_settings()
+        for part in name.split("."):
+            if not isinstance(value, dict) or part not in value:
+                return default
+            value = value[part]
+    if isinstance(default, bool) and isinstance(value, str):
+        return BOOL_STRINGS.get(value.strip().lower(), default)
+    if default is not None and not isinstance(value, type(default)):
+        try:
+            value = type(default)(value)
+        except (TypeError, ValueError):
+            return default
+    return value
@@ -0,0 +1,88 @@
+"""
+性能追踪 - 记录启动和打开工具的耗时，输出 Chrome Trace 格式的 JSON
+
+设置环境变量 TOOLSBOX_TRACE=<输出文件>，或以 python main.py --trace [输出文件] 启动后开启；
+退出时写入文件，可在 chrome://tracing、Perfetto 或 speedscope 中打开。未开启时记录函数几乎没有开销。
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_TRACE_FILE = "toolbox_trace.json"
+
+_events = []
+_lock = threading.Lock()
+_path = None
+# 时间零点：本模块被导入的时刻（启动脚本中最先导入）
+_start_ns = time.perf_counter_ns()
+
+
+def enable(path=DEFAULT_TRACE_FILE):
+    """开启追踪，退出时写入 path"""
+    global _path
+    if _path is None:
+        atexit.register(save)
+    _path = path
+
+
+def enabled():
+    return _path is not None
+
+
+def _now_us():
+    return (time.perf_counter_ns() - _start_ns) / 1000
+
+
+def _add(event):
+    event.setdefault("pid", os.getpid())
+    event.setdefault("tid", threading.get_ident())
+    with _lock:
+        _events.append(event)
+
+
+@contextmanager
+def span(name, category="startup", **args):
+    """记录一段代码的耗时（Chrome Trace 的完整事件）"""
+    if _path is None:
+        yield
+        return
+    start = _now_us()
+    try:
+        yield
+    finally:
+        _add({"name": name, "cat": category, "ph": "X", "ts": start, "dur": _now_us() - start, "args": args})
+
+
+def instant(name, category="startup", **args):
+    """记录一个时间点，如首次绘制"""
+    if _path is None:
+        return
+    _add({"name": name, "cat": category, "ph": "i", "s": "p", "ts": _now_us(), "args": args})
+
+
+def save(path=None):
+    """写入追踪文件，返回文件路径"""
+    path = path or _path
+    if not path:
+        return None
+    with _lock:
+        events = list(_events)
+    threads = {event["tid"] for event in events}
+    metadata = [{"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": "toolbox"}}]
+    metadata += [
+        {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+         "args": {"name": "main" if tid == threading.main_thread().ident else f"thread-{tid}"}}
+        for tid in threads
+    ]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+if os.environ.get("TOOLSBOX_TRACE"):
+    enable(os.environ["TOOLSBOX_TRACE"])
@@ -1,16 +1,122 @@
 import os
 import sys
-import pandas as pd
-from PyQt6.QtCore import Qt
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer, pyqtSignal
 from PyQt6.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-    QPushButton, QListWidget, QFileDialog, QMessageBox, QRadioButton, QGroupBox
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QCheckBox, QSpinBox, QComboBox,
+    QPushButton, QListView, QFileDialog, QMessageBox, QRadioButton, QGroupBox
 )
 # tools/batch_rename.py
 from PyQt6.QtGui import QIcon
+from tools import _procs as procs
+from tools._jobs import CANCELLED, job_manager
+from tools._rename import (
+    affix_mapping, apply_plan, folder_files, load_rename_table, pending_journal, plan_renames,
+    resume, rollback
+)
+from tools._rename_rules import FIELDS, METADATA_WORKERS, MetadataCache, RenameRule, rule_mapping
 
 TOOL_NAME = "批量重命名工具"
 DESCRIPTION = "批量重命名文件夹中的文件"
+# 输入规则后停顿多久再刷新预览
+PREVIEW_DEBOUNCE_MS = 150
+# 常用模板：下载的B站合集、音乐等按下载记录或标签中的信息命名
+TEMPLATE_PRESETS = {
+    "常用模板…": None,
+    "B站合集：序号 标题": "{index:02d} {title}",
+    "B站合集：合集名 - 序号 标题": "{collection} - {index:02d} {title}",
+    "音乐：歌手 - 标题": "{artist} - {title}",
+    "音乐：音轨号 标题": "{track:02d} {title}",
+    "照片：拍摄日期_序号": "{taken:%Y%m%d}_{n:04d}",
+    "序号_原文件名": "{n:03d}_{name}",
+}
+
+
+class RenamePreviewModel(QAbstractListModel):
+    """
+    重命名预览：列表视图只向模型请求看得到的行，新文件名在请求时才计算并按行缓存
+
+    规则改变时只清空缓存，视图重新请求看得到的几十行，文件再多输入也不卡顿。
+    规则需要读取元数据（标签、ffprobe 等）时，在线程池中读取，读完后再刷新这一行。
+    """
+
+    row_loaded = pyqtSignal(int, int)  # 行, 规则编号（在读取线程中发出）
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.files = []
+        self.new_name = None  # (原文件名, 序号) -> 新文件名，为 None 时只显示原文件名
+        self.rule = None  # 需要读取元数据的规则
+        self._cache = {}
+        self._generation = 0  # 规则或文件列表每次改变加一，丢弃旧规则的读取结果
+        self._loading = {}  # 行 -> 读取元数据的 Future
+        self._pool = ThreadPoolExecutor(max_workers=max(1, METADATA_WORKERS))
+        self.row_loaded.connect(self._row_loaded)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.files)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        row = index.row()
+        text = self._cache.get(row)
+        if text is None:
+            file_name = self.files[row]
+            if self.new_name is None:
+                text = file_name
+            elif self.rule is not None and not self.rule.ready(file_name):
+                self._load(row, file_name)
+                return f"{file_name} -> （正在读取文件信息…）"
+            else:
+                try:
+                    text = f"{file_name} -> {self.new_name(file_name, row)}"
+                except ValueError as e:
+                    text = f"{file_name} -> （{e}）"
+            self._cache[row] = text
+        return text
+
+    def _load(self, row, file_name):
+        if row in self._loading:
+            return
+        rule, generation = self.rule, self._generation
+
+        def load():
+            try:
+                rule.load(file_name)
+            finally:
+                self.row_loaded.emit(row, generation)
+
+        self._loading[row] = self._pool.submit(load)
+
+    def _row_loaded(self, row, generation):
+        if generation != self._generation:
+            return
+        self._loading.pop(row, None)
+        self._cache.pop(row, None)
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def _reset_loading(self):
+        """规则或文件列表改变：取消还没开始的读取"""
+        self._generation += 1
+        for future in self._loading.values():
+            future.cancel()
+        self._loading.clear()
+        self._cache.clear()
+
+    def set_files(self, files):
+        self.beginResetModel()
+        self.files = files
+        self._reset_loading()
+        self.endResetModel()
+
+    def set_rule(self, new_name, rule=None):
+        self.new_name = new_name
+        self.rule = rule if rule is not None and rule.metadata_fields else None
+        self._reset_loading()
+        if self.files:
+            self.dataChanged.emit(self.index(0), self.index(len(self.files) - 1))
 
 class BatchRenameTool(QWidget):
     def __init__(self):
@@ -20,6 +126,18 @@ class BatchRenameTool(QWidget):
         self.folder_path = None  # 当前选择的文件夹路径
         self.file_list = []  # 文件夹中的文件列表
         self.rename_mapping = {}  # 文件名映射关系（原文件名 -> 新文件名）
+        self.table_job = None  # 读取表格的任务（在子进程中读取）
+        self.rename_job = None  # 重命名任务（按计划分批执行，可继续或撤销）
+        self.files_job = None  # 读取文件列表的任务
+        self.rule_job = None  # 按规则生成新文件名的任务
+        self.plan_job = None  # 检查映射、排好重命名顺序的任务
+        self.metadata = MetadataCache()  # 规则命名用到的照片/音乐元数据，改规则时不用重新读取
+
+        # 输入防抖：停止输入后再刷新预览
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.preview_timer.timeout.connect(self._update_preview)
         self._setup_ui()
 
     def _setup_ui(self):
@@ -44,8 +162,12 @@ class BatchRenameTool(QWidget):
         self.suffix_mode = QRadioButton("使用后缀命名")
         self.suffix_mode.toggled.connect(self._toggle_mode)
 
+        self.rule_mode = QRadioButton("使用规则命名（正则替换、模板、序号、日期、照片和音乐信息）")
+        self.rule_mode.toggled.connect(self._toggle_mode)
+
         mode_layout.addWidget(self.table_mode)
         mode_layout.addWidget(self.suffix_mode)
+        mode_layout.addWidget(self.rule_mode)
         self.mode_group.setLayout(mode_layout)
 
         # 表格命名模式控件
@@ -59,16 +181,55 @@ class BatchRenameTool(QWidget):
         self.prefix_input = QLineEdit()
         self.prefix_input.setPlaceholderText("前缀（可选）")
         self.prefix_input.setStyleSheet("padding: 8px; border-radius: 4px; border: 1px solid #ccc;")
-        self.prefix_input.textChanged.connect(self._update_preview)
+        self.prefix_input.textChanged.connect(self._schedule_preview)
 
         self.suffix_input = QLineEdit()
         self.suffix_input.setPlaceholderText("后缀（可选）")
         self.suffix_input.setStyleSheet("padding: 8px; border-radius: 4px; border: 1px solid #ccc;")
-        self.suffix_input.textChanged.connect(self._update_preview)
-
-        # 文件列表
-        self.file_list_widget = QListWidget()
+        self.suffix_input.textChanged.connect(self._schedule_preview)
+
+        # 规则命名模式控件
+        self.rule_widget = QWidget()
+        rule_layout = QVBoxLayout(self.rule_widget)
+        rule_layout.setContentsMargins(0, 0, 0, 0)
+        replace_layout = QHBoxLayout()
+        self.pattern_input = QLineEdit()
+        self.pattern_input.setPlaceholderText("查找（正则表达式，可选）")
+        self.replace_input = QLineEdit()
+        self.replace_input.setPlaceholderText("替换为（可用 \\1 引用分组）")
+        replace_layout.addWidget(self.pattern_input)
+        replace_layout.addWidget(self.replace_input)
+        template_layout = QHBoxLayout()
+        self.template_input = QLineEdit()
+        self.template_input.setPlaceholderText("模板（不含扩展名），如 {n:03d}_{name}、{taken:%Y%m%d}_{n}、{track:02d} {title}")
+        self.template_input.setToolTip("可用字段：\n" + "\n".join(f"{{{field}}} {text}" for field, (text, _) in FIELDS.items()))
+        self.start_input = QSpinBox()
+        self.start_input.setRange(0, 999999)
+        self.start_input.setValue(1)
+        self.start_input.setPrefix("起始编号 ")
+        self.preset_combo = QComboBox()
+        self.preset_combo.addItems(TEMPLATE_PRESETS)
+        self.preset_combo.activated.connect(self._apply_preset)
+        template_layout.addWidget(self.preset_combo)
+        template_layout.addWidget(self.template_input)
+        template_layout.addWidget(self.start_input)
+        for widget in (self.pattern_input, self.replace_input, self.template_input):
+            widget.setStyleSheet("padding: 8px; border-radius: 4px; border: 1px solid #ccc;")
+            widget.textChanged.connect(self._schedule_preview)
+        self.start_input.valueChanged.connect(self._schedule_preview)
+        rule_layout.addLayout(replace_layout)
+        rule_layout.addLayout(template_layout)
+
+        self.recursive_check = QCheckBox("包含子文件夹中的文件")
+        self.recursive_check.toggled.connect(self._load_files)
+
+        # 文件列表（只绘制看得到的行）
+        self.preview_model = RenamePreviewModel(self)
+        self.file_list_widget = QListView()
+        self.file_list_widget.setModel(self.preview_model)
+        self.file_list_widget.setUniformItemSizes(True)
         self.file_list_widget.setStyleSheet("border: 1px solid #ccc; border-radius: 4px; padding: 8px;")
+        self.preview_label = QLabel("文件列表:")
 
         # 导出文件名按钮
         export_button = QPushButton("导出文件名列表")
@@ -76,9 +237,9 @@ class BatchRenameTool(QWidget):
         export_button.clicked.connect(self._export_file_list)
 
         # 执行重命名按钮
-        rename_button = QPushButton("执行重命名")
-        rename_button.setStyleSheet("padding: 8px 16px; background: #dc3545; color: white; border-radius: 4px;")
-        rename_button.clicked.connect(self._rename_files)
+        self.rename_button = QPushButton("执行重命名")
+        self.rename_button.setStyleSheet("padding: 8px 16px; background: #dc3545; color: white; border-radius: 4px;")
+        self.rename_button.clicked.connect(self._rename_files)
         # 返回按钮
         return_button = QPushButton("返回工具箱")
         return_button.setStyleSheet("padding: 8px 16px; border-radius: 4px; background: #6c757d; color: white;")
@@ -92,10 +253,12 @@ class BatchRenameTool(QWidget):
         layout.addWidget(self.select_table_button)
         layout.addWidget(self.prefix_input)
         layout.addWidget(self.suffix_input)
-        layout.addWidget(QLabel("文件列表:"))
+        layout.addWidget(self.rule_widget)
+        layout.addWidget(self.recursive_check)
+        layout.addWidget(self.preview_label)
         layout.addWidget(self.file_list_widget)
         layout.addWidget(export_button)
-        layout.addWidget(rename_button)
+        layout.addWidget(self.rename_button)
         layout.addWidget(return_button)
         self.setLayout(layout)
 
@@ -109,6 +272,7 @@ class BatchRenameTool(QWidget):
             self.folder_path = folder_path
             self.folder_label.setText(f"已选择文件夹: {folder_path}")
             self._load_files()
+            self._check_journal()
 
     def _select_table_file(self):
         """选择表格文件"""
@@ -116,64 +280,112 @@ class BatchRenameTool(QWidget):
             self, "选择表格文件", "", "CSV 文件 (*.csv);;Excel 文件 (*.xlsx)"
         )
         if file_path:
-            self.table_label.setText(f"已选择表格文件: {file_path}")
             self._load_rename_mapping(file_path)
 
     def _load_files(self):
-        """加载文件夹中的文件"""
+        """在后台读取文件夹中的文件（只处理文件，忽略文件夹），读完后刷新预览"""
         if not self.folder_path:
             return
+        folder_path, recursive = self.folder_path, self.recursive_check.isChecked()
+        if self.files_job is not None:
+            job_manager().cancel(self.files_job)  # 旧的结果不再使用
+        result = {}  # 每次读取单独保存结果，较早的任务晚结束时不会覆盖新的结果
+        self.preview_label.setText("正在读取文件列表…")
+        self.files_job = job = job_manager().submit(
+            f"读取文件列表: {os.path.basename(folder_path)}",
+            lambda job: self._run_list_files(folder_path, recursive, result), tool=TOOL_NAME,
+            on_finished=lambda success, message: self._files_loaded(job, result, success, message)
+        )
 
-        self.file_list_widget.clear()
-        self.file_list = []
-        for file_name in os.listdir(self.folder_path):
-            file_path = os.path.join(self.folder_path, file_name)
-            if os.path.isfile(file_path):  # 只处理文件，忽略文件夹
-                self.file_list.append(file_name)
-                self.file_list_widget.addItem(file_name)
+    @staticmethod
+    def _run_list_files(folder_path, recursive, result):
+        result["files"] = folder_files(folder_path, recursive)
+        return f"共 {len(result['files'])} 个文件"
+
+    def _files_loaded(self, job, result, success, message):
+        if job is not self.files_job:
+            return  # 已经重新读取
+        self.files_job = None
+        if not success:
+            self.preview_label.setText("文件列表:")
+            if job.state != CANCELLED:
+                QMessageBox.critical(self, "错误", f"读取文件列表失败: {message.splitlines()[0]}")
+            return
+        self.file_list = result["files"]
+        self.preview_model.set_files(self.file_list)
+        self._update_preview()
 
     def _load_rename_mapping(self, file_path):
-        """从表格文件中加载文件名映射关系"""
-        try:
-            if file_path.endswith(".csv"):
-                df = pd.read_csv(file_path)
-            elif file_path.endswith(".xlsx"):
-                df = pd.read_excel(file_path)
-            else:
-                QMessageBox.warning(self, "提示", "不支持的文件格式！")
-                return
-
-            # 检查表格是否包含必要的列
-            if "原文件名" not in df.columns or "新文件名" not in df.columns:
-                QMessageBox.warning(self, "提示", "表格文件必须包含 '原文件名' 和 '新文件名' 两列！")
-                return
+        """从表格文件中加载文件名映射关系（在子进程中读取，大表格不阻塞界面）"""
+        if not file_path.endswith((".csv", ".xlsx")):
+            QMessageBox.warning(self, "提示", "不支持的文件格式！")
+            return
+        self.select_table_button.setEnabled(False)
+        self.table_label.setText(f"正在读取表格文件: {file_path}")
+        if self.table_job is not None and self.table_job.active:
+            job_manager().cancel(self.table_job)
+        result = {}
+        self.table_job = job = job_manager().submit(
+            f"读取表格: {os.path.basename(file_path)}", lambda job: self._run_load_table(job, file_path, result),
+            tool=TOOL_NAME,
+            on_finished=lambda success, message: self._table_loaded(job, file_path, result, success, message)
+        )
 
-            # 构建文件名映射关系
-            self.rename_mapping = dict(zip(df["原文件名"], df["新文件名"]))
-            self._update_file_list()
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"加载表格文件失败: {str(e)}")
+    @staticmethod
+    def _run_load_table(job, file_path, result):
+        """在任务管理器的线程中等待子进程读取完成"""
+        future = procs.submit(load_rename_table, file_path, progress=lambda rows: job.report(0, f"已读取 {rows} 行"))
+        result["mapping"] = procs.wait_all([future], job.check_cancelled)[0]
+        return f"读取到 {len(result['mapping'])} 条映射"
+
+    def _table_loaded(self, job, file_path, result, success, message):
+        if job is not self.table_job:
+            return  # 已经选择了其他表格
+        self.select_table_button.setEnabled(True)
+        if not success:
+            self.table_label.setText("未选择表格文件")
+            if job.state != CANCELLED:
+                QMessageBox.critical(self, "错误", f"加载表格文件失败: {message.splitlines()[0]}")
+            return
+        self.table_label.setText(f"已选择表格文件: {file_path}")
+        self.rename_mapping = result["mapping"]
+        self._update_preview()
 
-    def _update_file_list(self):
-        """更新文件列表，显示新文件名"""
-        self.file_list_widget.clear()
-        for file_name in self.file_list:
-            new_name = self.rename_mapping.get(file_name, file_name)  # 如果没有映射关系，显示原文件名
-            self.file_list_widget.addItem(f"{file_name} -> {new_name}")
+    def _schedule_preview(self):
+        self.preview_timer.start()
 
-    def _update_preview(self):
-        """更新后缀命名模式的预览"""
-        if not self.suffix_mode.isChecked():
-            return
+    def _make_rule(self):
+        """按输入创建重命名规则，规则有误时抛出 ValueError"""
+        return RenameRule(self.folder_path or "", self.template_input.text(), self.pattern_input.text(),
+                          self.replace_input.text(), self.start_input.value(), metadata=self.metadata)
 
-        prefix = self.prefix_input.text()
-        suffix = self.suffix_input.text()
+    def _apply_preset(self, index):
+        template = TEMPLATE_PRESETS[self.preset_combo.itemText(index)]
+        if template:
+            self.template_input.setText(template)
+        self.preset_combo.setCurrentIndex(0)
 
-        self.file_list_widget.clear()
-        for index, file_name in enumerate(self.file_list):
-            name, ext = os.path.splitext(file_name)
-            new_name = f"{prefix}{name}{suffix}{ext}"
-            self.file_list_widget.addItem(f"{file_name} -> {new_name}")
+    def _update_preview(self):
+        """按当前命名模式更新预览（只重新计算看得到的行）"""
+        self.preview_timer.stop()
+        status = f"文件列表（共 {len(self.file_list)} 个文件）:"
+        rule = None
+        if self.table_mode.isChecked():
+            mapping = self.rename_mapping
+            # 没有映射关系的文件显示原文件名
+            new_name = (lambda file_name, row: mapping.get(file_name, file_name)) if mapping else None
+        elif self.suffix_mode.isChecked():
+            prefix, suffix = self.prefix_input.text(), self.suffix_input.text()
+            new_name = lambda file_name, row: affix_mapping([file_name], prefix, suffix)[file_name]
+        else:
+            try:
+                rule = self._make_rule()
+                new_name = rule.new_name
+            except ValueError as e:
+                new_name = None
+                status = f"规则有误: {e}"
+        self.preview_label.setText(status)
+        self.preview_model.set_rule(new_name, rule)
 
     def _rename_files(self):
         """执行重命名"""
@@ -186,49 +398,146 @@ class BatchRenameTool(QWidget):
                 QMessageBox.warning(self, "提示", "请先选择表格文件！")
                 return
             self._rename_with_table()
-        else:
+        elif self.suffix_mode.isChecked():
             self._rename_with_suffix()
+        else:
+            self._rename_with_rule()
 
     def _rename_with_table(self):
         """使用表格命名模式重命名文件"""
-        for old_name, new_name in self.rename_mapping.items():
-            old_path = os.path.join(self.folder_path, old_name)
-            old_name = str(old_name)
-            new_name = str(new_name)
-            new_path = os.path.join(self.folder_path, new_name)
-
-            if not os.path.exists(old_path):
-                QMessageBox.warning(self, "提示", f"文件 '{old_name}' 不存在！")
-                continue
-
-            try:
-                os.rename(old_path, new_path)
-            except Exception as e:
-                QMessageBox.critical(self, "错误", f"重命名失败: {str(e)}")
-                return
-
-        QMessageBox.information(self, "成功", "文件重命名完成！")
-        self._load_files()  # 刷新文件列表
+        self._apply_mapping(self.rename_mapping)
 
     def _rename_with_suffix(self):
         """使用后缀命名模式重命名文件"""
-        prefix = self.prefix_input.text()
-        suffix = self.suffix_input.text()
+        self._apply_mapping(affix_mapping(self.file_list, self.prefix_input.text(), self.suffix_input.text()))
 
-        for file_name in self.file_list:
-            old_path = os.path.join(self.folder_path, file_name)
-            name, ext = os.path.splitext(file_name)
-            new_name = f"{prefix}{name}{suffix}{ext}"
-            new_path = os.path.join(self.folder_path, new_name)
+    def _rename_with_rule(self):
+        """使用规则命名模式重命名文件（读取元数据可能较慢，在后台生成新文件名）"""
+        try:
+            rule = self._make_rule()
+        except ValueError as e:
+            QMessageBox.warning(self, "提示", str(e))
+            return
+        files = list(self.file_list)
+        if self.rule_job is not None and self.rule_job.active:
+            job_manager().cancel(self.rule_job)
+        result = {}
+        self.rename_button.setEnabled(False)
+        self.rule_job = job = job_manager().submit(
+            "生成新文件名", lambda job: self._run_rule(job, rule, files, result), tool=TOOL_NAME,
+            on_finished=lambda success, message: self._rule_finished(job, result, success, message)
+        )
 
-            try:
-                os.rename(old_path, new_path)
-            except Exception as e:
-                QMessageBox.critical(self, "错误", f"重命名失败: {str(e)}")
+    @staticmethod
+    def _run_rule(job, rule, files, result):
+        result["mapping"] = rule_mapping(
+            rule, files, progress=lambda done, total: job.report(int(done * 100 / total), f"{done}/{total}"),
+            check_cancelled=job.check_cancelled
+        )
+        return f"已生成 {len(result['mapping'])} 个新文件名"
+
+    def _rule_finished(self, job, result, success, message):
+        if job is not self.rule_job:
+            return  # 已经重新生成
+        self.rename_button.setEnabled(True)
+        if success:
+            self._apply_mapping(result["mapping"])
+        elif job.state != CANCELLED:
+            QMessageBox.critical(self, "错误", f"生成新文件名失败: {message.splitlines()[0]}")
+
+    def _apply_mapping(self, mapping):
+        """在后台检查整个映射（大文件夹检查较慢），检查完成后确认并按计划重命名"""
+        if pending_journal(self.folder_path):
+            self._check_journal()
+            return
+        folder_path = self.folder_path
+        if self.plan_job is not None and self.plan_job.active:
+            job_manager().cancel(self.plan_job)
+        result = {}
+        self.rename_button.setEnabled(False)
+        self.plan_job = job = job_manager().submit(
+            f"检查重命名: {len(mapping)} 个文件", lambda job: self._run_check(folder_path, mapping, result),
+            tool=TOOL_NAME, on_finished=lambda success, message: self._check_finished(job, result, success, message)
+        )
+
+    @staticmethod
+    def _run_check(folder_path, mapping, result):
+        result["plan"] = plan_renames(folder_path, mapping)
+        return f"可以重命名 {result['plan'].count} 个文件"
+
+    def _check_finished(self, job, result, success, message):
+        if job is not self.plan_job:
+            return  # 已经重新检查
+        self.rename_button.setEnabled(True)
+        if not success:
+            if job.state != CANCELLED:
+                QMessageBox.critical(self, "错误", f"检查重命名失败: {message.splitlines()[0]}")
+            return
+        plan = result["plan"]
+        if plan.problems:
+            lines = [f"{old} -> {new}: {error}" for old, new, error in plan.problems[:10]]
+            if len(plan.problems) > 10:
+                lines.append(f"…等 {len(plan.problems)} 个")
+            if not plan.count:
+                QMessageBox.warning(self, "提示", "以下文件无法重命名：\n" + "\n".join(lines))
+                return
+            reply = QMessageBox.question(
+                self, "提示",
+                "以下文件无法重命名，将被跳过：\n" + "\n".join(lines) + f"\n\n是否重命名其余 {plan.count} 个文件？"
+            )
+            if reply != QMessageBox.StandardButton.Yes:
                 return
+        if not plan.count:
+            QMessageBox.information(self, "提示", "没有需要重命名的文件！")
+            return
+        self._start_rename_job(f"重命名: {plan.count} 个文件",
+                               lambda job: self._run_plan(job, plan))
+
+    def _run_plan(self, job, plan):
+        apply_plan(plan, progress=lambda done, total: job.report(int(done * 100 / total), f"{done}/{total}"),
+                   check_cancelled=job.check_cancelled)
+        return f"文件重命名完成！共重命名 {plan.count} 个文件"
 
-        QMessageBox.information(self, "成功", "文件重命名完成！")
+    def _start_rename_job(self, title, fn):
+        self.rename_button.setEnabled(False)
+        self.rename_job = job_manager().submit(title, fn, tool=TOOL_NAME, on_finished=self._rename_finished)
+
+    def _rename_finished(self, success, message):
+        self.rename_button.setEnabled(True)
         self._load_files()  # 刷新文件列表
+        if success:
+            QMessageBox.information(self, "成功", message)
+            return
+        # 失败信息后面附有调用栈，只显示错误本身（可能有多行）
+        error = "重命名已取消" if self.rename_job.state == CANCELLED else message.split("\nTraceback")[0]
+        if not pending_journal(self.folder_path):
+            QMessageBox.critical(self, "错误", f"重命名失败: {error}")
+            return
+        reply = QMessageBox.question(
+            self, "重命名未完成", f"{error}\n\n是否撤销已完成的重命名？选择“否”可以稍后继续。"
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            self._start_rename_job("撤销重命名", lambda job: self._run_journal(job, rollback, "已撤销"))
+
+    def _check_journal(self):
+        """文件夹中有未完成的重命名时，询问继续还是撤销"""
+        if not pending_journal(self.folder_path):
+            return
+        box = QMessageBox(QMessageBox.Icon.Question, "重命名未完成", "该文件夹中有上次没有完成的重命名。", parent=self)
+        resume_button = box.addButton("继续重命名", QMessageBox.ButtonRole.AcceptRole)
+        rollback_button = box.addButton("撤销", QMessageBox.ButtonRole.DestructiveRole)
+        box.addButton("稍后处理", QMessageBox.ButtonRole.RejectRole)
+        box.exec()
+        if box.clickedButton() is resume_button:
+            self._start_rename_job("继续重命名", lambda job: self._run_journal(job, resume, "已继续完成"))
+        elif box.clickedButton() is rollback_button:
+            self._start_rename_job("撤销重命名", lambda job: self._run_journal(job, rollback, "已撤销"))
+
+    def _run_journal(self, job, action, text):
+        count = action(self.folder_path,
+                       progress=lambda done, total: job.report(int(done * 100 / total), f"{done}/{total}"),
+                       check_cancelled=job.check_cancelled)
+        return f"{text}（{count} 步）"
 
     def _export_file_list(self):
         """导出文件名列表为 Excel 文件"""
@@ -243,6 +552,9 @@ class BatchRenameTool(QWidget):
         if not save_path:
             return
 
+        # pandas 导入较慢，只在导出时导入
+        import pandas as pd
+
         # 构建 DataFrame
         df = pd.DataFrame({"文件名": self.file_list})
 
@@ -254,16 +566,12 @@ class BatchRenameTool(QWidget):
 
     def _toggle_mode(self):
         """切换命名模式"""
-        if self.table_mode.isChecked():
-            self.table_label.setVisible(True)
-            self.select_table_button.setVisible(True)
-            self.prefix_input.setVisible(False)
-            self.suffix_input.setVisible(False)
-        else:
-            self.table_label.setVisible(False)
-            self.select_table_button.setVisible(False)
-            self.prefix_input.setVisible(True)
-            self.suffix_input.setVisible(True)
+        table, suffix, rule = self.table_mode.isChecked(), self.suffix_mode.isChecked(), self.rule_mode.isChecked()
+        self.table_label.setVisible(table)
+        self.select_table_button.setVisible(table)
+        self.prefix_input.setVisible(suffix)
+        self.suffix_input.setVisible(suffix)
+        self.rule_widget.setVisible(rule)
         self._update_preview()
     def _return_to_toolbox(self):
         """返回工具箱"""
@@ -1,186 +1,41 @@
 import os
 import re
 import subprocess
-import requests
-from lxml import html
-import traceback
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
     QPushButton, QFileDialog, QMessageBox, QProgressBar, QRadioButton, 
-    QButtonGroup, QTextEdit
+    QButtonGroup, QPlainTextEdit, QComboBox
 )
 import sys
 import you_get
+from tools._bili_download import DownloadTask
+from tools._download_events import LOG_MAX_LINES, UI_FPS, DownloadError, DownloadProgress, DownloadStarted
+from tools._jobs import CANCELLED, job_manager
 TOOL_NAME = "B站视频下载器"
 DESCRIPTION = "下载B站视频（需要配置环境）"
-class DownloadThread(QThread):
-    progress_signal = pyqtSignal(int, int, int)
-    log_signal = pyqtSignal(str)
-    finished_signal = pyqtSignal(bool, str)
-
-    def __init__(self, url, output_dir, download_type):
-        super().__init__()
-        self.url = url
-        self.output_dir = os.path.abspath(output_dir)
-        self.download_type = download_type
-        self.video_urls = []
-
-    def run(self):
-        try:
-            self.video_urls = [self.url]
-
-            total = len(self.video_urls)
-            for idx, video_url in enumerate(self.video_urls):
-                self._download_single(video_url, idx+1, total)
-
-            self.finished_signal.emit(True, "下载完成！")
-        except Exception as e:
-            self.finished_signal.emit(False, f"下载失败: {str(e)}\n{traceback.format_exc()}")
-
-    def _download_single(self, url, current, total):
-        if self.download_type == "collection":
-
-
-            # 1. 发送请求获取网页内容
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()  # 检查请求是否成功
-
-            # 2. 解析 HTML
-            tree = html.fromstring(response.content)
-
-            # 3. 使用 XPath 定位所有带 data-key 的元素
-            elements = tree.xpath("/html/body/div[2]/div[2]/div[2]/div//*[@data-key]")
-
-            # 4. 按顺序提取 data-key 的值
-            data_keys = [element.get("data-key") for element in elements]
-            if data_keys[0][0] == 'B':
-                # 设置列表
-                for idx, key in enumerate(data_keys, 1):
-                    data_keys[idx-1] = 'https://www.bilibili.com/video/' + key
-                for url_used in data_keys:            
-                    cmd = [
-                        "you-get",
-                        "--playlist",
-                        "--no-caption",
-                        "-o", self.output_dir+"",
-                        "--debug",
-                        # "-c",cookies,
-                        # "-l",
-                        url_used
-                    ]
-                    self.log_signal.emit(f"执行命令: {' '.join(cmd)}")
-
-                    process = subprocess.Popen(
-                        cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT,
-                        bufsize=1,
-                        universal_newlines=True,
-                        encoding='utf-8',
-                        errors='replace'
-                    )
-
-                    while True:
-                        output = process.stdout.readline()
-                        if not output and process.poll() is not None:
-                            break
-                        if output:
-                            self.log_signal.emit(output.strip())
-                            if "Downloading" in output:
-                                if match := re.search(r'(\d+\.\d+)%', output):
-                                    percent = float(match.group(1))
-                                    self.progress_signal.emit(current, total, int(percent))
-                            elif "100%" in output:
-                                self.progress_signal.emit(current, total, 100)
-
-                    if process.returncode != 0:
-                        raise Exception(f"下载失败，退出码: {process.returncode}")
-            else:
-                cmd = [
-                    "you-get",
-                    "--no-caption",
-                    "-o", self.output_dir+"",
-                    "--debug",
-                    "-l",          
-                    url
-                ]
-                
-                self.log_signal.emit(f"执行命令: {' '.join(cmd)}")
-
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    bufsize=1,
-                    universal_newlines=True,
-                    encoding='utf-8',
-                    errors='replace'
-                )
-
-                while True:
-                    output = process.stdout.readline()
-                    if not output and process.poll() is not None:
-                        break
-                    if output:
-                        self.log_signal.emit(output.strip())
-                        if "Downloading" in output:
-                            if match := re.search(r'(\d+\.\d+)%', output):
-                                percent = float(match.group(1))
-                                self.progress_signal.emit(current, total, int(percent))
-                        elif "100%" in output:
-                            self.progress_signal.emit(current, total, 100)
-
-                if process.returncode != 0:
-                    raise Exception(f"下载失败，退出码: {process.returncode}")
-
-        else:
-            cmd = [
-                "you-get",
-                "--no-caption",
-                "-o", self.output_dir+"",
-                "--debug",          
-                url
-            ]
-            
-            self.log_signal.emit(f"执行命令: {' '.join(cmd)}")
-
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                bufsize=1,
-                universal_newlines=True,
-                encoding='utf-8',
-                errors='replace'
-            )
-
-            while True:
-                output = process.stdout.readline()
-                if not output and process.poll() is not None:
-                    break
-                if output:
-                    self.log_signal.emit(output.strip())
-                    if "Downloading" in output:
-                        if match := re.search(r'(\d+\.\d+)%', output):
-                            percent = float(match.group(1))
-                            self.progress_signal.emit(current, total, int(percent))
-                    elif "100%" in output:
-                        self.progress_signal.emit(current, total, 100)
-
-            if process.returncode != 0:
-                raise Exception(f"下载失败，退出码: {process.returncode}")
-
+# 下载方式：(显示名称, 模式)
+FETCH_MODES = [
+    ("完整视频（you-get）", "you-get"),
+    ("音视频并行（DASH）", "dash"),
+    ("仅音频（m4a，不转码）", "audio:m4a"),
+    ("仅音频（mp3）", "audio:mp3"),
+]
 class BilibiliDownloader(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("B站视频下载器")
         self.setMinimumSize(800, 600)
         self.output_dir = os.path.expanduser("~\Downloads")
+        self.worker = None
+        self.job = None
+        self._current = (0, 0)  # 当前下载的 (序号, 总数)
         self._setup_ui()
+
+        # 按固定帧率刷新进度和日志
+        self.ui_timer = QTimer(self)
+        self.ui_timer.setInterval(1000 // UI_FPS)
+        self.ui_timer.timeout.connect(self._drain_events)
         # self._check_dependencies()
 
     def _setup_ui(self):
@@ -190,16 +45,27 @@ class BilibiliDownloader(QWidget):
         type_group = QButtonGroup(self)
         self.single_radio = QRadioButton("单个视频")
         self.collection_radio = QRadioButton("视频合集")
+        self.sync_radio = QRadioButton("同步更新（合集/UP主）")
+        self.sync_radio.setToolTip("只下载上次同步之后新增的视频，支持合集中任意视频链接或UP主空间链接")
         type_group.addButton(self.single_radio)
         type_group.addButton(self.collection_radio)
+        type_group.addButton(self.sync_radio)
         self.single_radio.setChecked(True)
 
         type_layout = QHBoxLayout()
         type_layout.addWidget(QLabel("下载类型:"))
         type_layout.addWidget(self.single_radio)
         type_layout.addWidget(self.collection_radio)
+        type_layout.addWidget(self.sync_radio)
         type_layout.addStretch()
 
+        # 下载方式
+        self.fetch_mode_combo = QComboBox()
+        for label, mode in FETCH_MODES:
+            self.fetch_mode_combo.addItem(label, mode)
+        type_layout.addWidget(QLabel("下载方式:"))
+        type_layout.addWidget(self.fetch_mode_combo)
+
         # URL输入
         self.url_input = QLineEdit()
         self.url_input.setPlaceholderText("请输入B站视频链接（示例：https://www.bilibili.com/video/BV1xx411c7XX）")
@@ -223,9 +89,10 @@ class BilibiliDownloader(QWidget):
         return_button.setStyleSheet("padding: 8px 16px; border-radius: 4px; background: #6c757d; color: white;")
         return_button.clicked.connect(self._return_to_toolbox)
 
-        # 日志框
-        self.log_view = QTextEdit()
+        # 日志框（只保留最近的日志行）
+        self.log_view = QPlainTextEdit()
         self.log_view.setReadOnly(True)
+        self.log_view.setMaximumBlockCount(LOG_MAX_LINES)
         self.log_view.setStyleSheet("""
             font-family: Consolas; 
             font-size: 12px; 
@@ -253,10 +120,10 @@ class BilibiliDownloader(QWidget):
         for cmd in ["you-get", "ffmpeg"]:
             try:
                 result = subprocess.run([cmd, "--version"], check=True, capture_output=True, text=True)
-                self.log_view.append(f"[检查] {cmd} 版本: {result.stdout.splitlines()[0]}")
+                self.log_view.appendPlainText(f"[检查] {cmd} 版本: {result.stdout.splitlines()[0]}")
             except Exception as e:
                 missing.append(f"{cmd} ({e})")
-                self.log_view.append(f"[错误] 找不到依赖: {cmd}")
+                self.log_view.appendPlainText(f"[错误] 找不到依赖: {cmd}")
 
         if missing:
             QMessageBox.critical(
@@ -276,7 +143,7 @@ class BilibiliDownloader(QWidget):
         if path := QFileDialog.getExistingDirectory(self, "选择保存路径"):
             self.output_dir = os.path.abspath(path)
             self.path_label.setText(f"保存路径: {self.output_dir}")
-            self.log_view.append(f"[配置] 保存路径已更改为: {self.output_dir}")
+            self.log_view.appendPlainText(f"[配置] 保存路径已更改为: {self.output_dir}")
 
     def _start_download(self):
         self.progress.setValue(0)
@@ -285,33 +152,61 @@ class BilibiliDownloader(QWidget):
         self.log_view.clear()
 
         url = self.url_input.text().strip()
-        if not re.match(r"^https?://(www\.)?bilibili\.com/video/", url):
+        is_space_url = self.sync_radio.isChecked() and re.match(r"^https?://space\.bilibili\.com/\d+", url)
+        if not is_space_url and not re.match(r"^https?://(www\.)?bilibili\.com/video/", url):
             QMessageBox.warning(self, "输入错误", "请输入有效的B站视频链接（以https://www.bilibili.com/video/开头）")
             self.download_btn.setEnabled(True)
             return
 
-        download_type = "collection" if self.collection_radio.isChecked() else "video"
-        self.worker = DownloadThread(url, self.output_dir, download_type)
-        self.worker.progress_signal.connect(self._update_progress)
-        self.worker.log_signal.connect(self.log_view.append)
-        self.worker.finished_signal.connect(self._handle_result)
-        self.worker.start()
-
-    def _update_progress(self, current, total, percent):
+        if self.sync_radio.isChecked():
+            download_type = "sync"
+        elif self.collection_radio.isChecked():
+            download_type = "collection"
+        else:
+            download_type = "video"
+        fetch_mode = self.fetch_mode_combo.currentData()
+        # 下载由任务管理器运行，返回工具箱后继续下载，可在任务列表中取消
+        self.worker = DownloadTask(url, self.output_dir, download_type, fetch_mode)
+        self.job = job_manager().submit(f"B站下载: {url}", self.worker.run, tool=TOOL_NAME,
+                                        progress=self.worker.progress, on_finished=self._handle_result)
+        self.ui_timer.start()
+
+    def _drain_events(self):
+        """取出工作线程积压的事件，一次性刷新界面"""
+        if self.worker is None:
+            return
+        events, logs = self.worker.events.drain()
+        if logs:
+            self.log_view.appendPlainText("\n".join(logs))
+        for event in events:
+            if isinstance(event, DownloadStarted):
+                self._current = (event.index, event.count)
+                self._update_progress(0)
+            elif isinstance(event, DownloadProgress):
+                self._update_progress(event.percent)
+            elif isinstance(event, DownloadError):
+                self.log_view.appendPlainText(f"[错误] {event.message}")
+
+    def _update_progress(self, percent):
+        current, total = self._current
         self.progress.setValue(percent)
         self.progress.setFormat(f"下载进度 ({current}/{total}) - {percent}%")
 
     def _handle_result(self, success, message):
+        self.ui_timer.stop()
+        self._drain_events()
         self.progress.setVisible(False)
         self.download_btn.setEnabled(True)
         
         if success:
             QMessageBox.information(self, "成功", message)
-            self.log_view.append("[成功] 下载已完成，请检查保存路径")
+            self.log_view.appendPlainText("[成功] 下载已完成，请检查保存路径")
+        elif self.job.state == CANCELLED:
+            self.log_view.appendPlainText("[取消] 下载已取消")
         else:
-            error_msg = f"[严重错误] {message}"
+            error_msg = f"[严重错误] 下载失败: {message}"
             QMessageBox.critical(self, "错误", error_msg)
-            self.log_view.append(error_msg)
+            self.log_view.appendPlainText(error_msg)
     def _return_to_toolbox(self):
         """返回工具箱"""
         if self.return_to_toolbox:
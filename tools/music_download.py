@@ -1,62 +1,141 @@
 """
 音乐下载工具 - 基于网易云音乐
-版本: 1.5
+版本: 1.7
 更新内容：
-- 优化用户界面，增加下载进度显示
-- 美化界面，增加阴影和圆角效果
-- 增加错误处理和日志功能
+- 搜索和下载通过音源接口进行，可选择音源，每个音源的并发数可在配置文件中修改
+- 后台搜索，输入防抖，搜索结果缓存和分页加载
+- 支持歌单/专辑/歌名列表批量下载，跳过已下载的歌曲
+- 下载任务列表单独显示每首歌的下载进度和总速度
 """
 import sys
 import os
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QThread, QTimer, pyqtSignal
 from PyQt6.QtGui import QIcon, QPixmap, QColor, QFont
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-    QListWidget, QProgressBar, QFileDialog, QMessageBox, QListWidgetItem
+    QListWidget, QProgressBar, QFileDialog, QMessageBox, QListWidgetItem,
+    QGroupBox, QComboBox, QTableWidget, QTableWidgetItem, QHeaderView
 )
-import requests
+from tools._download_events import (
+    UI_FPS, DownloadError, DownloadFinished, DownloadProgress, DownloadStarted, EventBuffer
+)
+from tools._files import safe_filename
+from tools._jobs import job_manager
+from tools._music_bulk import BulkDownloadJob
+from tools._music_sources import SOURCES, SourceScheduler, get_source, open_manifest
+from tools._music_tags import TAGGING_AVAILABLE, TagPipeline
 
 # 配置项
 TOOL_NAME = "音乐下载器"
 DESCRIPTION = "从网易云音乐下载歌曲"
 
-# 请求头信息
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/70.0.3538.25 Safari/537.36 Core/1.70.3741.400 QQBrowser/10.5.3863.400"
-}
+_logging_ready = False
+
+
+def _setup_logging():
+    """日志配置（第一次打开工具时执行，导入模块时不创建日志文件）"""
+    global _logging_ready
+    if _logging_ready:
+        return
+    _logging_ready = True
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[logging.FileHandler("music_download.log"), logging.StreamHandler()]
+    )
+
+# 输入停止多久后自动搜索（毫秒）
+SEARCH_DEBOUNCE_MS = 400
+# 任务列表最多保留的行数，超出时先移除最早结束的任务
+MAX_TASK_ROWS = 500
+
+
+class SearchThread(QThread):
+    """后台搜索线程"""
+    result_signal = pyqtSignal(int, int, object)  # 搜索序号, 偏移量, 搜索结果
+    error_signal = pyqtSignal(int, str)
+
+    def __init__(self, source, generation, keyword, offset):
+        super().__init__()
+        self.source = source
+        self.generation = generation
+        self.keyword = keyword
+        self.offset = offset
+
+    def run(self):
+        try:
+            page = self.source.search_page(self.keyword, self.offset)
+            self.result_signal.emit(self.generation, self.offset, page)
+        except Exception as e:
+            self.error_signal.emit(self.generation, str(e))
 
-# 日志配置
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("music_download.log"), logging.StreamHandler()]
-)
 
 class ToolWindow(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
+        _setup_logging()
         self.setWindowTitle("音乐下载器")
         self.setMinimumSize(800, 600)
         self.download_path = os.getcwd()  # 默认下载路径为当前目录
         self.return_to_toolbox = None  # 返回工具箱的函数
-        self.thread_pool = ThreadPoolExecutor(max_workers=5)  # 线程池
+        self.scheduler = SourceScheduler()  # 按音源分配下载线程
+        self.tagger = TagPipeline()  # 下载完成后写入标签和封面
+        self._downloads = []  # 单曲下载的 Future
+        # 搜索状态：每次新搜索序号加一，过期的结果直接丢弃
+        self.search_generation = 0
+        self.search_keyword = ""
+        self.search_total = 0
+        self.search_loaded = 0
+        self.search_loading = False
+        self._search_threads = set()
+        self.bulk_job = None  # 批量下载（BulkDownloadJob）及其在任务管理器中的任务
+        self.bulk_task = None
+        self.bulk_names = []  # 从文件导入的歌名
+        # 下载进度：工作线程只写入 events，界面定时取出并刷新
+        self.events = EventBuffer()
+        self.task_rows = {}  # 任务键 -> 表格第一列的单元格（行号会因移除旧行而变化）
+        self.task_bytes = {}  # 进行中的任务键 -> 已下载字节数
+        self.finished_keys = {}  # 已结束的任务键（按结束顺序，值不使用）
+        self._finished_bytes = 0  # 已结束任务下载的字节数（用于计算总速度）
+        self._speed_bytes = 0
+        self._speed = 0.0
         self._setup_ui()
 
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(1000 // UI_FPS)
+        self.progress_timer.timeout.connect(self._drain_events)  # 有下载时才运行
+
+        # 批量下载统计刷新
+        self.bulk_timer = QTimer(self)
+        self.bulk_timer.setInterval(500)
+        self.bulk_timer.timeout.connect(self._update_bulk_stats)
+
+        # 输入防抖
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(lambda: self._start_search(self.search_input.text().strip()))
+
     def _setup_ui(self):
         """初始化界面"""
         layout = QVBoxLayout()
 
         # 搜索框和按钮
         search_layout = QHBoxLayout()
+        self.source_combo = QComboBox()
+        for source in SOURCES.values():
+            self.source_combo.addItem(source.title, source.name)
+        self.source_combo.currentIndexChanged.connect(self._on_source_changed)
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("请输入歌曲名称")
         self.search_input.setStyleSheet("padding: 8px; border-radius: 4px; border: 1px solid #ccc;")
         self.search_input.returnPressed.connect(self._search_songs)
+        self.search_input.textChanged.connect(self._on_search_text_changed)
         search_button = QPushButton("搜索")
         search_button.setStyleSheet("padding: 8px 16px; border-radius: 4px; background: #007bff; color: white;")
         search_button.clicked.connect(self._search_songs)
+        search_layout.addWidget(self.source_combo)
         search_layout.addWidget(self.search_input)
         search_layout.addWidget(search_button)
 
@@ -65,6 +144,17 @@ class ToolWindow(QWidget):
         self.song_list.setStyleSheet("border: 1px solid #ccc; border-radius: 4px; padding: 8px;")
         self.song_list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)  # 支持多选
         self.song_list.itemSelectionChanged.connect(self._update_download_button)
+        # 滚动到底部时加载下一页
+        self.song_list.verticalScrollBar().valueChanged.connect(self._on_scroll)
+
+        # 下载任务列表（与搜索结果分开）
+        self.task_table = QTableWidget(0, 3)
+        self.task_table.setHorizontalHeaderLabels(["歌曲", "进度", "状态"])
+        self.task_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.task_table.verticalHeader().setVisible(False)
+        self.task_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.task_table.setStyleSheet("border: 1px solid #ccc; border-radius: 4px;")
+        self.speed_label = QLabel("")
 
         # 下载路径选择
         path_layout = QHBoxLayout()
@@ -81,6 +171,36 @@ class ToolWindow(QWidget):
         self.download_button.setEnabled(False)  # 默认禁用
         self.download_button.clicked.connect(self._download_selected_songs)
 
+        # 批量下载
+        bulk_group = QGroupBox("批量下载（歌单/专辑/歌名列表）")
+        bulk_layout = QVBoxLayout()
+        bulk_input_layout = QHBoxLayout()
+        self.bulk_type = QComboBox()
+        self.bulk_type.addItem("歌单", "playlist")
+        self.bulk_type.addItem("专辑", "album")
+        self.bulk_input = QLineEdit()
+        self.bulk_input.setPlaceholderText("歌单/专辑链接或ID，例如 https://music.163.com/#/playlist?id=123")
+        self.bulk_input.setStyleSheet("padding: 8px; border-radius: 4px; border: 1px solid #ccc;")
+        self.bulk_input.textChanged.connect(self._on_bulk_input_changed)
+        bulk_file_button = QPushButton("导入歌名文件")
+        bulk_file_button.setStyleSheet("padding: 8px 16px; border-radius: 4px; background: #17a2b8; color: white;")
+        bulk_file_button.clicked.connect(self._select_names_file)
+        bulk_input_layout.addWidget(self.bulk_type)
+        bulk_input_layout.addWidget(self.bulk_input)
+        bulk_input_layout.addWidget(bulk_file_button)
+
+        bulk_control_layout = QHBoxLayout()
+        self.bulk_button = QPushButton("开始批量下载")
+        self.bulk_button.setStyleSheet("padding: 8px 16px; border-radius: 4px; background: #dc3545; color: white;")
+        self.bulk_button.clicked.connect(self._toggle_bulk_download)
+        self.bulk_stats_label = QLabel("")
+        bulk_control_layout.addWidget(self.bulk_button)
+        bulk_control_layout.addWidget(self.bulk_stats_label, 1)
+
+        bulk_layout.addLayout(bulk_input_layout)
+        bulk_layout.addLayout(bulk_control_layout)
+        bulk_group.setLayout(bulk_layout)
+
         # 返回按钮
         return_button = QPushButton("返回工具箱")
         return_button.setStyleSheet("padding: 8px 16px; border-radius: 4px; background: #6c757d; color: white;")
@@ -90,31 +210,108 @@ class ToolWindow(QWidget):
         layout.addLayout(search_layout)
         layout.addWidget(QLabel("搜索结果:"))
         layout.addWidget(self.song_list)
+        task_header = QHBoxLayout()
+        task_header.addWidget(QLabel("下载任务:"))
+        task_header.addStretch()
+        task_header.addWidget(self.speed_label)
+        layout.addLayout(task_header)
+        layout.addWidget(self.task_table)
         layout.addLayout(path_layout)
         layout.addWidget(self.download_button)
+        layout.addWidget(bulk_group)
         layout.addWidget(return_button)
         self.setLayout(layout)
 
     def _search_songs(self):
         """搜索歌曲"""
-        keyword = self.search_input.text()
+        keyword = self.search_input.text().strip()
         if not keyword:
             QMessageBox.warning(self, "提示", "请输入歌曲名称！")
             return
+        self.search_timer.stop()
+        self._start_search(keyword)
+
+    def _on_search_text_changed(self, text):
+        """输入变化时重新计时，停止输入后再搜索"""
+        if text.strip():
+            self.search_timer.start()
+        else:
+            self.search_timer.stop()
 
+    def _current_source(self):
+        """当前选择的音源"""
+        return get_source(self.source_combo.currentData())
+
+    def _on_source_changed(self):
+        """切换音源后重新搜索"""
+        keyword = self.search_input.text().strip()
+        self.search_keyword = ""
+        if keyword:
+            self._start_search(keyword)
+
+    def _start_search(self, keyword):
+        """开始新的搜索（从第一页开始）"""
+        if not keyword or (keyword == self.search_keyword and self.search_loaded):
+            return
+        self.search_generation += 1
+        self.search_keyword = keyword
+        self.search_total = 0
+        self.search_loaded = 0
+        self.search_loading = False
         self.song_list.clear()
-        try:
-            search_url = f'https://music.163.com/api/search/get/web?csrf_token=hlpretag=&hlposttag=&s={keyword}&type=1&offset=0&total=true&limit=10'
-            response = requests.get(url=search_url, headers=HEADERS).json()
-            songs = response['result']['songs']
-            for song in songs:
-                name = song['name']
-                author = song['artists'][0]['name']
-                song_id = song['id']
-                self.song_list.addItem(f"{name} - {author} (ID: {song_id})")
-        except Exception as e:
-            logging.error(f"搜索失败: {str(e)}")
-            QMessageBox.critical(self, "错误", f"搜索失败: {str(e)}")
+        self._load_search_page(0)
+
+    def _load_search_page(self, offset):
+        """加载一页搜索结果，命中缓存时直接显示，否则在后台线程中请求"""
+        source = self._current_source()
+        page = source.peek_search_page(self.search_keyword, offset)
+        if page is not None:
+            self._on_search_result(self.search_generation, offset, page)
+            return
+
+        self.search_loading = True
+        thread = SearchThread(source, self.search_generation, self.search_keyword, offset)
+        thread.result_signal.connect(self._on_search_result)
+        thread.error_signal.connect(self._on_search_error)
+        thread.finished.connect(lambda: self._search_threads.discard(thread))
+        self._search_threads.add(thread)
+        thread.start()
+
+    def _on_search_result(self, generation, offset, page):
+        """显示搜索结果"""
+        if generation != self.search_generation or offset != self.search_loaded:
+            return
+        self.search_loading = False
+        self.search_total = page["total"]
+        for song in page["songs"]:
+            name = song['name']
+            author = song['artists'][0]['name'] if song['artists'] else ""
+            song_id = song['id']
+            item = QListWidgetItem(f"{name} - {author} (ID: {song_id})")
+            item.setData(Qt.ItemDataRole.UserRole, song)
+            self.song_list.addItem(item)
+        self.search_loaded += len(page["songs"])
+        if not page["songs"]:
+            self.search_total = self.search_loaded
+        # 结果不足一屏（没有滚动条）时继续加载
+        QTimer.singleShot(100, self._on_scroll)
+
+    def _on_search_error(self, generation, message):
+        if generation != self.search_generation:
+            return
+        self.search_loading = False
+        logging.error(f"搜索失败: {message}")
+        QMessageBox.critical(self, "错误", f"搜索失败: {message}")
+
+    def _on_scroll(self, value=None):
+        """滚动到底部时加载下一页"""
+        scroll_bar = self.song_list.verticalScrollBar()
+        if self.search_loading or self.search_loaded >= self.search_total:
+            return
+        if not self.song_list.isVisible():
+            return
+        if scroll_bar.value() >= scroll_bar.maximum() - 2:
+            self._load_search_page(self.search_loaded)
 
     def _select_download_path(self):
         """选择下载路径"""
@@ -133,27 +330,220 @@ class ToolWindow(QWidget):
         if not selected_items:
             QMessageBox.warning(self, "提示", "请先选择要下载的歌曲！")
             return
+        if not TAGGING_AVAILABLE:
+            logging.warning("未安装 mutagen，下载的歌曲不会写入标签和封面（pip install mutagen）")
 
         for item in selected_items:
-            song_info = item.text()
-            song_id = song_info.split("(ID: ")[1].rstrip(")")
-            song_name = song_info.split(" - ")[0]
-            self.thread_pool.submit(self._download_task, song_id, song_name)
+            song = item.data(Qt.ItemDataRole.UserRole)
+            if not song:
+                continue
+            self._downloads.append(self.scheduler.submit(song, self._download_task))
+        self._downloads = [f for f in self._downloads if not f.done()]
+        self.progress_timer.start()
 
-    def _download_task(self, song_id, song_name):
+    def is_busy(self):
+        """是否有进行中的下载或搜索（工具箱不会回收忙碌的页面）"""
+        return (any(not f.done() for f in self._downloads) or bool(self._search_threads)
+                or (self.bulk_task is not None and self.bulk_task.active))
+
+    def _download_task(self, song):
         """下载任务"""
-        url = f'http://music.163.com/song/media/outer/url?id={song_id}'
+        source = get_source(song)
+        song_id, song_name = song['id'], song['name']
+        # 在线程池中运行，不能直接操作界面，进度和结果都写入 self.events
+        manifest = open_manifest(self.download_path)
+        existing = manifest.existing_file(source.item_id(song))
+        if existing:
+            logging.info(f"{song_name} 已下载，跳过")
+            self.events.push(DownloadStarted(song_id, song_name))
+            self.events.push(DownloadFinished(song_id, existing, skipped=True))
+            return
         try:
-            response = requests.get(url=url, headers=HEADERS, stream=True)
-            file_path = os.path.join(self.download_path, f"{song_name}.mp3")
-            with open(file_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            file_path = os.path.join(self.download_path, f"{safe_filename(song_name)}.mp3")
+            source.download(song, file_path, sink=self.events, key=song_id, manifest=manifest)
+            manifest.flush()
             logging.info(f"{song_name} 下载完成")
-            self.song_list.addItem(f"{song_name} 下载完成")
+            future = self.tagger.submit(song, file_path, manifest)
+            if future is not None:
+                future.add_done_callback(lambda f: manifest.flush())
         except Exception as e:
             logging.error(f"{song_name} 下载失败: {str(e)}")
-            self.song_list.addItem(f"{song_name} 下载失败: {str(e)}")
+            self.events.push(DownloadError(song_id, str(e)))
+
+    def _downloading(self):
+        """是否有进行中的单曲或批量下载"""
+        return any(not f.done() for f in self._downloads) or self.bulk_task is not None
+
+    def _task_row(self, key, name=None):
+        """获取任务所在的行，没有时新建"""
+        item = self.task_rows.get(key)
+        if item is None:
+            row = self.task_table.rowCount()
+            self.task_table.insertRow(row)
+            for column in range(3):
+                self.task_table.setItem(row, column, QTableWidgetItem(""))
+            item = self.task_rows[key] = self.task_table.item(row, 0)
+        if name:
+            item.setText(name)
+        return item.row()
+
+    def _task_ended(self, key):
+        """任务结束：字节数计入已结束的总数，行数超出上限时移除最早结束的任务"""
+        self._finished_bytes += self.task_bytes.pop(key, 0)
+        self.finished_keys.pop(key, None)
+        self.finished_keys[key] = None
+        while self.task_table.rowCount() > MAX_TASK_ROWS and self.finished_keys:
+            oldest = next(iter(self.finished_keys))
+            del self.finished_keys[oldest]
+            item = self.task_rows.pop(oldest)
+            self.task_table.removeRow(item.row())
+
+    def _drain_events(self):
+        """取出积压的下载事件，合并刷新任务列表和总速度"""
+        events, logs = self.events.drain()
+        for line in logs:
+            logging.info(line)
+        for event in events:
+            if isinstance(event, DownloadStarted):
+                row = self._task_row(event.key, event.name)
+                self.task_table.item(row, 2).setText("下载中")
+                self.finished_keys.pop(event.key, None)  # 重新下载的任务不能被移除
+            elif isinstance(event, DownloadProgress):
+                row = self._task_row(event.key)
+                self.task_bytes[event.key] = event.received
+                self.task_table.item(row, 1).setText(
+                    f"{event.percent}% ({event.received / 1024 / 1024:.1f}/{event.total / 1024 / 1024:.1f} MB)"
+                )
+            elif isinstance(event, DownloadFinished):
+                row = self._task_row(event.key, os.path.basename(event.path))
+                if event.skipped:
+                    self.task_table.item(row, 2).setText("已下载，跳过")
+                else:
+                    self.task_table.item(row, 1).setText("100%")
+                    self.task_table.item(row, 2).setText("下载完成")
+                self._task_ended(event.key)
+            elif isinstance(event, DownloadError):
+                row = self._task_row(event.key)
+                self.task_table.item(row, 2).setText(f"下载失败: {event.message}")
+                self._task_ended(event.key)
+        self._update_speed()
+        if not events and not logs and not self._downloading():
+            # 没有下载时停止刷新，下次开始下载时再启动
+            self.progress_timer.stop()
+            self._speed = 0.0
+            self.speed_label.setText("")
+
+    def _update_speed(self):
+        """根据两次刷新之间新增的字节数计算总速度（平滑处理）"""
+        total = self._finished_bytes + sum(self.task_bytes.values())
+        interval = self.progress_timer.interval() / 1000
+        current = (total - self._speed_bytes) / interval
+        self._speed_bytes = total
+        self._speed = self._speed * 0.8 + current * 0.2
+        if self._speed < 1024:
+            self._speed = 0.0
+            self.speed_label.setText("")
+        else:
+            self.speed_label.setText(f"总速度: {self._speed / 1024 / 1024:.2f} MB/s")
+
+    def _on_bulk_input_changed(self, text):
+        """手动输入歌单/专辑后，清除已导入的歌名文件"""
+        if text.strip():
+            self.bulk_names = []
+
+    def _select_names_file(self):
+        """导入歌名文件（每行一个歌名）"""
+        file_path, _ = QFileDialog.getOpenFileName(self, "选择歌名文件", "", "文本文件 (*.txt)")
+        if not file_path:
+            return
+        try:
+            with open(file_path, "r", encoding="utf-8-sig") as f:
+                names = [line.strip() for line in f if line.strip()]
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"读取文件失败: {str(e)}")
+            return
+        self.bulk_input.clear()
+        self.bulk_names = names
+        self.bulk_stats_label.setText(f"已导入 {len(names)} 个歌名: {os.path.basename(file_path)}")
+
+    def _bulk_source(self):
+        """根据输入确定批量下载来源"""
+        if self.bulk_names:
+            return "names", self.bulk_names
+        text = self.bulk_input.text().strip()
+        if text.isdigit():
+            return self.bulk_type.currentData(), int(text)
+        return self._current_source().parse_collection(text)
+
+    def _toggle_bulk_download(self):
+        """开始或取消批量下载"""
+        if self.bulk_task is not None:
+            job_manager().cancel(self.bulk_task)
+            self.bulk_button.setEnabled(False)
+            self.bulk_button.setText("正在取消...")
+            return
+
+        try:
+            source = self._bulk_source()
+        except ValueError as e:
+            QMessageBox.warning(self, "提示", f"{e}\n请输入歌单/专辑链接或ID，或导入歌名文件！")
+            return
+
+        # 与单曲下载共用调度器，同一音源的并发数不超过配置
+        job = BulkDownloadJob(source, self.download_path, scheduler=self.scheduler, sink=self.events,
+                              tagger=self.tagger, music_source=self._current_source())
+        # 由任务管理器运行，返回工具箱后继续下载，任务列表中可查看进度和取消
+        self.bulk_job = job
+        self.bulk_task = job_manager().submit(
+            f"批量下载: {source[0]}", self._run_bulk, tool=TOOL_NAME, cancel=job.cancel,
+            progress=lambda: self._bulk_progress(job), on_finished=self._bulk_finished,
+        )
+        self.bulk_timer.start()
+        self.progress_timer.start()
+        self.bulk_button.setText("取消批量下载")
+        logging.info(f"开始批量下载: {source[0]}")
+
+    def _run_bulk(self, task):
+        """在任务管理器的线程中运行批量下载"""
+        stats = self.bulk_job.run()
+        return f"完成 {stats['done']}/{stats['total']}，失败 {stats['failed']}"
+
+    @staticmethod
+    def _bulk_progress(job):
+        """任务列表中显示的进度"""
+        stats = job.snapshot()
+        percent = int(stats["done"] * 100 / stats["total"]) if stats["total"] else 0
+        return percent, f"{stats['done']}/{stats['total']}，{stats['mb_per_s']:.2f} MB/s"
+
+    def _update_bulk_stats(self):
+        """刷新批量下载的汇总进度"""
+        if self.bulk_job is None:
+            return
+        stats = self.bulk_job.snapshot()
+        self.bulk_stats_label.setText(
+            f"完成 {stats['done']}/{stats['total']}（跳过 {stats['skipped']}），失败 {stats['failed']}，"
+            f"已下载 {stats['bytes'] / 1024 / 1024:.1f} MB，平均 {stats['mb_per_s']:.2f} MB/s"
+        )
+
+    def _bulk_finished(self, success, result):
+        """批量下载结束"""
+        self.bulk_timer.stop()
+        self._update_bulk_stats()
+        job = self.bulk_job
+        stats = job.snapshot()
+        self.bulk_job = None
+        self.bulk_task = None
+        self.bulk_button.setEnabled(True)
+        self.bulk_button.setText("开始批量下载")
+
+        for name, message in job.failures:
+            logging.error(f"{name} 下载失败: {message}")
+        message = f"批量下载结束：完成 {stats['done']}/{stats['total']}，失败 {stats['failed']}"
+        if job.failures:
+            shown = "\n".join(f"{name}: {error}" for name, error in job.failures[:20])
+            more = f"\n……等 {len(job.failures)} 首" if len(job.failures) > 20 else ""
+            message += f"\n\n失败列表:\n{shown}{more}"
+        QMessageBox.information(self, "批量下载", message)
 
     def _return_to_toolbox(self):
         """返回工具箱"""
@@ -162,5 +552,8 @@ class ToolWindow(QWidget):
 
     def closeEvent(self, event):
         """关闭窗口时清理资源"""
-        self.thread_pool.shutdown(wait=False)
+        if self.bulk_task is not None:
+            job_manager().cancel(self.bulk_task)
+        self.scheduler.shutdown(wait=False)
+        self.tagger.shutdown(wait=False)
         super().closeEvent(event)
\ No newline at end of file
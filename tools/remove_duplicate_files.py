@@ -1,14 +1,14 @@
 import os
 import sys
-import shutil
-from collections import defaultdict
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
     QPushButton, QListWidget, QFileDialog, QMessageBox, QGroupBox,
     QProgressBar, QCheckBox
 )
 from PyQt6.QtGui import QIcon
+from tools._dedup import excluded_files, find_duplicates, generate_clean_folder
+from tools._jobs import CANCELLED, job_manager
 
 TOOL_NAME = "重复文件清理工具"
 DESCRIPTION = "比较两个文件夹中的重复文件（包括子文件夹），并生成去重后的新文件夹"
@@ -24,6 +24,8 @@ class DuplicateFileCleaner(QWidget):
         self.duplicate_files = []  # 重复文件列表
         self.all_files_a = []  # 文件夹A中的所有文件（包括子文件夹）
         self.all_files_b = []  # 文件夹B中的所有文件（包括子文件夹）
+        self.compare_job = None  # 比较任务（在任务管理器中运行，遍历和哈希在子进程中进行）
+        self._compare_result = None
         self._setup_ui()
 
     def _setup_ui(self):
@@ -72,19 +74,26 @@ class DuplicateFileCleaner(QWidget):
         
         self.prefer_a_checkbox = QCheckBox("优先保留文件夹A中的文件（当文件名重复时）")
         self.prefer_a_checkbox.setChecked(True)
+
+        self.compare_content_checkbox = QCheckBox("按文件内容比较（哈希，文件名不同也能识别）")
+        self.compare_content_checkbox.setToolTip("只计算大小相同的文件的哈希；下载历史中已记录的文件直接使用记录的哈希")
         
         options_layout.addWidget(self.include_subfolders_checkbox)
         options_layout.addWidget(self.prefer_a_checkbox)
+        options_layout.addWidget(self.compare_content_checkbox)
         options_group.setLayout(options_layout)
 
         # 进度条
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(100)
+        self.progress_timer.timeout.connect(self._update_progress)
 
         # 比较按钮
-        compare_button = QPushButton("比较文件夹")
-        compare_button.setStyleSheet("padding: 8px 16px; background: #ffc107; color: black; border-radius: 4px;")
-        compare_button.clicked.connect(self._compare_folders)
+        self.compare_button = QPushButton("比较文件夹")
+        self.compare_button.setStyleSheet("padding: 8px 16px; background: #ffc107; color: black; border-radius: 4px;")
+        self.compare_button.clicked.connect(self._compare_folders)
 
         # 重复文件列表
         self.duplicate_list_widget = QListWidget()
@@ -110,7 +119,7 @@ class DuplicateFileCleaner(QWidget):
         layout.addLayout(output_layout)
         layout.addWidget(options_group)
         layout.addWidget(self.progress_bar)
-        layout.addWidget(compare_button)
+        layout.addWidget(self.compare_button)
         layout.addWidget(QLabel("重复文件列表:"))
         layout.addWidget(self.duplicate_list_widget)
         layout.addWidget(self.stats_label)
@@ -136,42 +145,8 @@ class DuplicateFileCleaner(QWidget):
             self.output_folder_path = folder_path
             self.output_folder_label.setText(f"输出文件夹: {folder_path}")
 
-    def _get_all_files(self, folder_path, include_subfolders=True):
-        """递归获取文件夹中的所有文件（包括子文件夹）"""
-        all_files = []
-        
-        if not folder_path or not os.path.exists(folder_path):
-            return all_files
-        
-        if include_subfolders:
-            # 递归获取所有文件
-            for root, dirs, files in os.walk(folder_path):
-                for file_name in files:
-                    file_path = os.path.join(root, file_name)
-                    # 计算相对路径，用于显示和比较
-                    relative_path = os.path.relpath(file_path, folder_path)
-                    all_files.append({
-                        'name': file_name,
-                        'full_path': file_path,
-                        'relative_path': relative_path,
-                        'source_folder': folder_path
-                    })
-        else:
-            # 只获取根目录文件
-            for file_name in os.listdir(folder_path):
-                file_path = os.path.join(folder_path, file_name)
-                if os.path.isfile(file_path):
-                    all_files.append({
-                        'name': file_name,
-                        'full_path': file_path,
-                        'relative_path': file_name,
-                        'source_folder': folder_path
-                    })
-        
-        return all_files
-
     def _compare_folders(self):
-        """比较两个文件夹，找出重复文件"""
+        """比较两个文件夹，找出重复文件（在后台运行，不阻塞界面）"""
         if not self.folder_a_path or not self.folder_b_path:
             QMessageBox.warning(self, "提示", "请先选择文件夹A和文件夹B！")
             return
@@ -181,71 +156,65 @@ class DuplicateFileCleaner(QWidget):
         self.duplicate_files = []
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
+        self.compare_button.setEnabled(False)
+
+        options = (self.folder_a_path, self.folder_b_path,
+                   self.include_subfolders_checkbox.isChecked(), self.compare_content_checkbox.isChecked())
+        self.compare_job = job_manager().submit(
+            f"比较文件夹: {os.path.basename(self.folder_a_path)} / {os.path.basename(self.folder_b_path)}",
+            lambda job: self._run_compare(job, *options), tool=TOOL_NAME, on_finished=self._compare_finished
+        )
+        self.progress_timer.start()
+
+    def _run_compare(self, job, folder_a, folder_b, include_subfolders, by_content):
+        """在任务管理器的线程中运行，只保存结果，不操作界面"""
+        self._compare_result = find_duplicates(folder_a, folder_b, include_subfolders, by_content,
+                                               check_cancelled=job.check_cancelled, progress=job.report)
+        files_a, files_b, duplicates = self._compare_result
+        return f"找到 {len(duplicates)} 对重复文件（共 {len(files_a) + len(files_b)} 个文件）"
+
+    def _update_progress(self):
+        if self.compare_job is not None:
+            percent, text = self.compare_job.progress()
+            self.progress_bar.setValue(percent)
+            self.progress_bar.setFormat(f"{text} ({percent}%)" if text else f"{percent}%")
+
+    def _compare_finished(self, success, message):
+        self.progress_timer.stop()
+        self.progress_bar.setVisible(False)
+        self.compare_button.setEnabled(True)
+        if not success:
+            if self.compare_job.state != CANCELLED:
+                QMessageBox.critical(self, "错误", f"比较失败: {message.splitlines()[0]}")
+            return
 
-        # 获取所有文件（包括子文件夹）
-        include_subfolders = self.include_subfolders_checkbox.isChecked()
-        self.all_files_a = self._get_all_files(self.folder_a_path, include_subfolders)
-        self.all_files_b = self._get_all_files(self.folder_b_path, include_subfolders)
-        
-        total_files = len(self.all_files_a) + len(self.all_files_b)
-        if total_files == 0:
+        self.all_files_a, self.all_files_b, self.duplicate_files = self._compare_result
+        self._compare_result = None
+        if not self.all_files_a and not self.all_files_b:
             QMessageBox.warning(self, "提示", "选择的文件夹中没有文件！")
-            self.progress_bar.setVisible(False)
             return
 
-        # 只通过文件名比较重复文件
-        self._compare_by_name()
-
-        self.progress_bar.setValue(100)
-        self.progress_bar.setVisible(False)
-
-    def _compare_by_name(self):
-        """通过文件名比较重复文件"""
-        # 构建相对路径到文件列表的映射
-        path_to_files_a = defaultdict(list)
-        path_to_files_b = defaultdict(list)
-        
-        for file_info in self.all_files_a:
-            path_to_files_a[file_info['relative_path']].append(file_info)
-            
-        for file_info in self.all_files_b:
-            path_to_files_b[file_info['relative_path']].append(file_info)
-        
-        # 找出重复的相对路径
-        common_paths = set(path_to_files_a.keys()) & set(path_to_files_b.keys())
-        
-        for path in common_paths:
-            # 对于每个重复的相对路径，记录所有匹配的文件对
-            files_a = path_to_files_a[path]
-            files_b = path_to_files_b[path]
-            
-            # 记录所有重复文件对
-            for file_a in files_a:
-                for file_b in files_b:
-                    self.duplicate_files.append({
-                        'name': file_a['name'],
-                        'path_a': file_a['full_path'],
-                        'path_b': file_b['full_path'],
-                        'relative_path': path,
-                        'duplicate_type': '文件名重复'
-                    })
-                    
-                    display_text = f"📄 {file_a['name']}\n  路径: {path}"
-                    self.duplicate_list_widget.addItem(display_text)
+        for dup in self.duplicate_files:
+            if dup['duplicate_type'] == '内容重复':
+                display_text = f"📄 {dup['name']}\n  A: {dup['relative_path']}\n  B: {dup['relative_path_b']}"
+            else:
+                display_text = f"📄 {dup['name']}\n  路径: {dup['relative_path']}"
+            self.duplicate_list_widget.addItem(display_text)
 
         # 更新统计信息
         self._update_stats(len(self.all_files_a), len(self.all_files_b), len(self.duplicate_files))
 
     def _update_stats(self, count_a, count_b, duplicate_count):
         """更新统计信息"""
-        # 计算不重复的文件数量
+        # 重复文件按组计数：按文件名比较时为相对路径，按内容比较时为哈希
         duplicate_paths = set()
         for dup in self.duplicate_files:
-            duplicate_paths.add(dup['relative_path'])
+            duplicate_paths.add(dup['group'])
         
         # 计算不重复的文件数量
-        unique_files_a = [f for f in self.all_files_a if f['relative_path'] not in duplicate_paths]
-        unique_files_b = [f for f in self.all_files_b if f['relative_path'] not in duplicate_paths]
+        excluded = excluded_files(self.duplicate_files)
+        unique_files_a = [f for f in self.all_files_a if f['full_path'] not in excluded]
+        unique_files_b = [f for f in self.all_files_b if f['full_path'] not in excluded]
         total_unique = len(unique_files_a) + len(unique_files_b)
         
         if count_a + count_b > 0:
@@ -274,62 +243,18 @@ class DuplicateFileCleaner(QWidget):
             return
 
         try:
-            # 创建输出文件夹
-            output_dir = os.path.join(self.output_folder_path, "去重结果")
-            if os.path.exists(output_dir):
-                shutil.rmtree(output_dir)
-            os.makedirs(output_dir)
-
-            # 获取所有重复文件的相对路径
-            duplicate_paths = set()
-            for dup in self.duplicate_files:
-                duplicate_paths.add(dup['relative_path'])
-
-            # 合并所有文件并创建文件夹结构映射
-            all_files = self.all_files_a + self.all_files_b
-            files_by_path = {}
-            prefer_a = self.prefer_a_checkbox.isChecked()
-            
-            # 按照Windows复制逻辑处理文件
-            for file_info in all_files:
-                relative_path = file_info['relative_path']
-                
-                # 如果这个路径已经有文件了，说明有重复
-                if relative_path in files_by_path:
-                    # 根据用户选择决定保留哪个文件
-                    if prefer_a and file_info['source_folder'] == self.folder_a_path:
-                        # 优先保留A文件夹的文件
-                        files_by_path[relative_path] = file_info
-                    elif not prefer_a and file_info['source_folder'] == self.folder_b_path:
-                        # 优先保留B文件夹的文件
-                        files_by_path[relative_path] = file_info
-                    # 如果优先选择与当前文件来源相同，则保持不变
-                else:
-                    # 这个路径还没有文件，直接添加
-                    files_by_path[relative_path] = file_info
-
-            # 复制所有不重复的文件，保持文件夹结构
-            files_copied = 0
-            
-            for relative_path, file_info in files_by_path.items():
-                # 跳过重复的文件（根据用户选择已经处理过了）
-                if relative_path in duplicate_paths:
-                    continue
-                    
-                src_path = file_info['full_path']
-                dst_path = os.path.join(output_dir, relative_path)
-                
-                # 确保目标目录存在
-                os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-                
-                shutil.copy2(src_path, dst_path)
-                files_copied += 1
+            duplicate_groups = set(dup['group'] for dup in self.duplicate_files)
+            output_dir, files_copied = generate_clean_folder(
+                self.all_files_a, self.all_files_b, self.duplicate_files,
+                self.folder_a_path, self.folder_b_path, self.output_folder_path,
+                prefer_a=self.prefer_a_checkbox.isChecked()
+            )
 
             QMessageBox.information(self, "成功", 
                 f"去重文件夹已生成！\n"
                 f"位置: {output_dir}\n"
                 f"共保存 {files_copied} 个不重复文件\n"
-                f"已删除 {len(duplicate_paths)} 个重复文件")
+                f"已删除 {len(duplicate_groups)} 个重复文件")
 
         except Exception as e:
             QMessageBox.critical(self, "错误", f"生成去重文件夹失败: {str(e)}")
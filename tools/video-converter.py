@@ -1,64 +1,15 @@
 import os
 import sys
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
     QPushButton, QFileDialog, QProgressBar, QListWidget,
     QMessageBox
 )
-import subprocess
+from tools._convert import AudioConverter
+from tools._jobs import CANCELLED, job_manager
 TOOL_NAME = "视频转换器"
 DESCRIPTION = "视频转化为音频"
-class AudioConverter(QThread):
-    progress = pyqtSignal(int, str)  # 进度百分比，当前文件名
-    finished = pyqtSignal(bool, str)  # 完成状态，最终消息
-
-    def __init__(self, input_paths, output_dir):
-        super().__init__()
-        self.input_paths = input_paths
-        self.output_dir = output_dir
-        self.total_files = len(input_paths)
-        self.processed_files = 0
-
-    def run(self):
-        try:
-            for index, input_path in enumerate(self.input_paths):
-                if not os.path.exists(input_path):
-                    continue
-                
-                # 更新进度
-                self.processed_files = index + 1
-                filename = os.path.basename(input_path)
-                self.progress.emit(
-                    int((self.processed_files / self.total_files) * 100),
-                    f"正在转换: {filename}"
-                )
-                
-                # 生成输出路径
-                output_name = os.path.splitext(filename)[0] + ".mp3"
-                output_path = os.path.join(self.output_dir, output_name)
-                
-                # 使用FFmpeg转换
-                command = [
-                    "ffmpeg",
-                    "-i", input_path,
-                    "-vn",          # 禁用视频流
-                    "-acodec", "libmp3lame",  # 使用MP3编码
-                    "-q:a", "2",    # 音频质量（0-9，0为最高质量）
-                    "-y",           # 覆盖输出文件
-                    output_path
-                ]
-                subprocess.run(
-                    command,
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                    check=True
-                )
-            
-            self.finished.emit(True, f"成功转换 {self.processed_files}/{self.total_files} 个文件")
-        except Exception as e:
-            self.finished.emit(False, f"转换失败: {str(e)}")
-
 class VideoToAudioTool(QWidget):
     def __init__(self):
         super().__init__()
@@ -66,8 +17,14 @@ class VideoToAudioTool(QWidget):
         self.setMinimumSize(800, 500)
         self.input_files = []
         self.output_dir = os.path.expanduser("~/Desktop")  # 默认输出到桌面
+        self.job = None
         self._setup_ui()
 
+        # 定时读取转换任务的进度
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(200)
+        self.progress_timer.timeout.connect(lambda: self._update_progress(*self.job.progress()))
+
     def _setup_ui(self):
         layout = QVBoxLayout()
 
@@ -189,20 +146,24 @@ class VideoToAudioTool(QWidget):
         # 禁用界面控件
         self._set_ui_enabled(False)
         
-        # 启动转换线程
+        # 转换由任务管理器运行，返回工具箱后继续转换，可在任务列表中取消
         self.converter = AudioConverter(self.input_files, self.output_dir)
-        self.converter.progress.connect(self._update_progress)
-        self.converter.finished.connect(self._conversion_finished)
-        self.converter.start()
+        self.job = job_manager().submit(f"视频转音频: {len(self.input_files)} 个文件", self.converter.run,
+                                        tool=TOOL_NAME, on_finished=self._conversion_finished)
+        self.progress_timer.start()
 
     def _update_progress(self, percent, filename):
         self.progress_bar.setValue(percent)
         self.progress_bar.setFormat(f"{filename} ({percent}%)")
 
     def _conversion_finished(self, success, message):
+        self.progress_timer.stop()
         self._set_ui_enabled(True)
         self.progress_bar.setValue(100 if success else 0)
-        QMessageBox.information(self, "完成" if success else "错误", message)
+        if self.job.state == CANCELLED:
+            self.progress_bar.setFormat("已取消")
+            return
+        QMessageBox.information(self, "完成" if success else "错误", message.splitlines()[0])
 
     def _set_ui_enabled(self, enabled):
         self.btn_add_files.setEnabled(enabled)